@@ -0,0 +1,180 @@
+"""付款單發送方式比較：HTML附件 vs 付款頁面連結
+
+以 discord.py 實際的 followup 發送流程（Webhook.send）送到本機的模擬Discord API，
+記錄每筆訂單上傳的位元組數（完整HTTP本文，含multipart分隔）與 followup 延遲。
+模擬API可依上傳頻寬與RTT延遲回應，用來估計實際網路下的差異。
+
+付款頁面模式另外量測使用者開啟連結時由付款頁面端點回應的延遲。
+
+執行方式: python benchmarks/bench_checkout.py [訂單數量] [上傳頻寬KB/s，0為不限] [RTT毫秒]
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp  # noqa: E402
+import discord  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from checkout import CheckoutService  # noqa: E402
+from ecpay_handler import ECPayHandler  # noqa: E402
+from payment_delivery import checkout_view, followup_payload_bytes, payment_file  # noqa: E402
+
+CONTENT = "✅ **繳費單已建立完成！** <@123456789012345678>\n\n⚠️ **重要提醒：**\n• 請在期限內完成繳費\n• 繳費代碼僅能使用一次\n• 如有問題請聯繫客服"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeDiscordAPI:
+    """模擬 followup webhook 端點，記錄請求大小並依頻寬與RTT延遲回應"""
+
+    def __init__(self, bandwidth, rtt):
+        self.bandwidth = bandwidth         # 位元組/秒，0為不限
+        self.rtt = rtt                     # 秒
+        self.sizes = []
+
+    async def execute_webhook(self, request):
+        body = await request.read()
+        self.sizes.append(len(body))
+        delay = self.rtt + (len(body) / self.bandwidth if self.bandwidth else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        return web.Response(status=204)
+
+    def create_app(self):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_post('/api/v10/webhooks/{webhook_id}/{token}', self.execute_webhook)
+        return app
+
+
+def build_order(handler, index):
+    """產生實際的付款表單與與指令相近的嵌入訊息"""
+    trade_no = f"BC{index:018d}"
+    form_html, params, order_info = handler.generate_payment_url(
+        trade_no=trade_no, total_amount=1500, trade_desc="測試訂單", item_name="測試商品",
+        payment_method="CVS", store_type="ALL", as_bytes=True
+    )
+    payment_info = handler.format_payment_info(order_info)
+    embed = discord.Embed(title="💳 ECPay超商繳費單 - 全通用", description="可於所有超商繳費", color=0x00ff00, timestamp=datetime.now())
+    embed.add_field(name="🏪 ibon機台繳費代碼（7-ELEVEN）", value=f"```{payment_info['ibon_code']}```", inline=False)
+    embed.add_field(name="🔢 其他超商繳費代碼", value=f"```{payment_info['payment_code']}```", inline=False)
+    embed.add_field(
+        name="📋 訂單資訊",
+        value=f"**🆔 訂單編號:** `{trade_no}`\n**🛍️ 商品名稱:** 測試商品\n**💰 交易金額:** NT$ 1,500\n**🏪 指定超商:** 全通用",
+        inline=False
+    )
+    embed.add_field(
+        name="⏰ 時間資訊",
+        value=f"**📅 訂單產生時間:** {payment_info['create_time']}\n**⏳ 訂單有效期限:** {payment_info['expire_date']}",
+        inline=False
+    )
+    embed.set_footer(text="建立者: tester")
+    return trade_no, form_html, embed
+
+
+async def send_orders(webhook, orders, mode, checkout):
+    """依模式發送所有訂單，回傳每筆 followup 延遲與估計的資料量"""
+    latencies = []
+    estimated = []
+    for trade_no, form_html, embed in orders:
+        if mode == 'link':
+            view = checkout_view(checkout.publish(trade_no, form_html))
+            started = time.perf_counter()
+            await webhook.send(content=CONTENT, embed=embed, view=view)
+            latencies.append(time.perf_counter() - started)
+            estimated.append(followup_payload_bytes(CONTENT, embed, view=view))
+        else:
+            with payment_file(form_html, trade_no) as file:
+                started = time.perf_counter()
+                await webhook.send(content=CONTENT, embed=embed, file=file)
+                latencies.append(time.perf_counter() - started)
+            estimated.append(followup_payload_bytes(CONTENT, embed, attachment_size=len(form_html)))
+    return latencies, estimated
+
+
+async def open_links(session, checkout, orders):
+    """模擬使用者開啟付款頁面，回傳 (延遲, 回應位元組)"""
+    latencies = []
+    sizes = []
+    for trade_no, form_html, embed in orders:
+        url = checkout.publish(trade_no, form_html)
+        started = time.perf_counter()
+        async with session.get(url) as response:
+            body = await response.read()
+            assert response.status == 200, response.status
+        latencies.append(time.perf_counter() - started)
+        sizes.append(len(body))
+    return latencies, sizes
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return sum(ordered) / len(ordered) * 1000, ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+
+
+async def run(count, bandwidth, rtt):
+    api = FakeDiscordAPI(bandwidth, rtt)
+    api_port = free_port()
+    api_runner = web.AppRunner(api.create_app(), access_log=None)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, '127.0.0.1', api_port).start()
+    discord.http.Route.BASE = f'http://127.0.0.1:{api_port}/api/v10'
+
+    checkout_port = free_port()
+    checkout = CheckoutService({
+        'host': '127.0.0.1', 'port': checkout_port, 'public_url': f'http://127.0.0.1:{checkout_port}',
+        'secret': 'bench', 'persist': False,
+    })
+    await checkout.start()
+
+    handler = ECPayHandler()
+    orders = [build_order(handler, i) for i in range(count)]
+    client = discord.Client(intents=discord.Intents.none())
+
+    results = {}
+    async with aiohttp.ClientSession() as session:
+        webhook = discord.Webhook.partial(1, 'token', session=session, client=client)
+        # 預熱連線
+        await send_orders(webhook, orders[:5], 'attachment', checkout)
+        for mode in ('attachment', 'link'):
+            api.sizes.clear()
+            latencies, estimated = await send_orders(webhook, orders, mode, checkout)
+            results[mode] = (list(api.sizes), latencies, estimated)
+        page_latencies, page_sizes = await open_links(session, checkout, orders)
+
+    await checkout.stop()
+    await api_runner.cleanup()
+    return results, (page_latencies, page_sizes)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    bandwidth = float(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 0.0
+    rtt = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+
+    results, (page_latencies, page_sizes) = asyncio.run(run(count, bandwidth, rtt))
+    network = f"上傳頻寬 {bandwidth / 1024:.0f} KB/s" if bandwidth else "上傳頻寬不限"
+    print(f"訂單數量: {count}，{network}，RTT {rtt * 1000:.0f} ms")
+    print(f"{'模式':<12}{'上傳(位元組/筆)':>16}{'估計(位元組/筆)':>16}{'平均延遲(ms)':>14}{'p95(ms)':>10}")
+    for mode, (sizes, latencies, estimated) in results.items():
+        avg, p95 = summarize(latencies)
+        print(f"{mode:<12}{sum(sizes) / len(sizes):>16.0f}{sum(estimated) / len(estimated):>16.0f}{avg:>14.2f}{p95:>10.2f}")
+
+    attachment = sum(results['attachment'][0])
+    link = sum(results['link'][0])
+    print(f"\n付款頁面連結每筆少上傳 {(attachment - link) / count:.0f} 位元組（{1 - link / attachment:.0%}），且不使用附件上傳額度")
+    avg, p95 = summarize(page_latencies)
+    print(f"使用者開啟付款頁面: 平均 {avg:.2f} ms，p95 {p95:.2f} ms，回應 {sum(page_sizes) / len(page_sizes):.0f} 位元組")
+
+
+if __name__ == "__main__":
+    main()
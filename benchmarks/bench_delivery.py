@@ -0,0 +1,59 @@
+"""付款HTML附件發送效能測試
+
+比較記憶體緩衝區與暫存檔兩種附件建立方式每秒可處理的訂單數。
+上傳以讀取附件內容模擬（不連線Discord）。
+
+執行方式: python benchmarks/bench_delivery.py [訂單數量]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payment_delivery import memory_payment_file, temp_payment_file  # noqa: E402
+
+
+def build_form_html(trade_no):
+    """產生與實際大小相近的付款表單"""
+    inputs = '\n'.join(
+        f'<input type="hidden" name="Field{i}" value="{trade_no}-{i}-測試內容">'
+        for i in range(14)
+    )
+    return f"""
+        <html>
+        <head><meta charset="utf-8"></head>
+        <body>
+        <form id="ecpay_form" method="post" action="https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5">
+        {inputs}
+        </form>
+        <script>document.getElementById('ecpay_form').submit();</script>
+        </body>
+        </html>
+        """
+
+
+def run(factory, count):
+    """模擬發送 count 筆訂單，回傳每秒訂單數"""
+    start = time.perf_counter()
+    for i in range(count):
+        trade_no = f"DC{i:012d}"
+        with factory(build_form_html(trade_no), trade_no) as file:
+            # discord.py 上傳時會從頭讀取附件內容
+            file.fp.read()
+            file.reset()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    memory_rate = run(memory_payment_file, count)
+    disk_rate = run(temp_payment_file, count)
+
+    print(f"訂單數量: {count}")
+    print(f"暫存檔:     {disk_rate:10.0f} 筆/秒")
+    print(f"記憶體緩衝: {memory_rate:10.0f} 筆/秒  ({memory_rate / disk_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
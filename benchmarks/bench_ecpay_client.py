@@ -0,0 +1,144 @@
+"""ECPayClient 行為與效能測試（使用本機ECPay模擬伺服器）
+
+以 ecpay_stub.start_stub 啟動模擬伺服器，透過 ECPayClient.query_trade_info 實際送出請求，
+確認下列行為並量測並行查詢的吞吐量：
+
+- 伺服器錯誤(5xx)時重試，之後成功
+- 用戶端錯誤(4xx)時不重試
+- 回應的CheckMacValue不符時拒絕
+- 回應逾時時在 total_timeout 後放棄並重試
+- 同時請求數不超過 limit_per_host
+
+執行方式: python benchmarks/bench_ecpay_client.py [查詢數量] [同時查詢數] [每主機連線數] [模擬延遲毫秒]
+任一項檢查失敗時以狀態碼1結束。
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecpay_client import ECPayClient, ECPayClientError  # noqa: E402
+from ecpay_handler import ECPayHandler  # noqa: E402
+from ecpay_stub import QUERY_PATH, STUB_HASH_IV, STUB_HASH_KEY, STUB_MERCHANT_ID, ECPayStub, start_stub  # noqa: E402
+
+# 行為測試使用較短的退避時間，避免等待
+FAST_RETRY = {'retries': 2, 'backoff': 0.01}
+
+
+def stub_handler():
+    """使用模擬伺服器商店金鑰的ECPay處理器"""
+    handler = ECPayHandler()
+    handler.apply_config(
+        {**handler.config, 'MerchantID': STUB_MERCHANT_ID, 'HashKey': STUB_HASH_KEY, 'HashIV': STUB_HASH_IV},
+        handler.api_url
+    )
+    return handler
+
+
+async def run_case(stub, config, trade_no='BCPAID0000000001'):
+    """對模擬伺服器查詢一次，回傳 (結果, 錯誤, 耗時秒數)"""
+    stub.add_trade('BCPAID0000000001', 500, status='1')
+    runner, base_url = await start_stub(stub)
+    client = ECPayClient(stub_handler(), query_url=base_url + QUERY_PATH, config=config)
+    started = time.perf_counter()
+    try:
+        return await client.query_trade_info(trade_no), None, time.perf_counter() - started
+    except ECPayClientError as e:
+        return None, e, time.perf_counter() - started
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+async def check_behaviour():
+    """回傳 [(項目, 是否通過, 說明)]"""
+    checks = []
+
+    stub = ECPayStub()
+    result, error, elapsed = await run_case(stub, FAST_RETRY)
+    checks.append(("正常查詢", error is None and result['status_info']['name'] == '已付款' and stub.requests == 1,
+                   f"請求 {stub.requests} 次，狀態 {result['status_info']['name'] if result else error}"))
+
+    stub = ECPayStub(fail_first=2, fail_status=503)
+    result, error, elapsed = await run_case(stub, FAST_RETRY)
+    checks.append(("5xx 後重試成功", error is None and stub.requests == 3,
+                   f"請求 {stub.requests} 次（前2次 HTTP 503），{'成功' if error is None else error}"))
+
+    stub = ECPayStub(fail_first=3, fail_status=500)
+    result, error, elapsed = await run_case(stub, FAST_RETRY)
+    checks.append(("5xx 超過重試次數", error is not None and stub.requests == 3,
+                   f"請求 {stub.requests} 次，{error}"))
+
+    stub = ECPayStub(fail_first=1, fail_status=400)
+    result, error, elapsed = await run_case(stub, FAST_RETRY)
+    checks.append(("4xx 不重試", error is not None and stub.requests == 1,
+                   f"請求 {stub.requests} 次，{error}"))
+
+    stub = ECPayStub(tamper=True)
+    result, error, elapsed = await run_case(stub, FAST_RETRY)
+    checks.append(("CheckMacValue 不符時拒絕", error is not None and '檢查碼' in str(error),
+                   f"{error or '未拒絕'}"))
+
+    stub = ECPayStub(delay=1.0)
+    total_timeout = 0.1
+    result, error, elapsed = await run_case(stub, {**FAST_RETRY, 'retries': 1, 'total_timeout': total_timeout})
+    # 兩次嘗試各在 total_timeout 後放棄，加上一次退避
+    limit = 2 * total_timeout + FAST_RETRY['backoff'] + 0.2
+    checks.append(("逾時後重試並放棄", error is not None and stub.requests == 2 and elapsed < limit,
+                   f"請求 {stub.requests} 次，耗時 {elapsed * 1000:.0f} ms（上限 {limit * 1000:.0f} ms），{error}"))
+
+    return checks
+
+
+async def bench_throughput(count, concurrency, limit_per_host, delay):
+    """並行查詢，回傳 (每秒查詢數, 失敗數, 模擬伺服器同時處理的最大請求數, 請求次數)"""
+    stub = ECPayStub(delay=delay)
+    trade_nos = [f"BC{index:018d}" for index in range(count)]
+    for index, trade_no in enumerate(trade_nos):
+        stub.add_trade(trade_no, 100 + index, status=str(index % 2))
+    runner, base_url = await start_stub(stub)
+    client = ECPayClient(stub_handler(), query_url=base_url + QUERY_PATH, config={'limit_per_host': limit_per_host})
+    try:
+        started = time.perf_counter()
+        failures = 0
+        async for trade_no, result, error in client.query_many(trade_nos, concurrency):
+            failures += error is not None
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return count / elapsed, failures, stub.max_active, stub.requests
+
+
+async def run(count, concurrency, limit_per_host, delay):
+    checks = await check_behaviour()
+    throughput = await bench_throughput(count, concurrency, limit_per_host, delay)
+    return checks, throughput
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    limit_per_host = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    delay = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.01
+
+    checks, (qps, failures, max_active, requests) = asyncio.run(run(count, concurrency, limit_per_host, delay))
+
+    for name, ok, detail in checks:
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+
+    # 連線數上限：同時處理的請求不超過 limit_per_host，且吞吐量約為 limit_per_host / 延遲
+    limited = max_active <= limit_per_host and failures == 0 and requests == count
+    ceiling = limit_per_host / delay if delay else float('inf')
+    print(f"{'✅' if limited else '❌'} 連線數上限: 同時處理最多 {max_active} 個請求（limit_per_host={limit_per_host}）")
+    print(f"\n並行查詢 {count} 筆（同時 {concurrency}，模擬延遲 {delay * 1000:.0f} ms）: "
+          f"{qps:.0f} 筆/秒（理論上限 {ceiling:.0f} 筆/秒），失敗 {failures} 筆")
+
+    if not limited or not all(ok for _, ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
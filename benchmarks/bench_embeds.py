@@ -0,0 +1,204 @@
+"""嵌入訊息建立效能測試
+
+比較原本指令模塊的寫法（每次呼叫 get_store_info / get_store_steps 都重新建立超商資訊與繳費步驟字典）
+與目前使用模組層級常數（STORE_INFO、STORE_STEPS）的寫法，量測建立 /建立繳費單 嵌入訊息
+（五種超商輪流）與超商代碼付款說明欄位所需的時間。
+
+說明指令的內容本來就是字串常數，兩種寫法相同，不列入比較。
+每項交錯重複量測並取最快的一輪，降低GC與其他程序造成的誤差。
+
+執行方式: python benchmarks/bench_embeds.py [次數] [重複次數]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embed_registry import (  # noqa: E402
+    STORE_INFO, add_payment_instructions, add_store_instructions, get_store_info,
+)
+
+STORE_TYPES = list(STORE_INFO)
+
+PAYMENT_INFO = {
+    'trade_no': "BE000000000000000001",
+    'item_name': "測試商品",
+    'total_amount': 1500,
+    'ibon_code': "LLL12345678901",
+    'payment_code': "GW12345678901",
+    'create_time': "2026/01/01 12:00:00",
+    'expire_date': "2026/01/08 12:00:00",
+    'expire_time': "2026/01/08 12:00:00",
+}
+
+
+def legacy_store_info(store_type):
+    """原本的 get_store_info：每次呼叫都建立字典"""
+    store_map = {
+        "ALL": {
+            "name": "全通用",
+            "description": "可在所有支援的超商繳費",
+            "color": 0x00ff00
+        },
+        "SEVEN": {
+            "name": "7-ELEVEN",
+            "description": "專用於7-ELEVEN ibon機台繳費",
+            "color": 0xff6600
+        },
+        "FAMILY": {
+            "name": "全家便利商店",
+            "description": "專用於全家便利商店繳費",
+            "color": 0x0066ff
+        },
+        "HILIFE": {
+            "name": "萊爾富",
+            "description": "專用於萊爾富便利商店繳費",
+            "color": 0xff0066
+        },
+        "OK": {
+            "name": "OK便利商店",
+            "description": "專用於OK便利商店繳費",
+            "color": 0x66ff00
+        }
+    }
+    return store_map.get(store_type, store_map["ALL"])
+
+
+def legacy_store_steps(store_type):
+    """原本的 get_store_steps：每次呼叫都建立字典"""
+    steps_map = {
+        "FAMILY": "1️⃣ 前往全家便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
+        "HILIFE": "1️⃣ 前往萊爾富便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
+        "OK": "1️⃣ 前往OK便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證"
+    }
+    return steps_map.get(store_type, "1️⃣ 前往指定超商\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼\n4️⃣ 完成繳費")
+
+
+def legacy_add_store_instructions(embed, store_type, store_info):
+    """原本 /建立繳費單 內的繳費步驟欄位"""
+    if store_type == "ALL":
+        embed.add_field(
+            name="🏪 繳費步驟",
+            value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
+            inline=False
+        )
+    elif store_type == "SEVEN":
+        embed.add_field(
+            name="📱 ibon機台繳費步驟",
+            value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
+            inline=False
+        )
+    else:
+        embed.add_field(
+            name=f"🏪 {store_info['name']}繳費步驟",
+            value=legacy_store_steps(store_type),
+            inline=False
+        )
+
+
+def store_embed(store_type, store_info, add_instructions):
+    """/建立繳費單 的嵌入訊息（交易資料欄位兩種寫法相同）"""
+    payment_info = PAYMENT_INFO
+    embed = discord.Embed(
+        title=f"💳 ECPay超商繳費單 - {store_info['name']}",
+        description=store_info['description'],
+        color=store_info['color'],
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="🔢 超商繳費代碼", value=f"```{payment_info['payment_code']}```", inline=False)
+    embed.add_field(
+        name="📋 訂單資訊",
+        value=f"**🆔 訂單編號:** `{payment_info['trade_no']}`\n**🛍️ 商品名稱:** {payment_info['item_name']}\n**💰 交易金額:** NT$ {payment_info['total_amount']:,}\n**🏪 指定超商:** {store_info['name']}",
+        inline=False
+    )
+    embed.add_field(
+        name="⏰ 時間資訊",
+        value=f"**📅 訂單產生時間:** {payment_info['create_time']}\n**⏳ 訂單有效期限:** {payment_info['expire_date']}\n**❌ 訂單失效時間:** {payment_info['expire_time']}",
+        inline=False
+    )
+    add_instructions(embed, store_type, store_info)
+    embed.set_footer(text="建立者: tester")
+    return embed
+
+
+def legacy_store_embed(store_type):
+    return store_embed(store_type, legacy_store_info(store_type), legacy_add_store_instructions)
+
+
+def current_store_embed(store_type):
+    return store_embed(store_type, get_store_info(store_type), lambda embed, store_type, _: add_store_instructions(embed, store_type))
+
+
+def legacy_payment_instructions(embed, payment_method, store_type):
+    """原本 /建立付款單 超商代碼的說明欄位（其他付款方式只有字串常數，兩種寫法相同）"""
+    if payment_method == 'CVS':
+        if store_type == "ALL":
+            embed.add_field(
+                name="🏪 繳費步驟",
+                value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
+                inline=False
+            )
+        elif store_type == "SEVEN":
+            embed.add_field(
+                name="📱 ibon機台繳費步驟",
+                value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
+                inline=False
+            )
+        else:
+            embed.add_field(name=f"🏪 繳費步驟", value=legacy_store_steps(store_type or "ALL"), inline=False)
+
+
+def timed(builds, count, repeat):
+    """交錯執行各個 build(i) 各 count 次並重複 repeat 輪，回傳每個 build 最快一輪的平均微秒數"""
+    best = [float('inf')] * len(builds)
+    for _ in range(repeat):
+        for index, build in enumerate(builds):
+            elapsed = timeit.timeit(lambda: [build(i) for i in range(count)], number=1)
+            best[index] = min(best[index], elapsed / count * 1_000_000)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    cvs_stores = ['FAMILY', 'HILIFE', 'OK']
+
+    # 確認兩種寫法產生的內容完全相同
+    for store_type in STORE_TYPES:
+        legacy = legacy_store_embed(store_type).to_dict()
+        current = current_store_embed(store_type).to_dict()
+        legacy.pop('timestamp')
+        current.pop('timestamp')
+        assert legacy == current, store_type
+    for store_type in cvs_stores:
+        legacy, current = discord.Embed(), discord.Embed()
+        legacy_payment_instructions(legacy, 'CVS', store_type)
+        add_payment_instructions(current, 'CVS', store_type)
+        assert legacy.to_dict() == current.to_dict(), store_type
+
+    results = [
+        ("超商資訊查詢", *timed([
+            lambda i: legacy_store_info(STORE_TYPES[i % 5]),
+            lambda i: get_store_info(STORE_TYPES[i % 5]),
+        ], count, repeat)),
+        ("建立繳費單嵌入訊息", *timed([
+            lambda i: legacy_store_embed(STORE_TYPES[i % 5]),
+            lambda i: current_store_embed(STORE_TYPES[i % 5]),
+        ], count, repeat)),
+        ("超商代碼說明欄位", *timed([
+            lambda i: legacy_payment_instructions(discord.Embed(), 'CVS', cvs_stores[i % 3]),
+            lambda i: add_payment_instructions(discord.Embed(), 'CVS', cvs_stores[i % 3]),
+        ], count, repeat)),
+    ]
+
+    print(f"次數: {count}，重複 {repeat} 輪取最快")
+    for name, before, after in results:
+        print(f"{name}: 每次建立字典 {before:7.2f}µs → 模組常數 {after:7.2f}µs  ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
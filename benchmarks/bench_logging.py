@@ -0,0 +1,156 @@
+"""日誌管線效能測試
+
+模擬每筆訂單記錄多筆日誌的指令流程，比較直接使用 RotatingFileHandler（舊做法）
+與 LogPipeline（佇列 + 背景執行緒）時的訂單吞吐量與事件迴圈最長阻塞時間。
+日誌檔案寫入暫存目錄，並使用較小的輪轉大小以包含輪轉成本；
+可另外指定每次寫入的模擬延遲，代表較慢的磁碟或終端。
+
+預設使用 block 策略，兩種做法寫入的日誌筆數相同；使用 drop 時吞吐量旁會列出捨棄的筆數，
+並以實際寫入檔案的行數確認。
+
+執行方式: python benchmarks/bench_logging.py [訂單數量] [block|drop] [寫入延遲(毫秒)]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import LogPipeline  # noqa: E402
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LINES_PER_ORDER = 6
+CONCURRENCY = 50
+
+
+class SlowRotatingFileHandler(RotatingFileHandler):
+    """每次寫入額外等待 write_latency 秒，模擬較慢的磁碟"""
+
+    write_latency = 0.0
+
+    def emit(self, record):
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        super().emit(record)
+
+
+def file_handler(directory):
+    handler = SlowRotatingFileHandler(
+        os.path.join(directory, 'bot.log'),
+        maxBytes=1024 * 1024,
+        backupCount=3,
+        encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+async def order(logger, index):
+    """模擬一筆訂單：每個階段記錄日誌並讓出事件迴圈"""
+    trade_no = f"DC{index:018d}"
+    for stage in range(LINES_PER_ORDER):
+        logger.info(f"訂單 {trade_no} 階段 {stage}: 使用者 loadtest{index} 金額 NT$1500 付款方式 CREDIT")
+        await asyncio.sleep(0)
+
+
+async def monitor(stalls, stop):
+    """量測事件迴圈排程延遲"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start - 0.001)
+
+
+async def run_orders(logger, count):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    stalls = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(monitor(stalls, stop))
+
+    async def limited(index):
+        async with semaphore:
+            await order(logger, index)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return count / elapsed, max(stalls, default=0.0)
+
+
+def written_lines(directory):
+    """計算日誌檔案（含輪轉備份）實際寫入的行數"""
+    total = 0
+    for name in os.listdir(directory):
+        if name.startswith('bot.log'):
+            with open(os.path.join(directory, name), 'rb') as file:
+                total += sum(1 for _ in file)
+    return total
+
+
+def bench(name, count, setup):
+    """回傳 (每秒訂單數, 事件迴圈最長阻塞, 關閉時寫入時間, 寫入行數)"""
+    with tempfile.TemporaryDirectory() as directory:
+        logger = logging.getLogger(f"bench.{name}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler, teardown = setup(directory)
+        logger.addHandler(handler)
+        try:
+            rate, stall = asyncio.run(run_orders(logger, count))
+            flush_start = time.perf_counter()
+            teardown()
+            flush = time.perf_counter() - flush_start
+        finally:
+            logger.removeHandler(handler)
+        lines = written_lines(directory)
+    return rate, stall, flush, lines
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    policy = sys.argv[2] if len(sys.argv) > 2 else 'block'
+    SlowRotatingFileHandler.write_latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 0.05) / 1000
+
+    def direct(directory):
+        handler = file_handler(directory)
+        return handler, handler.close
+
+    pipelines = []
+
+    def queued(directory):
+        pipeline = LogPipeline([file_handler(directory)], {'queue_policy': policy})
+        pipeline.start()
+        pipelines.append(pipeline)
+
+        def teardown():
+            pipeline.stop()
+            for handler in pipeline.handlers:
+                handler.close()
+        return pipeline.handler, teardown
+
+    before = bench('direct', count, direct)
+    after = bench('queued', count, queued)
+    dropped = pipelines[0].handler.dropped
+    expected = count * LINES_PER_ORDER
+
+    print(f"訂單數量: {count}（每筆 {LINES_PER_ORDER} 行日誌，佇列策略: {policy}，"
+          f"寫入延遲 {SlowRotatingFileHandler.write_latency * 1000:.2f}ms）")
+    for name, (rate, stall, flush, lines) in (("直接寫檔", before), ("佇列管線", after)):
+        print(f"{name}: {rate:10.0f} 筆/秒  事件迴圈最長阻塞 {stall * 1000:7.2f}ms  關閉時寫入 {flush * 1000:7.2f}ms"
+              f"  寫入 {lines}/{expected} 行")
+    # 捨棄日誌時吞吐量不是在相同寫入量下比較，捨棄筆數與吞吐量並列
+    print(f"吞吐量: {after[0] / before[0]:.1f}x（佇列管線寫入 {after[3]}/{expected} 行，捨棄 {dropped} 行）")
+    # 佇列只是延後寫入，含關閉時寫完剩餘日誌的總時間才是磁碟實際的處理量
+    total_before = count / before[0] + before[2]
+    total_after = count / after[0] + after[2]
+    print(f"含關閉時寫入的總時間: {total_before * 1000:.0f}ms → {total_after * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""效能指標記錄成本測試
+
+量測各種記錄方式每次的平均成本（含標籤查詢與累積過多時的批次合併），並以多個執行緒同時記錄，
+確認讀取時的總次數與實際記錄次數相同（不會因為沒有鎖而遺失記錄）。
+作為對照，也量測每次記錄都取得鎖的寫法。
+
+執行方式: python benchmarks/bench_metrics.py [次數] [預算(微秒)]
+超出預算時以狀態碼1結束。
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import DEFAULT_BUCKETS, MetricsRegistry  # noqa: E402
+
+THREADS = 4
+
+
+class LockedHistogram:
+    """對照組：每次記錄都取得鎖"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+
+def per_op(func, count):
+    """每次呼叫的平均耗時(微秒)，扣除空迴圈成本"""
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    empty = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return max(0.0, time.perf_counter() - start - empty) / count * 1e6
+
+
+def bench_single(count):
+    registry = MetricsRegistry()
+    histogram = registry.histogram('bench_seconds', "測試", ('command', 'status'))
+    plain = registry.histogram('bench_plain_seconds', "測試")
+    counter = registry.counter('bench_total', "測試", ('payment_method', 'store_type'))
+    series = histogram.labels('建立繳費單', 'ok')
+    locked = LockedHistogram(DEFAULT_BUCKETS)
+
+    def timed():
+        with series.time():
+            pass
+
+    return [
+        ('histogram.labels(...).observe', per_op(lambda: histogram.labels('建立繳費單', 'ok').observe(0.042), count)),
+        ('series.observe（預先取得標籤）', per_op(lambda: series.observe(0.042), count)),
+        ('histogram.observe（無標籤）', per_op(lambda: plain.observe(0.042), count)),
+        ('counter.labels(...).inc', per_op(lambda: counter.labels('CVS', 'SEVEN').inc(), count)),
+        ('with series.time()', per_op(timed, count)),
+        ('對照：每次取得鎖', per_op(lambda: locked.observe(0.042), count)),
+    ]
+
+
+def bench_threads(count):
+    """多執行緒同時記錄，回傳 (每次耗時微秒, 讀取到的次數, 預期次數, 輸出位元組)"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram('bench_seconds', "測試", ('command',))
+    per_thread = count // THREADS
+    barrier = threading.Barrier(THREADS + 1)
+
+    def worker(index):
+        observe = histogram.labels(f'cmd{index % 2}').observe
+        barrier.wait()
+        for i in range(per_thread):
+            observe(i * 1e-6)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    # 記錄期間同時讀取，模擬抓取
+    while any(thread.is_alive() for thread in threads):
+        registry.render()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    output = registry.render()
+    observed = sum(
+        int(line.rsplit(' ', 1)[1]) for line in output.splitlines()
+        if line.startswith('bench_seconds_count')
+    )
+    return elapsed / (per_thread * THREADS) * 1e6, observed, per_thread * THREADS, len(output.encode('utf-8'))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    print(f"單執行緒，每項 {count:,} 次")
+    print(f"{'記錄方式':<32}{'每次(微秒)':>12}")
+    results = bench_single(count)
+    for name, micros in results:
+        print(f"{name:<32}{micros:>12.3f}")
+
+    micros, observed, expected, size = bench_threads(count)
+    print(f"\n{THREADS} 個執行緒同時記錄並持續讀取: 平均 {micros:.3f} 微秒/次（含GIL競爭）")
+    print(f"讀取到 {observed:,} / {expected:,} 次，輸出 {size:,} 位元組")
+
+    worst = max(micros for name, micros in results if not name.startswith('對照'))
+    ok = observed == expected and worst <= budget
+    print(f"\n最慢的記錄方式 {worst:.3f} 微秒 / 預算 {budget:.1f} 微秒 {'✅' if ok else '❌'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""權限檢查效能測試
+
+模擬擁有40個身分組的成員與12個允許的身分組，比較舊版逐一比對清單的檢查
+與 PermissionService（預先建立的frozenset，每次以成員目前的身分組比對）每秒可處理的檢查次數。
+
+執行方式: python benchmarks/bench_permissions.py [次數]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from permission_service import PermissionService  # noqa: E402
+
+USER_ROLES = 40
+ALLOWED_ROLES = 12
+USERS = 500
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, user_id, roles):
+        self.id = user_id
+        self.roles = roles
+
+
+class FakeInteraction:
+    def __init__(self, user):
+        self.user = user
+        self.guild_id = 1
+
+
+def legacy_check(interaction, allowed_roles):
+    """舊版 check_permissions"""
+    if not interaction.user.roles:
+        return False
+    user_role_ids = [role.id for role in interaction.user.roles]
+    return any(role_id in allowed_roles for role_id in user_role_ids)
+
+
+def run(check, interactions, count):
+    start = time.perf_counter()
+    for i in range(count):
+        check(interactions[i % len(interactions)])
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    rng = random.Random(42)
+    role_ids = [10 ** 17 + i for i in range(1000)]
+    allowed_roles = rng.sample(role_ids, ALLOWED_ROLES)
+    interactions = [
+        FakeInteraction(FakeUser(user_id, [FakeRole(role_id) for role_id in rng.sample(role_ids, USER_ROLES)]))
+        for user_id in range(USERS)
+    ]
+
+    service = PermissionService(allowed_roles, config={'command_roles': {'批次查詢付款狀態': allowed_roles[:3]}})
+    for interaction in interactions:
+        assert service.check(interaction) == legacy_check(interaction, allowed_roles)
+
+    legacy_rate = run(lambda interaction: legacy_check(interaction, allowed_roles), interactions, count)
+    service_rate = run(service.check, interactions, count)
+    command_rate = run(lambda interaction: service.check(interaction, '批次查詢付款狀態'), interactions, count)
+
+    print(f"次數: {count}  使用者: {USERS}  每人身分組: {USER_ROLES}  允許身分組: {ALLOWED_ROLES}")
+    print(f"舊版清單比對:          {legacy_rate:12.0f} 次/秒")
+    print(f"PermissionService:     {service_rate:12.0f} 次/秒  ({service_rate / legacy_rate:.1f}x)")
+    print(f"個別指令允許清單:      {command_rate:12.0f} 次/秒  ({command_rate / legacy_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""CheckMacValue簽章效能測試
+
+比較原本逐次組字串、整段URL編碼的做法與 CheckMacSigner，
+並確認兩者產生的檢查碼完全相同。
+
+執行方式: python benchmarks/bench_signer.py [訂單數量]
+"""
+import hashlib
+import os
+import sys
+import time
+import urllib.parse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecpay_signer import CheckMacSigner  # noqa: E402
+
+HASH_KEY = "pwFHCqoQZGmho4w6"
+HASH_IV = "EkRm7iFT261dpevs"
+
+
+def legacy_check_mac_value(params):
+    """原本 ECPayHandler.generate_check_mac_value 的實作（作為對照）"""
+    if 'CheckMacValue' in params:
+        del params['CheckMacValue']
+    sorted_params = sorted(params.items())
+    query_string = '&'.join([f"{key}={value}" for key, value in sorted_params])
+    raw_string = f"HashKey={HASH_KEY}&{query_string}&HashIV={HASH_IV}"
+    encoded_string = urllib.parse.quote_plus(raw_string, safe='').lower()
+    return hashlib.sha256(encoded_string.encode('utf-8')).hexdigest().upper()
+
+
+def build_orders(count):
+    """產生模擬訂單參數"""
+    methods = ['Credit', 'WebATM', 'ATM', 'CVS', 'BARCODE', 'GooglePay', 'ApplePay']
+    now = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+    orders = []
+    for i in range(count):
+        orders.append({
+            'MerchantID': '3002607',
+            'MerchantTradeNo': f"DC{i:018d}",
+            'MerchantTradeDate': now,
+            'PaymentType': 'aio',
+            'TotalAmount': str(100 + i % 5000),
+            'TradeDesc': f"測試交易 #{i % 20} (特價!)",
+            'ItemName': f"商品 {i % 50}*1 & 贈品~",
+            'ReturnURL': 'https://your-domain.com/payment_info',
+            'ChoosePayment': methods[i % len(methods)],
+            'EncryptType': '1',
+            'ClientRedirectURL': 'https://your-domain.com/redirect',
+        })
+    return orders
+
+
+def measure(func, orders):
+    start = time.perf_counter()
+    result = func(orders)
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    orders = build_orders(count)
+    signer = CheckMacSigner(HASH_KEY, HASH_IV)
+
+    legacy_time, legacy = measure(lambda items: [legacy_check_mac_value(p.copy()) for p in items], orders)
+    signer_time, signed = measure(lambda items: [signer.sign(p) for p in items], orders)
+    batch_time, batch = measure(signer.sign_many, orders)
+
+    if legacy != signed or legacy != batch:
+        mismatches = sum(1 for a, b in zip(legacy, signed) if a != b)
+        print(f"❌ 檢查碼不一致: {mismatches}/{count}")
+        sys.exit(1)
+
+    print(f"✅ {count} 筆訂單檢查碼完全一致")
+    print(f"原本實作:        {legacy_time * 1e6 / count:8.2f} µs/筆")
+    print(f"CheckMacSigner: {signer_time * 1e6 / count:8.2f} µs/筆  ({legacy_time / signer_time:.2f}x)")
+    print(f"sign_many():    {batch_time * 1e6 / count:8.2f} µs/筆  ({legacy_time / batch_time:.2f}x)")
+    print(f"快取統計: {signer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""交易編號產生效能測試
+
+比較舊做法（datetime格式化 + uuid4，26字元）與 TradeNoGenerator（20字元）每秒可產生的數量。
+
+執行方式: python benchmarks/bench_trade_no.py [數量]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trade_no import TradeNoGenerator  # noqa: E402
+
+
+def legacy_trade_no():
+    """舊版交易編號產生方式"""
+    return f"DC{datetime.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4())[:8]}"
+
+
+def run(generate, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        generate()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        generator = TradeNoGenerator({'state_file': os.path.join(directory, 'trade_no_{node_id}.state')})
+        legacy_rate = run(legacy_trade_no, count)
+        generator_rate = run(generator.next, count)
+        sample = generator.next()
+
+    print(f"數量: {count}")
+    print(f"舊版 (uuid4):       {legacy_rate:12.0f} 筆/秒  長度 {len(legacy_trade_no())}  例: {legacy_trade_no()}")
+    print(f"TradeNoGenerator:   {generator_rate:12.0f} 筆/秒  長度 {len(sample)}  例: {sample}  ({generator_rate / legacy_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""WebUI等待配置時的CPU使用量
+
+比較等待配置期間（尚未送出表單）程序消耗的CPU時間:
+    legacy   舊版迴圈（未 await 的 asyncio.sleep，實際上不會等待）
+    flask    Flask在背景執行緒，主執行緒等待 ready 事件
+    aiohttp  WebUI在事件迴圈上，協程等待 asyncio.Event
+
+等待期間結束時以HTTP送出有效配置，量測從送出到主程式繼續的延遲。
+
+執行方式: python benchmarks/bench_webui_idle.py [等待秒數]
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.request
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web_ui import AsyncWebUI, start_web_ui, wait_for_config  # noqa: E402
+
+FORM = {
+    'discord_token': 'token',
+    'role_ids': '123',
+    'merchant_id': '3002607',
+    'hash_key': 'pwFHCqoQZGmho4w6',
+    'hash_iv': 'EkRm7iFT261dpevs',
+    'use_test_env': True,
+    'expire_days': 7,
+}
+
+
+def placeholder_config():
+    return {
+        'DISCORD_BOT_TOKEN': 'YOUR_DISCORD_BOT_TOKEN_HERE',
+        'ECPAY_CONFIG': {'MerchantID': 'YOUR_MERCHANT_ID_HERE', 'HashKey': 'YOUR_HASH_KEY_HERE', 'HashIV': 'YOUR_HASH_IV_HERE'},
+    }
+
+
+def make_validate(runtime_config):
+    """與 main.check_config_validity 相同的檢查"""
+    def validate():
+        if not runtime_config.get('DISCORD_BOT_TOKEN') or runtime_config['DISCORD_BOT_TOKEN'] == "YOUR_DISCORD_BOT_TOKEN_HERE":
+            return False, "請設定 DISCORD_BOT_TOKEN"
+        for field in ('MerchantID', 'HashKey', 'HashIV'):
+            value = runtime_config.get('ECPAY_CONFIG', {}).get(field)
+            if not value or value.startswith("YOUR_"):
+                return False, f"請設定 ECPay {field}"
+        return True, "配置有效"
+    return validate
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post_config(port):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/api/config', data=json.dumps(FORM).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def submit_later(port, delay, submitted):
+    def submit():
+        time.sleep(delay)
+        submitted.append(time.perf_counter())
+        post_config(port)
+    threading.Thread(target=submit, daemon=True).start()
+
+
+def bench_legacy(duration):
+    runtime_config = placeholder_config()
+    validate = make_validate(runtime_config)
+    submitted = []
+
+    def submit():
+        time.sleep(duration)
+        submitted.append(time.perf_counter())
+        runtime_config.update({'DISCORD_BOT_TOKEN': 'token', 'ECPAY_CONFIG': {'MerchantID': '1', 'HashKey': '1', 'HashIV': '1'}})
+    threading.Thread(target=submit, daemon=True).start()
+
+    cpu = time.process_time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        while True:
+            is_valid, message = validate()
+            if is_valid:
+                break
+            asyncio.sleep(2)
+    return time.process_time() - cpu, time.perf_counter() - submitted[0]
+
+
+def bench_flask(duration):
+    runtime_config = placeholder_config()
+    port = free_port()
+    handoff = start_web_ui(runtime_config, make_validate(runtime_config), {'host': '127.0.0.1', 'port': port, 'debug': False})
+    time.sleep(0.5)
+    submitted = []
+    submit_later(port, duration, submitted)
+
+    cpu = time.process_time()
+    wait_for_config(handoff)
+    resumed = time.perf_counter()
+    # CPU時間包含Flask處理送出請求的時間
+    return time.process_time() - cpu, resumed - submitted[0]
+
+
+def bench_aiohttp(duration):
+    runtime_config = placeholder_config()
+    port = free_port()
+
+    async def run():
+        web_ui = AsyncWebUI(runtime_config, make_validate(runtime_config), {'host': '127.0.0.1', 'port': port})
+        await web_ui.start()
+        submitted = []
+        submit_later(port, duration, submitted)
+        cpu = time.process_time()
+        await web_ui.ready.wait()
+        resumed = time.perf_counter()
+        used = time.process_time() - cpu
+        await web_ui.stop()
+        return used, resumed - submitted[0]
+
+    return asyncio.run(run())
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    print(f"等待 {duration:.0f} 秒後送出配置")
+    print(f"{'模式':<10}{'CPU時間(秒)':>14}{'CPU使用率':>12}{'繼續延遲(ms)':>16}")
+    for name, bench in (('legacy', bench_legacy), ('flask', bench_flask), ('aiohttp', bench_aiohttp)):
+        cpu, latency = bench(duration)
+        print(f"{name:<10}{cpu:>14.3f}{cpu / duration:>12.1%}{latency * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""多程序工作者模式擴充性測試
+
+以 BrokerOrderExecutor 搭配不同數量的工作者程序建立訂單（含簽章、表單產生與
+訂單資料庫寫入），量測每秒訂單數隨工作者數量的變化，並與單程序執行緒池比較。
+工作佇列與訂單資料庫建立於暫存目錄，可完全離線執行。
+
+執行方式: python benchmarks/bench_workers.py [訂單數量] [工作者數量列表，例如 1,2,4]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecpay_handler import ECPayHandler  # noqa: E402
+from order_broker import BrokerOrderExecutor  # noqa: E402
+from order_executor import OrderExecutor  # noqa: E402
+from order_store import OrderStore  # noqa: E402
+from trade_no import TradeNoGenerator  # noqa: E402
+
+CONCURRENCY = 200
+ITEM_NAME = "測試商品#" * 20
+
+
+async def submit_orders(executor, generator, count, record=None):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    owner = {'user_id': 1, 'guild_id': 2, 'channel_id': 3}
+
+    async def one():
+        async with semaphore:
+            _, _, order_info = await executor.generate_payment_url(
+                trade_no=generator.next(),
+                total_amount=1500,
+                trade_desc="擴充性測試",
+                item_name=ITEM_NAME,
+                payment_method="CVS",
+                store_type="SEVEN",
+                as_bytes=True,
+                owner=owner,
+            )
+            if record:
+                record(order_info, **owner)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+async def warm_up(executor, generator):
+    # 等待工作者程序啟動完成
+    await submit_orders(executor, generator, 50)
+
+
+def bench_thread(directory, count, generator):
+    handler = ECPayHandler()
+    store = OrderStore({'path': os.path.join(directory, 'thread_orders.db')})
+    executor = OrderExecutor(handler, {'mode': 'thread', 'max_pending': count})
+    try:
+        return asyncio.run(submit_orders(executor, generator, count, store.record_order))
+    finally:
+        executor.shutdown()
+        store.close()
+
+
+def bench_broker(directory, count, workers, generator):
+    handler = ECPayHandler()
+    executor = BrokerOrderExecutor(
+        handler,
+        {
+            'path': os.path.join(directory, f'broker_{workers}.db'),
+            'workers': workers,
+            'max_pending': count,
+        },
+        store_config={'enabled': True, 'path': os.path.join(directory, f'orders_{workers}.db')},
+    )
+    executor.start()
+
+    async def run():
+        await warm_up(executor, generator)
+        return await submit_orders(executor, generator, count)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    worker_counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4]
+
+    with tempfile.TemporaryDirectory() as directory:
+        generator = TradeNoGenerator({'state_file': os.path.join(directory, 'trade_no.state')})
+        thread_rate = bench_thread(directory, count, generator)
+        print(f"訂單數量: {count}  CPU: {os.cpu_count()}")
+        print(f"單程序執行緒池:  {thread_rate:8.0f} 筆/秒")
+        for workers in worker_counts:
+            rate = bench_broker(directory, count, workers, generator)
+            print(f"工作者 x{workers}:       {rate:8.0f} 筆/秒  ({rate / thread_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""本機ECPay模擬伺服器
+
+模擬 QueryTradeInfo 回應（含CheckMacValue），可用於離線測試 ECPayClient
+與效能測試（benchmarks/bench_ecpay_client.py）。未登記的交易編號回傳「查無交易」。
+
+執行方式: python benchmarks/ecpay_stub.py [port]
+之後將 ECPayClient 的 query_url 指向 http://127.0.0.1:<port>/Cashier/QueryTradeInfo/V5
+"""
+import asyncio
+import os
+import sys
+import urllib.parse
+from datetime import datetime
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecpay_signer import CheckMacSigner  # noqa: E402
+
+QUERY_PATH = '/Cashier/QueryTradeInfo/V5'
+STUB_MERCHANT_ID = "3002607"
+STUB_HASH_KEY = "pwFHCqoQZGmho4w6"
+STUB_HASH_IV = "EkRm7iFT261dpevs"
+
+
+class ECPayStub:
+    """ECPay模擬伺服器狀態"""
+
+    def __init__(self, signer=None, merchant_id=STUB_MERCHANT_ID, delay=0.0, fail_first=0, fail_status=500,
+                 tamper=False):
+        self.signer = signer or CheckMacSigner(STUB_HASH_KEY, STUB_HASH_IV)
+        self.merchant_id = merchant_id
+        self.trades = {}
+        self.delay = delay              # 每次回應前的延遲(秒)
+        self.fail_first = fail_first    # 前N次請求回傳錯誤（測試重試）
+        self.fail_status = fail_status  # 前N次請求回傳的HTTP狀態碼
+        self.tamper = tamper            # 回應的CheckMacValue故意錯誤（測試驗證）
+        self.requests = 0
+        self.active = 0                 # 處理中的請求數
+        self.max_active = 0             # 同時處理中的請求數最大值
+
+    def add_trade(self, trade_no, amount, status='0', payment_type='CVS_CVS'):
+        """登記模擬交易"""
+        self.trades[trade_no] = {
+            'TradeAmt': str(amount),
+            'TradeStatus': status,
+            'PaymentType': payment_type,
+            'PaymentDate': datetime.now().strftime('%Y/%m/%d %H:%M:%S') if status == '1' else '',
+        }
+
+    async def query_trade_info(self, request):
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await self.respond(request, self.requests)
+        finally:
+            self.active -= 1
+
+    async def respond(self, request, number):
+        # 先讀取請求內容，用戶端在延遲期間逾時離開時不影響讀取
+        form = dict(await request.post())
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if number <= self.fail_first:
+            return web.Response(status=self.fail_status, text='Stub Error')
+
+        if not self.signer.verify(form):
+            return web.Response(text='CheckMacValue Error')
+
+        trade_no = form.get('MerchantTradeNo', '')
+        trade = self.trades.get(trade_no, {'TradeStatus': '10200047', 'TradeAmt': '0'})
+        result = {
+            'MerchantID': self.merchant_id,
+            'MerchantTradeNo': trade_no,
+            'TradeNo': f"2{abs(hash(trade_no)) % 10 ** 19:019d}",
+            **trade,
+        }
+        result['CheckMacValue'] = self.signer.sign(result)
+        if self.tamper:
+            result['CheckMacValue'] = result['CheckMacValue'][::-1]
+        return web.Response(text=urllib.parse.urlencode(result))
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post(QUERY_PATH, self.query_trade_info)
+        return app
+
+
+async def start_stub(stub, host='127.0.0.1', port=0):
+    """啟動模擬伺服器，回傳 (runner, base_url)"""
+    runner = web.AppRunner(stub.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    stub = ECPayStub()
+    stub.add_trade('DCPAID0000000001', 500, status='1')
+    stub.add_trade('DCPENDING0000001', 300, status='0')
+    print(f"ECPay模擬伺服器: http://127.0.0.1:{port}{QUERY_PATH}")
+    web.run_app(stub.create_app(), host='127.0.0.1', port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""斜線指令建立訂單的負載測試
+
+以模擬的 discord.Interaction 呼叫 PaymentCommands.create_payment_advanced，
+涵蓋全部八種付款方式，量測各階段延遲（p50/p95/p99）並輸出JSON報告，
+方便比較不同版本。followup發送以假物件代替，可完全離線執行。
+
+各階段定義:
+    validation  指令開始 → defer（權限與金額檢查）
+    trade_no    defer → 送出建立訂單工作（交易編號產生）
+    signing     CheckMacValue簽章
+    html_build  付款表單HTML產生
+    order_build 建立訂單工作總時間（含排隊、簽章、HTML）
+    embed_build 建立訂單完成 → 開始發送（嵌入訊息組裝）
+    file_send   followup發送（含附件）
+    total       整個指令
+
+執行方式: python benchmarks/load_test.py --orders 200 --concurrency 20 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BOT_VERSION  # noqa: E402
+from ecpay_handler import ECPayHandler  # noqa: E402
+from order_executor import OrderExecutor  # noqa: E402
+from commands.payment_commands import PaymentCommands  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+
+ALLOWED_ROLE_ID = 1000
+STAGES = ['validation', 'trade_no', 'signing', 'html_build', 'order_build', 'embed_build', 'file_send', 'total']
+
+PAYMENT_METHODS = {
+    'CREDIT': {'amount': 1500},
+    'CREDIT_INSTALLMENT': {'amount': 36000, 'installment': 12},
+    'WEBATM': {'amount': 2000},
+    'ATM': {'amount': 3000},
+    'CVS': {'amount': 500, 'store': 'SEVEN'},
+    'BARCODE': {'amount': 800, 'store': 'ALL'},
+    'GOOGLEPAY': {'amount': 1200},
+    'APPLEPAY': {'amount': 1200},
+}
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"loadtest{user_id}"
+        self.display_name = self.name
+        self.roles = [FakeRole(ALLOWED_ROLE_ID + i) for i in range(5)]
+
+    def __str__(self):
+        return self.name
+
+
+class FakeResponse:
+    def __init__(self, trace):
+        self.trace = trace
+
+    async def defer(self, **kwargs):
+        self.trace['deferred'] = time.perf_counter()
+
+    async def send_message(self, *args, **kwargs):
+        self.trace['rejected'] = True
+
+
+class FakeFollowup:
+    def __init__(self, trace, send_latency, report):
+        self.trace = trace
+        self.send_latency = send_latency
+        self.report = report
+
+    async def send(self, content=None, embed=None, file=None, **kwargs):
+        self.trace['send_start'] = time.perf_counter()
+        if file is not None:
+            # 模擬上傳：讀取整個附件
+            self.report['bytes_uploaded'] += len(file.fp.read())
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        self.trace['send_end'] = time.perf_counter()
+
+
+class FakeInteraction:
+    def __init__(self, user_id, trace, send_latency, report):
+        self.user = FakeUser(user_id)
+        self.guild_id = 1
+        self.channel_id = 2
+        self.response = FakeResponse(trace)
+        self.followup = FakeFollowup(trace, send_latency, report)
+
+
+class FakeBot:
+    """只提供指令模組需要的屬性"""
+
+    def __init__(self, order_executor):
+        self.order_executor = order_executor
+        # 負載測試量測吞吐量，不套用使用頻率限制
+        self.rate_limiter = RateLimiter({'enabled': False, 'max_concurrent_orders': 0})
+        self.guilds = []
+        self.latency = 0.0
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples):
+    """將秒數樣本轉為毫秒統計"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+    }
+
+
+def instrument(handler, executor, traces):
+    """包裝簽章、HTML產生與建立訂單工作以記錄階段時間"""
+    signer = handler.signer
+    renderer = handler.form_renderer
+    original_sign = signer.sign
+    original_render = renderer.render
+    original_build = executor.generate_payment_url
+
+    def timed_sign(params):
+        start = time.perf_counter()
+        try:
+            return original_sign(params)
+        finally:
+            traces[params['MerchantTradeNo']]['signing'] = time.perf_counter() - start
+
+    def timed_render(params, as_bytes=False):
+        start = time.perf_counter()
+        try:
+            return original_render(params, as_bytes=as_bytes)
+        finally:
+            traces[params['MerchantTradeNo']]['html_build'] = time.perf_counter() - start
+
+    async def timed_build(**kwargs):
+        trace = traces[kwargs['trade_no']] = traces.pop(asyncio.current_task())
+        trace['build_start'] = time.perf_counter()
+        try:
+            return await original_build(**kwargs)
+        finally:
+            trace['build_end'] = time.perf_counter()
+
+    signer.sign = timed_sign
+    renderer.render = timed_render
+    executor.generate_payment_url = timed_build
+
+
+async def run_order(cog, method, options, user_id, traces, send_latency, report):
+    trace = traces[asyncio.current_task()] = {'method': method}
+    interaction = FakeInteraction(user_id, trace, send_latency, report)
+    payment_method = discord.app_commands.Choice(name=method, value=method)
+    store = discord.app_commands.Choice(name=options['store'], value=options['store']) if 'store' in options else None
+    installment = discord.app_commands.Choice(name=str(options['installment']), value=options['installment']) if 'installment' in options else None
+
+    trace['start'] = time.perf_counter()
+    await cog.create_payment_advanced.callback(
+        cog, interaction, options['amount'], "負載測試", payment_method, "測試商品", store, installment
+    )
+    trace['end'] = time.perf_counter()
+    return trace
+
+
+def collect(traces):
+    """將每筆訂單的時間點轉為各階段延遲"""
+    per_method = defaultdict(lambda: defaultdict(list))
+    for trace in traces:
+        if 'send_end' not in trace:
+            continue
+        stages = {
+            'validation': trace['deferred'] - trace['start'],
+            'trade_no': trace['build_start'] - trace['deferred'],
+            'signing': trace.get('signing', 0.0),
+            'html_build': trace.get('html_build', 0.0),
+            'order_build': trace['build_end'] - trace['build_start'],
+            'embed_build': trace['send_start'] - trace['build_end'],
+            'file_send': trace['send_end'] - trace['send_start'],
+            'total': trace['end'] - trace['start'],
+        }
+        for stage, value in stages.items():
+            per_method[trace['method']][stage].append(value)
+            per_method['ALL'][stage].append(value)
+    return {
+        method: {stage: summarize(stages[stage]) for stage in STAGES}
+        for method, stages in per_method.items()
+    }
+
+
+async def run(args):
+    handler = ECPayHandler()
+    executor = OrderExecutor(handler, {'mode': 'thread', 'max_pending': args.orders * len(PAYMENT_METHODS)})
+    runtime_config = {'ALLOWED_ROLE_IDS': [ALLOWED_ROLE_ID], 'ECPAY_CONFIG': handler.config}
+    cog = PaymentCommands(FakeBot(executor), handler, runtime_config)
+
+    raw_traces = {}
+    instrument(handler, executor, raw_traces)
+    report = {'bytes_uploaded': 0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(method, options, index):
+        async with semaphore:
+            return await run_order(cog, method, options, index, raw_traces, args.send_latency / 1000, report)
+
+    jobs = [
+        limited(method, options, index)
+        for index in range(args.orders)
+        for method, options in PAYMENT_METHODS.items()
+    ]
+    started = time.perf_counter()
+    traces = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    completed = sum(1 for trace in traces if 'send_end' in trace)
+    return {
+        'version': BOT_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'orders': len(traces),
+        'completed': completed,
+        'concurrency': args.concurrency,
+        'send_latency_ms': args.send_latency,
+        'elapsed_s': elapsed,
+        'orders_per_second': completed / elapsed if elapsed else 0.0,
+        'bytes_uploaded_per_order': report['bytes_uploaded'] / completed if completed else 0.0,
+        'stages': collect(traces),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="建立訂單負載測試")
+    parser.add_argument('--orders', type=int, default=100, help="每種付款方式的訂單數量")
+    parser.add_argument('--concurrency', type=int, default=20, help="同時執行的指令數量")
+    parser.add_argument('--send-latency', type=float, default=0.0, help="模擬followup發送延遲(毫秒)")
+    parser.add_argument('--output', help="JSON報告輸出路徑（預設輸出至終端）")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        overall = result['stages']['ALL']['total']
+        print(f"✅ {result['completed']}/{result['orders']} 筆訂單, {result['orders_per_second']:.0f} 筆/秒, "
+              f"p50 {overall['p50_ms']:.2f}ms, p99 {overall['p99_ms']:.2f}ms → {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
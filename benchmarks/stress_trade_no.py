@@ -0,0 +1,81 @@
+"""交易編號唯一性壓力測試
+
+以多個程序（各自的節點編號）、每個程序多個執行緒同時產生交易編號，
+並模擬快速重新啟動與系統時間倒退，確認所有編號皆不重複、
+長度不超過20字元且只包含英數字。
+
+執行方式: python benchmarks/stress_trade_no.py [程序數] [每個程序的執行緒數] [每個執行緒的數量] [重啟次數]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trade_no import MAX_LENGTH, TradeNoGenerator, parse_trade_no  # noqa: E402
+
+
+def generate_in_process(node_id, directory, threads, per_thread, restarts):
+    """在單一程序中模擬多次重新啟動，每次以多個執行緒產生交易編號"""
+    state_file = os.path.join(directory, 'trade_no_{node_id}.state')
+    results = []
+    frozen_now = time.time()
+    for restart in range(restarts):
+        # 偶數次重啟固定在同一毫秒，奇數次讓時間倒退一小時
+        now = frozen_now if restart % 2 == 0 else frozen_now - 3600
+        with mock.patch('trade_no.time.time', return_value=now):
+            generator = TradeNoGenerator({'node_id': node_id, 'state_file': state_file})
+
+        chunks = [[] for _ in range(threads)]
+
+        def work(chunk):
+            for _ in range(per_thread):
+                chunk.append(generator.next())
+
+        workers = [threading.Thread(target=work, args=(chunk,)) for chunk in chunks]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for chunk in chunks:
+            results.extend(chunk)
+        # 模擬程序結束，釋放節點編號
+        generator.close()
+    return results
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    per_thread = int(sys.argv[3]) if len(sys.argv) > 3 else 25000
+    restarts = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(generate_in_process, node_id, directory, threads, per_thread, restarts)
+                for node_id in range(processes)
+            ]
+            trade_nos = [trade_no for future in futures for trade_no in future.result()]
+        elapsed = time.perf_counter() - start
+
+    expected = processes * threads * per_thread * restarts
+    unique = len(set(trade_nos))
+    too_long = sum(1 for trade_no in trade_nos if len(trade_no) > MAX_LENGTH)
+    invalid = sum(1 for trade_no in trade_nos if not trade_no.isalnum() or parse_trade_no(trade_no) is None)
+
+    print(f"程序: {processes}  執行緒: {threads}  重啟: {restarts}  產生: {len(trade_nos)} 筆 ({elapsed:.2f}秒)")
+    print(f"不重複: {unique}  重複: {len(trade_nos) - unique}  超過{MAX_LENGTH}字元: {too_long}  格式錯誤: {invalid}")
+    if len(trade_nos) != expected or unique != expected or too_long or invalid:
+        print("❌ 交易編號唯一性測試失敗")
+        sys.exit(1)
+    print("✅ 所有交易編號皆唯一且符合格式")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from metrics import CALLBACKS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import CALLBACK_SERVER_CONFIG
+except ImportError:
+    CALLBACK_SERVER_CONFIG = {}
+
+DEFAULT_CALLBACK_CONFIG = {
+    "enabled": False,                  # 是否啟動回調接收伺服器
+    "host": "0.0.0.0",                 # 監聽位址
+    "port": 8080,                      # 監聽端口
+    "public_url": "",                  # 對外網址（例如 https://your-domain.com），用於自動設定ReturnURL
+    "return_path": "/ecpay/return",            # 付款結果通知路徑
+    "payment_info_path": "/ecpay/payment_info",  # 取號結果通知路徑
+    "max_queue": 10000,                # 待處理回調上限（超過時回覆失敗讓ECPay重送）
+    "workers": 2,                      # 處理回調的工作者數量
+    "dedupe_size": 20000,              # 記錄已處理回調的數量
+}
+
+# 付款結果 RtnCode
+PAYMENT_SUCCESS_CODES = {'1'}
+# 取號結果 RtnCode（ATM: 2, 超商代碼/條碼: 10100073）
+PAYMENT_INFO_SUCCESS_CODES = {'2', '10100073'}
+
+
+class CallbackReceiver:
+    """ECPay回調接收伺服器（aiohttp，與Bot共用事件迴圈）
+
+    收到通知時只解析表單並放入佇列後立即回覆 1|OK，檢查碼驗證、
+    資料庫更新與Discord通知都由背景工作者處理，不會拖慢HTTP回應。
+    同一筆 MerchantTradeNo+RtnCode 的重送只會處理一次。
+    """
+
+    def __init__(self, ecpay_handler, order_store=None, config=None, event_log=None):
+        self.ecpay_handler = ecpay_handler
+        self.order_store = order_store
+        self.event_log = event_log
+        self.config = {**DEFAULT_CALLBACK_CONFIG, **CALLBACK_SERVER_CONFIG, **(config or {})}
+        self.listeners = []
+        self._queue = None
+        self._processed = OrderedDict()
+        self._workers = []
+        self._notifications = set()
+        self._runner = None
+        self.stats = {
+            'received': 0,
+            'duplicates': 0,
+            'rejected': 0,
+            'invalid': 0,
+            'processed': 0,
+            'errors': 0,
+        }
+
+    def add_listener(self, listener):
+        """註冊處理完成後呼叫的協程函式 listener(kind, data)"""
+        self.listeners.append(listener)
+
+    @staticmethod
+    def dedupe_key(data):
+        return data.get('MerchantTradeNo', ''), data.get('RtnCode', '')
+
+    def create_app(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_post(self.config['return_path'], self.handle_return)
+        app.router.add_post(self.config['payment_info_path'], self.handle_payment_info)
+        return app
+
+    async def handle_return(self, request):
+        return await self._ingest(request, 'payment')
+
+    async def handle_payment_info(self, request):
+        return await self._ingest(request, 'payment_info')
+
+    async def _ingest(self, request, kind):
+        """接收回調：解析、去重、放入佇列後立即回覆"""
+        from aiohttp import web
+        data = dict(await request.post())
+        self.stats['received'] += 1
+
+        if self.dedupe_key(data) in self._processed:
+            self.stats['duplicates'] += 1
+            CALLBACKS.labels(kind, 'duplicate').inc()
+            return web.Response(text='1|OK')
+
+        try:
+            self._queue.put_nowait((kind, data))
+        except asyncio.QueueFull:
+            # 回覆失敗讓ECPay稍後重送
+            self.stats['rejected'] += 1
+            CALLBACKS.labels(kind, 'queue_full').inc()
+            logger.warning(f"回調佇列已滿，暫不處理: {data.get('MerchantTradeNo')}")
+            return web.Response(text='0|QueueFull')
+
+        return web.Response(text='1|OK')
+
+    async def _worker(self):
+        while True:
+            kind, data = await self._queue.get()
+            try:
+                await self.process(kind, data)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"處理ECPay回調時發生錯誤: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def process(self, kind, data):
+        """驗證並處理單筆回調"""
+        key = self.dedupe_key(data)
+        if key in self._processed:
+            self.stats['duplicates'] += 1
+            CALLBACKS.labels(kind, 'duplicate').inc()
+            return
+
+        verified = self.ecpay_handler.verify_callback(data)
+        if self.event_log:
+            self.event_log.callback_received(kind, data, verified)
+        CALLBACKS.labels(kind, 'verified' if verified else 'invalid').inc()
+        if not verified:
+            self.stats['invalid'] += 1
+            logger.warning(f"ECPay回調檢查碼驗證失敗: {data.get('MerchantTradeNo')}")
+            return
+
+        # 驗證成功後才記錄，避免偽造請求搶先佔用去重鍵
+        self._processed[key] = True
+        while len(self._processed) > self.config['dedupe_size']:
+            self._processed.popitem(last=False)
+
+        trade_no = data.get('MerchantTradeNo')
+        rtn_code = data.get('RtnCode', '')
+        logger.info(f"收到ECPay回調: {trade_no}, 類型: {kind}, RtnCode: {rtn_code}, 訊息: {data.get('RtnMsg', '')}")
+
+        if self.order_store:
+            if kind == 'payment':
+                status = 'paid' if rtn_code in PAYMENT_SUCCESS_CODES else 'failed'
+                self.order_store.update_status(trade_no, status, data.get('PaymentDate') or None)
+            elif rtn_code in PAYMENT_INFO_SUCCESS_CODES:
+                self.order_store.update_status(trade_no, 'awaiting_payment')
+
+        self.stats['processed'] += 1
+        for listener in self.listeners:
+            # 通知以獨立任務執行，緩慢的Discord請求不會阻塞佇列
+            task = asyncio.create_task(self._notify(listener, kind, data))
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+
+    async def _notify(self, listener, kind, data):
+        try:
+            await listener(kind, data)
+        except Exception as e:
+            logger.error(f"ECPay回調通知失敗: {e}")
+
+    @property
+    def queue_depth(self):
+        """等待處理的回調數量"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def callback_urls(self):
+        """取得對外的回調網址（未設定public_url時回傳None）"""
+        public_url = self.config['public_url'].rstrip('/')
+        if not public_url:
+            return None
+        return public_url + self.config['return_path'], public_url + self.config['payment_info_path']
+
+    async def start(self):
+        """啟動HTTP伺服器與背景工作者"""
+        # aiohttp.web 只在啟用回調伺服器時載入
+        from aiohttp import web
+        self._queue = asyncio.Queue(maxsize=self.config['max_queue'])
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.config['workers'])]
+
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config['host'], self.config['port'])
+        await site.start()
+        logger.info(f"ECPay回調伺服器已啟動: {self.config['host']}:{self.config['port']}")
+
+    async def stop(self):
+        """停止伺服器，處理完佇列中剩餘的回調"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._queue is not None:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._notifications:
+            await asyncio.gather(*self._notifications, return_exceptions=True)
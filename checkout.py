@@ -0,0 +1,187 @@
+"""付款頁面（以簽章且有期限的短網址提供ECPay自動送出表單）
+
+啟用後建立付款單時只發送嵌入訊息與連結按鈕，不再上傳付款HTML附件。
+使用者開啟連結時由此端點回傳表單，瀏覽器自動送出到ECPay。
+
+連結格式: {public_url}{path}/{交易編號}.{到期時間(16進位)}.{簽章}
+簽章為 HMAC-SHA256(secret, "交易編號.到期時間") 的前16位元組（base64url），
+無法猜測或延長期限；表單保存在記憶體，persist 時同時寫入訂單資料庫，重新啟動後連結仍可使用。
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import CHECKOUT_CONFIG
+except ImportError:
+    CHECKOUT_CONFIG = {}
+
+DEFAULT_CHECKOUT_CONFIG = {
+    "enabled": False,                  # 是否以付款頁面連結取代HTML附件
+    "host": "0.0.0.0",                 # 監聽位址
+    "port": 8081,                      # 監聽端口
+    "public_url": "",                  # 對外網址（例如 https://your-domain.com），未設定時不啟用
+    "path": "/pay",                    # 付款頁面路徑
+    "secret": "",                      # 連結簽章金鑰（未設定時每次啟動隨機產生，重新啟動後舊連結失效）
+    "ttl": 3600,                       # 連結有效時間(秒)
+    "max_forms": 10000,                # 記憶體中保留的表單數量
+    "persist": True,                   # 同時寫入訂單資料庫（需啟用訂單資料庫）
+    "purge_interval": 600,             # 刪除資料庫中過期表單的間隔(秒)
+}
+
+SIGNATURE_BYTES = 16
+
+# 付款頁面不應被快取、索引或將網址洩漏給其他網站
+RESPONSE_HEADERS = {
+    'Cache-Control': 'no-store',
+    'Referrer-Policy': 'no-referrer',
+    'X-Robots-Tag': 'noindex',
+}
+
+
+class CheckoutLinkError(Exception):
+    """付款頁面連結無效"""
+
+
+class CheckoutLinkExpired(CheckoutLinkError):
+    """付款頁面連結已過期"""
+
+
+class CheckoutLinks:
+    """付款頁面連結的簽章與驗證"""
+
+    def __init__(self, secret, ttl):
+        self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.ttl = ttl
+
+    def signature(self, trade_no, expires_hex):
+        digest = hmac.new(self.secret, f"{trade_no}.{expires_hex}".encode('utf-8'), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).rstrip(b'=').decode('ascii')
+
+    def token(self, trade_no, now=None):
+        """產生連結代碼，回傳 (代碼, 到期時間)"""
+        expires_at = int(now if now is not None else time.time()) + self.ttl
+        expires_hex = format(expires_at, 'x')
+        return f"{trade_no}.{expires_hex}.{self.signature(trade_no, expires_hex)}", expires_at
+
+    def verify(self, token, now=None):
+        """驗證連結代碼並回傳交易編號"""
+        try:
+            trade_no, expires_hex, signature = token.split('.')
+            expires_at = int(expires_hex, 16)
+        except ValueError:
+            raise CheckoutLinkError("連結格式錯誤") from None
+        # 先驗證簽章，避免透過修改到期時間探測連結
+        expected = self.signature(trade_no, expires_hex)
+        if not hmac.compare_digest(signature.encode('utf-8'), expected.encode('ascii')):
+            raise CheckoutLinkError("連結簽章錯誤")
+        if expires_at <= (now if now is not None else time.time()):
+            raise CheckoutLinkExpired("連結已過期")
+        return trade_no
+
+
+class CheckoutService:
+    """付款頁面端點（aiohttp，與Bot共用事件迴圈）"""
+
+    def __init__(self, config=None, order_store=None):
+        self.config = {**DEFAULT_CHECKOUT_CONFIG, **CHECKOUT_CONFIG, **(config or {})}
+        secret = self.config['secret']
+        if not secret:
+            secret = secrets.token_bytes(32)
+            logger.warning("未設定 CHECKOUT_CONFIG[\"secret\"]，重新啟動後已發送的付款連結將失效")
+        self.links = CheckoutLinks(secret, self.config['ttl'])
+        self.order_store = order_store if self.config['persist'] else None
+        self.base_url = self.config['public_url'].rstrip('/') + self.config['path']
+        self._forms = OrderedDict()                # 交易編號 -> (到期時間, 表單HTML)
+        self._next_purge = 0.0
+        self._runner = None
+        self.stats = {
+            'published': 0,
+            'served': 0,
+            'invalid': 0,
+            'expired': 0,
+            'missing': 0,
+        }
+
+    def publish(self, trade_no, form_html, now=None):
+        """保存付款表單並回傳付款頁面網址"""
+        now = time.time() if now is None else now
+        token, expires_at = self.links.token(trade_no, now)
+        form_html = form_html if isinstance(form_html, bytes) else form_html.encode('utf-8')
+
+        forms = self._forms
+        forms[trade_no] = (expires_at, form_html)
+        forms.move_to_end(trade_no)
+        # 有效時間固定，最舊的表單在最前面
+        while forms and (len(forms) > self.config['max_forms'] or next(iter(forms.values()))[0] <= now):
+            forms.popitem(last=False)
+
+        if self.order_store:
+            self.order_store.record_checkout(trade_no, form_html, expires_at)
+            if now >= self._next_purge:
+                self._next_purge = now + self.config['purge_interval']
+                self.order_store.purge_checkouts(now)
+
+        self.stats['published'] += 1
+        return f"{self.base_url}/{token}"
+
+    async def get_form(self, trade_no):
+        """取得未過期的付款表單（記憶體中沒有時查詢訂單資料庫）"""
+        entry = self._forms.get(trade_no)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+        if self.order_store:
+            return await self.order_store.fetch_checkout(trade_no)
+        return None
+
+    async def handle_checkout(self, request):
+        from aiohttp import web
+        try:
+            trade_no = self.links.verify(request.match_info['token'])
+        except CheckoutLinkExpired:
+            self.stats['expired'] += 1
+            return web.Response(status=410, text="付款連結已過期，請重新建立付款單", headers=RESPONSE_HEADERS)
+        except CheckoutLinkError:
+            self.stats['invalid'] += 1
+            return web.Response(status=403, text="付款連結無效", headers=RESPONSE_HEADERS)
+
+        form_html = await self.get_form(trade_no)
+        if form_html is None:
+            self.stats['missing'] += 1
+            return web.Response(status=404, text="找不到付款資料，請重新建立付款單", headers=RESPONSE_HEADERS)
+
+        self.stats['served'] += 1
+        return web.Response(body=form_html, content_type='text/html', charset='utf-8', headers=RESPONSE_HEADERS)
+
+    async def start(self):
+        # aiohttp.web 只在啟用付款頁面時載入
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get(self.config['path'] + '/{token}', self.handle_checkout)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config['host'], self.config['port'])
+        await site.start()
+        logger.info(f"付款頁面已啟動: {self.config['host']}:{self.config['port']}，對外網址: {self.base_url}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def create_checkout_service(order_store=None, config=None):
+    """依設定建立付款頁面，未啟用或未設定對外網址時回傳None"""
+    merged = {**DEFAULT_CHECKOUT_CONFIG, **CHECKOUT_CONFIG, **(config or {})}
+    if not merged['enabled']:
+        return None
+    if not merged['public_url']:
+        logger.warning("付款頁面未設定 public_url，改用HTML附件")
+        return None
+    return CheckoutService(merged, order_store)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import COMMAND_SYNC_CONFIG
+except ImportError:
+    COMMAND_SYNC_CONFIG = {}
+
+DEFAULT_COMMAND_SYNC_CONFIG = {
+    "mode": "auto",                    # auto: 指令定義改變時才同步, always: 每次啟動都同步, never: 不同步
+    "hash_file": "command_tree.hash",  # 記錄上次同步的指令定義雜湊
+    "dev_guild_ids": [],               # 開發用伺服器（設定時只同步到這些伺服器，立即生效，不進行全域同步）
+}
+
+
+def command_payload(tree, command):
+    """取得指令送往Discord的定義（discord.py 2.4 起 to_dict 需傳入 tree）"""
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        return command.to_dict()
+
+
+def tree_hash(tree, guild=None):
+    """計算指令定義的雜湊（與註冊順序無關）"""
+    payload = sorted(
+        (command_payload(tree, command) for command in tree.get_commands(guild=guild)),
+        key=lambda item: (item.get('type', 1), item['name'])
+    )
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class CommandSyncer:
+    """Slash指令同步（只在指令定義改變時呼叫Discord）
+
+    全域同步會呼叫有嚴格頻率限制的端點，每次重新部署都同步容易被限流。
+    同步成功後將指令定義的雜湊記錄在 hash_file，下次啟動時雜湊相同就略過；
+    雜湊以應用程式ID與同步目標（全域或個別伺服器）區分。
+
+    開發時設定 dev_guild_ids，會將全域指令複製到這些伺服器並只同步伺服器指令，
+    變更立即生效且不影響全域指令。
+    """
+
+    def __init__(self, tree, config=None):
+        self.tree = tree
+        self.config = {**DEFAULT_COMMAND_SYNC_CONFIG, **COMMAND_SYNC_CONFIG, **(config or {})}
+        self.hash_file = self.config['hash_file']
+
+    def targets(self):
+        """同步目標：開發用伺服器，未設定時為全域"""
+        guild_ids = self.config['dev_guild_ids']
+        if not guild_ids:
+            return [None]
+        guilds = [discord.Object(id=guild_id) for guild_id in guild_ids]
+        for guild in guilds:
+            self.tree.copy_global_to(guild=guild)
+        return guilds
+
+    def load_hashes(self):
+        try:
+            with open(self.hash_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_hashes(self, hashes):
+        """以暫存檔取代，避免中途結束時留下不完整的檔案"""
+        temp_file = f"{self.hash_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+        os.replace(temp_file, self.hash_file)
+
+    async def sync(self):
+        """依設定同步指令，回傳實際同步的目標數量"""
+        mode = self.config['mode']
+        if mode == 'never':
+            logger.info("已停用Slash commands同步")
+            return 0
+
+        application_id = self.tree.client.application_id
+        hashes = self.load_hashes()
+        synced = 0
+        for guild in self.targets():
+            key = f"{application_id}:{guild.id if guild else 'global'}"
+            target = f"伺服器 {guild.id}" if guild else "全域"
+            digest = tree_hash(self.tree, guild)
+            if mode != 'always' and hashes.get(key) == digest:
+                logger.info(f"Slash commands未變更，略過同步: {target}")
+                continue
+
+            commands = await self.tree.sync(guild=guild)
+            synced += 1
+            logger.info(f"Slash commands已同步: {target}，共 {len(commands)} 個")
+
+            # 每個目標同步成功後立即記錄，之後的目標失敗時不需重新同步
+            hashes[key] = digest
+            try:
+                self.save_hashes(hashes)
+            except OSError as e:
+                logger.warning(f"無法記錄指令定義雜湊: {e}")
+        return synced
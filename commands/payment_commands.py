@@ -1,26 +1,65 @@
 import discord
 from discord.ext import commands
-import tempfile
-import os
-import uuid
 import logging
-import psutil
-import platform
+import math
+import re
+import time
 from datetime import datetime, timedelta
+from order_executor import OrderExecutor, OrderQueueFullError
+from payment_delivery import checkout_view, followup_payload_bytes, payment_file
+from ecpay_client import ECPayClient, ECPayClientError
+from trade_status_cache import TradeStatusCache
+from trade_no import TradeNoGenerator
+from permission_service import PermissionService
+from rate_limiter import RateLimiter
+from system_sampler import SystemSampler
+from embed_registry import (
+    add_payment_instructions, add_store_instructions, build_help_ecpay_embed, build_help_embed,
+    get_store_info, get_store_steps,
+)
+from metrics import FOLLOWUP_BYTES, FOLLOWUP_SECONDS, ORDERS_CREATED
 
 logger = logging.getLogger(__name__)
 
-def check_permissions(interaction: discord.Interaction, allowed_roles) -> bool:
-    """檢查使用者是否有權限使用指令"""
-    if not interaction.user.roles:
-        return False
-    
-    user_role_ids = [role.id for role in interaction.user.roles]
-    return any(role_id in allowed_roles for role_id in user_role_ids)
+try:
+    from config import BULK_QUERY_CONFIG
+except ImportError:
+    BULK_QUERY_CONFIG = {}
+
+try:
+    from config import BOT_VERSION
+except ImportError:
+    BOT_VERSION = ""
+
+# 批次查詢預設值
+BULK_QUERY_DEFAULTS = {
+    "concurrency": 10,        # 同時查詢數量
+    "max_trades": 500,        # 單次最多查詢筆數
+    "page_size": 20,          # 每頁顯示筆數
+    "update_interval": 1.5,   # 查詢進度更新間隔(秒)
+    "max_file_size": 65536,   # 附件檔案大小上限(位元組)
+}
+
+# ECPay MerchantTradeNo：英數字，最多20字元
+TRADE_NO_PATTERN = re.compile(r'[0-9A-Za-z]{1,20}')
+
+def parse_trade_numbers(text, limit=None):
+    """解析貼上或附件中的交易編號（以空白、逗號、分號分隔，保留順序並去除重複）
+
+    指定 limit 時最多取 limit 筆，超過上限的輸入不需全部解析。
+    """
+    trade_nos = {}
+    for token in re.split(r'[\s,;，、]+', text):
+        if token:
+            trade_nos[token] = None
+            if limit is not None and len(trade_nos) >= limit:
+                break
+    return list(trade_nos)
 
-def check_owner_permissions(interaction: discord.Interaction, owner_id) -> bool:
-    """檢查使用者是否為bot擁有者"""
-    return interaction.user.id == owner_id
+def invalid_trade_numbers(trade_nos, limit=5):
+    """不符合交易編號格式的輸入（最多 limit 筆，過長的內容截斷後顯示）"""
+    invalid = [trade_no for trade_no in trade_nos if not TRADE_NO_PATTERN.fullmatch(trade_no)]
+    return [trade_no if len(trade_no) <= 20 else trade_no[:20] + "…" for trade_no in invalid[:limit]], len(invalid)
 
 def format_bytes(bytes_value):
     """格式化位元組為可讀格式"""
@@ -32,6 +71,7 @@ def format_bytes(bytes_value):
 
 def get_uptime():
     """取得系統運行時間"""
+    import psutil
     boot_time = psutil.boot_time()
     uptime_seconds = datetime.now().timestamp() - boot_time
     uptime = timedelta(seconds=uptime_seconds)
@@ -46,71 +86,58 @@ class PaymentCommands(commands.Cog):
     def __init__(self, bot, ecpay_handler, runtime_config):
         self.bot = bot
         self.ecpay_handler = ecpay_handler
-        self.runtime_config = runtime_config
+        # 配置快照（Bot提供 config_manager 時改用最新的快照）
+        self._runtime_config = runtime_config
+        # 交易編號產生器（由Bot建立，未提供時自行建立）
+        self.trade_no_generator = getattr(bot, 'trade_no_generator', None) or TradeNoGenerator()
+        # 訂單執行池（由Bot建立，未提供時自行建立）
+        self.order_executor = getattr(bot, 'order_executor', None) or OrderExecutor(ecpay_handler)
+        # ECPay API客戶端（共用連線池）
+        self.ecpay_client = getattr(bot, 'ecpay_client', None) or ECPayClient(ecpay_handler)
+        # 交易狀態快取
+        self.trade_status_cache = getattr(bot, 'trade_status_cache', None) or TradeStatusCache(self.ecpay_client)
+        # 權限檢查（身分組集合與擁有者）
+        self.permissions = getattr(bot, 'permission_service', None) or PermissionService.from_config(runtime_config)
+        # 使用頻率與同時建立數量限制
+        self.rate_limiter = getattr(bot, 'rate_limiter', None) or RateLimiter()
+        # 訂單資料庫（未啟用時為None）
+        self.order_store = getattr(bot, 'order_store', None)
+        # 結構化事件記錄（未啟用時為None）
+        self.event_log = getattr(bot, 'event_log', None)
+        # 系統資訊背景取樣器
+        self.system_sampler = getattr(bot, 'system_sampler', None) or SystemSampler()
+        # 付款頁面（未啟用時為None，改為上傳付款HTML附件）
+        self.checkout = getattr(bot, 'checkout_service', None)
+
+    @property
+    def runtime_config(self):
+        """目前的配置快照（設定檔重新載入後自動使用新的快照）"""
+        manager = getattr(self.bot, 'config_manager', None)
+        return manager.current if manager else self._runtime_config
+
+    @property
+    def bot_version(self):
+        return self.runtime_config.get('BOT_VERSION') or BOT_VERSION
+
+    async def cog_load(self):
+        """載入指令模塊時啟動背景取樣"""
+        self.system_sampler.start()
 
     @discord.app_commands.command(name="help", description="顯示所有可用指令的說明")
     async def help_command(self, interaction: discord.Interaction):
         """顯示幫助指令"""
-        from config import BOT_VERSION
-        
-        embed = discord.Embed(
-            title="🤖 ECPay Discord Bot 指令說明",
-            description=f"**版本:** {BOT_VERSION}\n以下是所有可用的指令：",
-            color=0x00ff00,
-            timestamp=datetime.now()
-        )
-        
-        # 付款相關指令
-        embed.add_field(
-            name="💳 付款相關指令",
-            value="`/建立繳費單` - 建立ECPay超商繳費單（舊版）\n`/建立付款單` - 建立ECPay付款單（支援多種付款方式）\n`/查詢付款狀態` - 查詢付款狀態\n`/繳費說明` - 顯示繳費功能說明",
-            inline=False
-        )
-        
-        # 資訊指令
-        embed.add_field(
-            name="ℹ️ 資訊指令",
-            value="`/help` - 顯示此說明\n`/機器人資訊` - 查看機器人詳細資訊",
-            inline=False
-        )
-        
-        # 管理指令（僅擁有者可見）
-        if check_owner_permissions(interaction, self.runtime_config.get('BOT_OWNER_ID', 0)):
-            embed.add_field(
-                name="🔧 管理指令（僅擁有者）",
-                value="`/系統狀況` - 查看伺服器系統狀況",
-                inline=False
-            )
-        
-        # 支援付款方式
-        embed.add_field(
-            name="💳 支援付款方式",
-            value="• 💳 信用卡（一次付清/分期付款）\n• 🏧 網路ATM\n• 🏧 ATM櫃員機\n• 🏪 超商代碼\n• 📊 超商條碼\n• 📱 Google Pay（需特別申請）\n• 🍎 Apple Pay",
-            inline=False
-        )
-        
-        # 支援超商
-        embed.add_field(
-            name="🏪 支援超商（超商付款）",
-            value="• 🏪 全通用（所有超商）\n• 🏪 7-ELEVEN (ibon機台)\n• 🏪 全家便利商店\n• 🏪 萊爾富\n• 🏪 OK便利商店",
-            inline=False
-        )
-        
-        # 付款限制
-        embed.add_field(
-            name="💰 付款限制",
-            value="• 超商付款: NT$ 1 - 20,000\n• 信用卡付款: NT$ 1 - 1,000,000\n• ATM付款: NT$ 1 - 50,000\n• 繳費期限: 7天（ATM為3天）",
-            inline=False
-        )
-        
-        embed.set_footer(text=f"ECPay Discord Bot v{BOT_VERSION}")
+        # 管理指令欄位僅擁有者可見
+        is_owner = self.permissions.is_owner(interaction)
+        embed = build_help_embed(self.bot_version, is_owner, timestamp=datetime.now())
         
         await interaction.response.send_message(embed=embed, ephemeral=False)
 
     @discord.app_commands.command(name="機器人資訊", description="查看機器人詳細資訊")
-    async def bot_info(self, interaction: discord.Interaction):
+    async def show_bot_info(self, interaction: discord.Interaction):
         """顯示機器人資訊"""
-        from config import BOT_VERSION, USE_TEST_ENVIRONMENT
+        import platform
+        
+        runtime_config = self.runtime_config
         
         # 計算機器人運行時間
         if hasattr(self.bot, 'start_time'):
@@ -129,13 +156,18 @@ class PaymentCommands(commands.Cog):
         # 基本資訊
         embed.add_field(
             name="📋 基本資訊",
-            value=f"**名稱:** {self.bot.user.name}\n**ID:** {self.bot.user.id}\n**版本:** {BOT_VERSION}\n**運行時間:** {uptime_str}",
+            value=f"**名稱:** {self.bot.user.name}\n**ID:** {self.bot.user.id}\n**版本:** {self.bot_version}\n**運行時間:** {uptime_str}",
             inline=False
         )
         
-        # 伺服器統計
-        guild_count = len(self.bot.guilds)
-        user_count = sum(guild.member_count for guild in self.bot.guilds)
+        # 伺服器統計（由事件增量更新，不需掃描所有伺服器）
+        guild_stats = getattr(self.bot, 'guild_stats', None)
+        if guild_stats is not None:
+            guild_count = guild_stats.guild_count
+            user_count = guild_stats.member_count
+        else:
+            guild_count = len(self.bot.guilds)
+            user_count = sum(guild.member_count or 0 for guild in self.bot.guilds)
         
         embed.add_field(
             name="📊 統計資訊",
@@ -143,6 +175,14 @@ class PaymentCommands(commands.Cog):
             inline=False
         )
         
+        # 分片狀態（僅分片模式）
+        if guild_stats is not None and getattr(self.bot, 'shard_count', None):
+            embed.add_field(
+                name=f"🧩 分片狀態（{self.bot.shard_count}個）",
+                value=self.format_shard_summary(guild_stats.shard_summary(self.bot)),
+                inline=False
+            )
+        
         # 系統資訊
         embed.add_field(
             name="💻 系統資訊",
@@ -153,7 +193,7 @@ class PaymentCommands(commands.Cog):
         # ECPay設定
         embed.add_field(
             name="💳 ECPay設定",
-            value=f"**環境:** {'測試環境' if USE_TEST_ENVIRONMENT else '正式環境'}\n**商店代號:** {self.runtime_config.get('ECPAY_CONFIG', {}).get('MerchantID', 'N/A')}\n**繳費期限:** {self.runtime_config.get('ECPAY_CONFIG', {}).get('ExpireDate', 7)}天",
+            value=f"**環境:** {'測試環境' if runtime_config.get('USE_TEST_ENVIRONMENT', True) else '正式環境'}\n**商店代號:** {runtime_config.get('ECPAY_CONFIG', {}).get('MerchantID', 'N/A')}\n**繳費期限:** {runtime_config.get('ECPAY_CONFIG', {}).get('ExpireDate', 7)}天",
             inline=False
         )
         
@@ -169,35 +209,40 @@ class PaymentCommands(commands.Cog):
         
         await interaction.response.send_message(embed=embed, ephemeral=False)
 
+    @staticmethod
+    def format_shard_summary(shards, limit=15):
+        """格式化各分片的延遲、伺服器與用戶數量"""
+        lines = []
+        for shard_id, latency, guilds, members in shards[:limit]:
+            latency_text = f"{round(latency * 1000)}ms" if latency is not None and math.isfinite(latency) else "連線中"
+            lines.append(f"**#{shard_id}** {latency_text} · {guilds} 伺服器 · {members:,} 用戶")
+        if len(shards) > limit:
+            lines.append(f"…另有 {len(shards) - limit} 個分片")
+        return "\n".join(lines) or "無"
+
     @discord.app_commands.command(name="系統狀況", description="查看伺服器系統狀況（僅擁有者）")
     async def system_status(self, interaction: discord.Interaction):
         """查看系統狀況（僅擁有者可用）"""
         # 檢查擁有者權限
-        owner_id = self.runtime_config.get('BOT_OWNER_ID', 0)
-        if not check_owner_permissions(interaction, owner_id):
+        if not self.permissions.is_owner(interaction):
+            self.record_permission_denied(interaction, "系統狀況")
             await interaction.response.send_message("❌ 此指令僅限機器人擁有者使用！", ephemeral=True)
             return
         
-        await interaction.response.defer(ephemeral=False)
+        # 只在擁有者查看時載入
+        import platform
+        import psutil
         
         try:
-            # 取得系統資訊
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            # 取得網路資訊
-            net_io = psutil.net_io_counters()
-            
-            # 取得程序資訊
-            process = psutil.Process()
-            process_memory = process.memory_info()
+            # 從背景取樣器取得最新快照（不阻塞事件迴圈）
+            sample = await self.system_sampler.latest()
+            cpu_percent = sample['cpu_percent']
             
             embed = discord.Embed(
                 title="🖥️ 系統狀況監控",
                 description="伺服器即時系統狀況",
                 color=0xff6600,
-                timestamp=datetime.now()
+                timestamp=datetime.fromtimestamp(sample['time'])
             )
             
             # CPU資訊
@@ -209,20 +254,20 @@ class PaymentCommands(commands.Cog):
             )
             
             # 記憶體資訊
-            memory_percent = memory.percent
+            memory_percent = sample['memory_percent']
             memory_emoji = "🟢" if memory_percent < 50 else "🟡" if memory_percent < 80 else "🔴"
             embed.add_field(
                 name=f"{memory_emoji} 記憶體使用",
-                value=f"**使用率:** {memory_percent}%\n**已使用:** {format_bytes(memory.used)}\n**總容量:** {format_bytes(memory.total)}",
+                value=f"**使用率:** {memory_percent}%\n**已使用:** {format_bytes(sample['memory_used'])}\n**總容量:** {format_bytes(sample['memory_total'])}",
                 inline=True
             )
             
             # 磁碟資訊
-            disk_percent = disk.percent
+            disk_percent = sample['disk_percent']
             disk_emoji = "🟢" if disk_percent < 50 else "🟡" if disk_percent < 80 else "🔴"
             embed.add_field(
                 name=f"{disk_emoji} 磁碟使用",
-                value=f"**使用率:** {disk_percent}%\n**已使用:** {format_bytes(disk.used)}\n**總容量:** {format_bytes(disk.total)}",
+                value=f"**使用率:** {disk_percent}%\n**已使用:** {format_bytes(sample['disk_used'])}\n**總容量:** {format_bytes(sample['disk_total'])}",
                 inline=True
             )
             
@@ -233,58 +278,68 @@ class PaymentCommands(commands.Cog):
                 inline=True
             )
             
-            # 網路資訊
+            # 網路資訊（以傳輸速率顯示）
+            rate = self.system_sampler.network_rate()
+            rate_text = f"**發送速率:** {format_bytes(rate[0])}/s\n**接收速率:** {format_bytes(rate[1])}/s" if rate else "**速率:** 收集中..."
             embed.add_field(
                 name="🌐 網路統計",
-                value=f"**發送:** {format_bytes(net_io.bytes_sent)}\n**接收:** {format_bytes(net_io.bytes_recv)}\n**封包發送:** {net_io.packets_sent:,}",
+                value=f"{rate_text}\n**累計發送:** {format_bytes(sample['bytes_sent'])}\n**累計接收:** {format_bytes(sample['bytes_recv'])}",
                 inline=True
             )
             
             # Bot程序資訊
             embed.add_field(
                 name="🤖 Bot程序",
-                value=f"**記憶體使用:** {format_bytes(process_memory.rss)}\n**虛擬記憶體:** {format_bytes(process_memory.vms)}\n**CPU使用率:** {process.cpu_percent()}%",
+                value=f"**記憶體使用:** {format_bytes(sample['process_rss'])}\n**虛擬記憶體:** {format_bytes(sample['process_vms'])}\n**CPU使用率:** {sample['process_cpu_percent']}%",
                 inline=True
             )
             
+            # 短期趨勢（最近5分鐘 / 15分鐘）
+            trend_lines = []
+            for label, key in [("CPU", 'cpu_percent'), ("記憶體", 'memory_percent')]:
+                for minutes in (5, 15):
+                    trend = self.system_sampler.trend(key, minutes * 60)
+                    if trend:
+                        trend_lines.append(f"**{label} {minutes}分鐘:** {trend[0]:.1f}% / {trend[1]:.1f}% / {trend[2]:.1f}%")
+            for minutes in (5, 15):
+                rate = self.system_sampler.network_rate(minutes * 60)
+                if rate:
+                    trend_lines.append(f"**網路 {minutes}分鐘:** ↑ {format_bytes(rate[0])}/s ↓ {format_bytes(rate[1])}/s")
+            if trend_lines:
+                embed.add_field(
+                    name="📈 趨勢（最小 / 平均 / 最大）",
+                    value="\n".join(trend_lines),
+                    inline=False
+                )
+            
             # 溫度資訊（如果可用）
-            try:
-                temps = psutil.sensors_temperatures()
-                if temps:
-                    temp_info = []
-                    for name, entries in temps.items():
-                        for entry in entries:
-                            if entry.current:
-                                temp_emoji = "🟢" if entry.current < 60 else "🟡" if entry.current < 80 else "🔴"
-                                temp_info.append(f"{temp_emoji} {entry.label or name}: {entry.current}°C")
-                    
-                    if temp_info:
-                        embed.add_field(
-                            name="🌡️ 溫度監控",
-                            value="\n".join(temp_info[:3]),  # 最多顯示3個溫度
-                            inline=False
-                        )
-            except:
-                pass  # 溫度資訊不可用時忽略
+            if sample['temperatures']:
+                temp_info = []
+                for label, current in sample['temperatures'][:3]:  # 最多顯示3個溫度
+                    temp_emoji = "🟢" if current < 60 else "🟡" if current < 80 else "🔴"
+                    temp_info.append(f"{temp_emoji} {label}: {current}°C")
+                embed.add_field(
+                    name="🌡️ 溫度監控",
+                    value="\n".join(temp_info),
+                    inline=False
+                )
             
             # 系統負載（Linux/Unix）
-            try:
-                load_avg = os.getloadavg()
+            load_avg = sample['load_avg']
+            if load_avg:
                 embed.add_field(
                     name="⚖️ 系統負載",
                     value=f"**1分鐘:** {load_avg[0]:.2f}\n**5分鐘:** {load_avg[1]:.2f}\n**15分鐘:** {load_avg[2]:.2f}",
                     inline=True
                 )
-            except:
-                pass  # Windows系統沒有loadavg
             
-            embed.set_footer(text=f"查詢者: {interaction.user.display_name} | 更新時間")
+            embed.set_footer(text=f"查詢者: {interaction.user.display_name} | 取樣時間")
             
-            await interaction.followup.send(embed=embed)
+            await interaction.response.send_message(embed=embed)
             
         except Exception as e:
             logger.error(f"取得系統狀況時發生錯誤: {e}")
-            await interaction.followup.send("❌ 取得系統狀況時發生錯誤！")
+            await interaction.response.send_message("❌ 取得系統狀況時發生錯誤！")
 
     @discord.app_commands.command(name="建立繳費單", description="建立ECPay超商繳費單")
     @discord.app_commands.describe(
@@ -310,11 +365,15 @@ class PaymentCommands(commands.Cog):
     ):
         """建立超商代碼付款單指令（保持向後兼容）"""
         # 檢查權限
-        allowed_roles = self.runtime_config.get('ALLOWED_ROLE_IDS', [])
-        if not check_permissions(interaction, allowed_roles):
+        if not self.permissions.check(interaction, "建立繳費單"):
+            self.record_permission_denied(interaction, "建立繳費單")
             await interaction.response.send_message("❌ 您沒有權限使用此指令！", ephemeral=True)
             return
         
+        # 檢查使用頻率
+        if not await self.check_rate_limit(interaction, "建立繳費單"):
+            return
+        
         # 檢查金額
         if 金額 <= 0:
             await interaction.response.send_message("❌ 金額必須大於0！", ephemeral=True)
@@ -324,20 +383,27 @@ class PaymentCommands(commands.Cog):
             await interaction.response.send_message("❌ 超商繳費金額不能超過20,000元！", ephemeral=True)
             return
         
+        # 全域同時建立數量上限
+        if not self.rate_limiter.order_slots.try_acquire():
+            await interaction.response.send_message("⏳ 目前建立付款單的人數過多，請稍後再試！", ephemeral=True)
+            return
+        
         try:
             await interaction.response.defer(ephemeral=False)
             
             # 產生唯一交易編號
-            trade_no = f"DC{datetime.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4())[:8]}"
+            trade_no = self.trade_no_generator.next()
             
             # 建立付款表單（使用CVS付款方式）
-            form_html, params, order_info = self.ecpay_handler.generate_payment_url(
+            form_html, params, order_info = await self.order_executor.generate_payment_url(
                 trade_no=trade_no,
                 total_amount=金額,
                 trade_desc=說明,
                 item_name=商品名稱,
                 payment_method="CVS",
-                store_type=超商選擇.value
+                store_type=超商選擇.value,
+                as_bytes=True,
+                owner=self.order_owner(interaction)
             )
             
             # 格式化付款資訊
@@ -396,172 +462,241 @@ class PaymentCommands(commands.Cog):
                 inline=False
             )
             
-            # 根據超商類型顯示相應的使用說明
-            if 超商選擇.value == "ALL":
-                # 全通用說明
-                embed.add_field(
-                    name="🏪 繳費步驟",
-                    value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
-                    inline=False
-                )
-            elif 超商選擇.value == "SEVEN":
-                # 7-ELEVEN專用說明
-                embed.add_field(
-                    name="📱 ibon機台繳費步驟",
-                    value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
-                    inline=False
-                )
-            else:
-                # 其他超商專用說明
-                store_steps = self.get_store_steps(超商選擇.value)
-                embed.add_field(
-                    name=f"🏪 {store_info['name']}繳費步驟",
-                    value=store_steps,
-                    inline=False
-                )
+            # 根據超商類型顯示相應的使用說明（預先產生的欄位）
+            add_store_instructions(embed, 超商選擇.value)
             
             embed.set_footer(text=f"建立者: {interaction.user.display_name}")
             
-            # 建立臨時HTML檔案（備用）
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write(form_html)
-                temp_file_path = f.name
-            
-            # 發送嵌入訊息和檔案
-            with open(temp_file_path, 'rb') as f:
-                file = discord.File(f, filename=f"ecpay_payment_{trade_no}.html")
-                await interaction.followup.send(
-                    content=f"✅ **繳費單已建立完成！** <@{interaction.user.id}>\n\n⚠️ **重要提醒：**\n• 請在期限內完成繳費\n• 繳費代碼僅能使用一次\n• 如有問題請聯繫客服",
-                    embed=embed, 
-                    file=file
-                )
+            # 發送嵌入訊息，附上付款頁面連結或付款HTML檔案
+            await self.send_payment(
+                interaction, "建立繳費單", form_html, trade_no,
+                content=f"✅ **繳費單已建立完成！** <@{interaction.user.id}>\n\n⚠️ **重要提醒：**\n• 請在期限內完成繳費\n• 繳費代碼僅能使用一次\n• 如有問題請聯繫客服",
+                embed=embed
+            )
             
-            # 清理臨時檔案
-            os.unlink(temp_file_path)
+            # 記錄訂單（背景批次寫入）
+            self.record_order(order_info, interaction)
             
             logger.info(f"使用者 {interaction.user} 建立了付款單: {trade_no}, 金額: {金額}, 超商: {超商選擇.name}")
             
+        except OrderQueueFullError:
+            logger.warning(f"訂單佇列已滿，拒絕使用者 {interaction.user} 的付款單請求")
+            await interaction.followup.send("⏳ 目前建立付款單的人數過多，請稍後再試！")
         except Exception as e:
             logger.error(f"建立付款單時發生錯誤: {e}")
             await interaction.followup.send("❌ 建立付款單時發生錯誤，請稍後再試！")
+        finally:
+            self.rate_limiter.order_slots.release()
+
+    async def send_payment(self, interaction, command, form_html, trade_no, content, embed):
+        """發送付款單訊息
+
+        啟用付款頁面時只發送嵌入訊息與連結按鈕，否則附上付款HTML檔案（預設直接從記憶體上傳）。
+        """
+        if self.checkout:
+            view = checkout_view(self.checkout.publish(trade_no, form_html))
+            with FOLLOWUP_SECONDS.labels(command, 'link').time():
+                await interaction.followup.send(content=content, embed=embed, view=view)
+            FOLLOWUP_BYTES.labels(command, 'link').observe(followup_payload_bytes(content, embed, view=view))
+            return
+
+        with payment_file(form_html, trade_no) as file, FOLLOWUP_SECONDS.labels(command, 'attachment').time():
+            await interaction.followup.send(content=content, embed=embed, file=file)
+        FOLLOWUP_BYTES.labels(command, 'attachment').observe(
+            followup_payload_bytes(content, embed, attachment_size=len(form_html))
+        )
+
+    def order_owner(self, interaction):
+        """訂單建立者資訊（工作者模式下由工作者寫入訂單資料庫）"""
+        return {
+            'user_id': interaction.user.id,
+            'guild_id': interaction.guild_id,
+            'channel_id': interaction.channel_id,
+        }
+
+    def record_order(self, order_info, interaction):
+        """將訂單寫入訂單資料庫與事件記錄"""
+        ORDERS_CREATED.labels(order_info['payment_method'], order_info.get('store_type') or 'NONE').inc()
+        owner = self.order_owner(interaction)
+        if self.order_store and not getattr(self.order_executor, 'persists_orders', False):
+            self.order_store.record_order(order_info, **owner)
+        if self.event_log:
+            self.event_log.order_created(order_info, **owner)
+
+    async def check_rate_limit(self, interaction, command):
+        """檢查使用頻率，超過限制時立即回覆（僅發送者可見）"""
+        retry_after = self.rate_limiter.check(command, interaction)
+        if not retry_after:
+            return True
+        await interaction.response.send_message(f"⏳ 操作過於頻繁，請在 {math.ceil(retry_after)} 秒後再試！", ephemeral=True)
+        return False
+
+    def record_permission_denied(self, interaction, command):
+        """記錄權限不足事件"""
+        if self.event_log:
+            self.event_log.permission_denied(command, interaction.user.id, interaction.guild_id)
 
     def get_store_info(self, store_type):
         """取得超商資訊"""
-        store_map = {
-            "ALL": {
-                "name": "全通用",
-                "description": "可在所有支援的超商繳費",
-                "color": 0x00ff00
-            },
-            "SEVEN": {
-                "name": "7-ELEVEN",
-                "description": "專用於7-ELEVEN ibon機台繳費",
-                "color": 0xff6600
-            },
-            "FAMILY": {
-                "name": "全家便利商店",
-                "description": "專用於全家便利商店繳費",
-                "color": 0x0066ff
-            },
-            "HILIFE": {
-                "name": "萊爾富",
-                "description": "專用於萊爾富便利商店繳費",
-                "color": 0xff0066
-            },
-            "OK": {
-                "name": "OK便利商店",
-                "description": "專用於OK便利商店繳費",
-                "color": 0x66ff00
-            }
-        }
-        return store_map.get(store_type, store_map["ALL"])
+        return get_store_info(store_type)
 
     def get_store_steps(self, store_type):
         """取得超商繳費步驟"""
-        steps_map = {
-            "FAMILY": "1️⃣ 前往全家便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
-            "HILIFE": "1️⃣ 前往萊爾富便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
-            "OK": "1️⃣ 前往OK便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證"
-        }
-        return steps_map.get(store_type, "1️⃣ 前往指定超商\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼\n4️⃣ 完成繳費")
+        return get_store_steps(store_type)
 
     @discord.app_commands.command(name="查詢付款狀態", description="查詢付款狀態")
     async def payment_status(self, interaction: discord.Interaction, 交易編號: str):
         """查詢付款狀態指令"""
         # 檢查權限
-        allowed_roles = self.runtime_config.get('ALLOWED_ROLE_IDS', [])
-        if not check_permissions(interaction, allowed_roles):
+        if not self.permissions.check(interaction, "查詢付款狀態"):
+            self.record_permission_denied(interaction, "查詢付款狀態")
             await interaction.response.send_message("❌ 您沒有權限使用此指令！", ephemeral=True)
             return
         
+        # 檢查使用頻率
+        if not await self.check_rate_limit(interaction, "查詢付款狀態"):
+            return
+        
         await interaction.response.defer(ephemeral=False)  # 改為公開可見
         
-        embed = discord.Embed(
-            title="🔍 付款狀態查詢",
-            description=f"**交易編號:** `{交易編號}`",
-            color=0x0099ff,
-            timestamp=datetime.now()
-        )
+        try:
+            result = await self.trade_status_cache.query_trade_info(交易編號)
+        except ECPayClientError as e:
+            logger.error(f"查詢付款狀態時發生錯誤: {交易編號}, {e}")
+            result = None
         
-        embed.add_field(
-            name="📊 狀態",
-            value="請至ECPay後台查詢詳細付款狀態\n或聯繫客服確認繳費情況",
-            inline=False
-        )
+        if self.event_log:
+            self.event_log.status_queried(交易編號, interaction.user.id, result)
         
+        embed = self.build_status_embed(交易編號, result)
         embed.set_footer(text=f"查詢者: {interaction.user.display_name}")
         
         await interaction.followup.send(embed=embed)
 
-    @discord.app_commands.command(name="繳費說明", description="顯示ECPay指令說明")
-    async def help_ecpay(self, interaction: discord.Interaction):
-        """說明指令"""
-        from config import BOT_VERSION
+    def build_status_embed(self, trade_no, result):
+        """建立付款狀態嵌入訊息（result為None時表示查詢失敗）"""
+        if result is None:
+            embed = discord.Embed(
+                title="🔍 付款狀態查詢",
+                description=f"**交易編號:** `{trade_no}`",
+                color=0x0099ff,
+                timestamp=datetime.now()
+            )
+            embed.add_field(
+                name="📊 狀態",
+                value="暫時無法連線至ECPay查詢\n請稍後再試或至ECPay後台查詢",
+                inline=False
+            )
+            return embed
         
+        status_info = result['status_info']
         embed = discord.Embed(
-            title="📚 ECPay Discord Bot 使用說明",
-            description=f"這個Bot可以幫助您建立ECPay多種付款方式的付款單\n**版本:** {BOT_VERSION}",
-            color=0x0099ff,
+            title=f"{status_info['emoji']} 付款狀態查詢 - {status_info['name']}",
+            description=f"**交易編號:** `{trade_no}`",
+            color=status_info['color'],
             timestamp=datetime.now()
         )
         
         embed.add_field(
-            name="🔧 可用指令",
-            value="`/建立繳費單` - 建立超商繳費單（舊版）\n`/建立付款單` - 建立多種付款方式付款單\n`/查詢付款狀態` - 查詢付款狀態\n`/繳費說明` - 顯示此說明",
+            name="📊 狀態",
+            value=f"**付款狀態:** {status_info['name']}\n**交易金額:** NT$ {int(result.get('TradeAmt') or 0):,}",
             inline=False
         )
         
-        embed.add_field(
-            name="💳 支援付款方式",
-            value="• 💳 **信用卡**：一次付清或分期付款（3/6/12/18/24期）\n• 🏧 **網路ATM**：線上金融卡轉帳\n• 🏧 **ATM櫃員機**：實體ATM轉帳\n• 🏪 **超商代碼**：超商代碼繳費\n• 📊 **超商條碼**：超商條碼繳費\n• 📱 **Google Pay**：Google行動支付\n• 🍎 **Apple Pay**：Apple行動支付",
-            inline=False
-        )
+        if result.get('TradeNo') or result.get('PaymentType'):
+            embed.add_field(
+                name="💳 付款資訊",
+                value=f"**ECPay交易編號:** `{result.get('TradeNo') or 'N/A'}`\n**付款方式:** {result.get('PaymentType') or 'N/A'}\n**付款時間:** {result.get('PaymentDate') or '尚未付款'}",
+                inline=False
+            )
         
-        embed.add_field(
-            name="💰 付款限制",
-            value="• **超商付款**：NT$ 1 - 20,000\n• **信用卡付款**：NT$ 1 - 1,000,000\n• **ATM付款**：NT$ 1 - 50,000\n• **繳費期限**：7天（ATM為3天）",
-            inline=False
-        )
+        return embed
+
+    @discord.app_commands.command(name="批次查詢付款狀態", description="一次查詢多筆交易的付款狀態")
+    @discord.app_commands.describe(
+        交易編號列表="交易編號（以空白、逗號或換行分隔）",
+        檔案="包含交易編號的文字檔"
+    )
+    async def bulk_payment_status(
+        self,
+        interaction: discord.Interaction,
+        交易編號列表: str = None,
+        檔案: discord.Attachment = None
+    ):
+        """批次查詢付款狀態指令"""
+        # 檢查權限
+        if not self.permissions.check(interaction, "批次查詢付款狀態"):
+            self.record_permission_denied(interaction, "批次查詢付款狀態")
+            await interaction.response.send_message("❌ 您沒有權限使用此指令！", ephemeral=True)
+            return
         
-        embed.add_field(
-            name="🏪 支援超商（超商付款）",
-            value="• 🏪 **全通用**：適用所有支援超商\n• 🏪 **7-ELEVEN**：ibon機台專用\n• 🏪 **全家便利商店**：櫃台繳費\n• 🏪 **萊爾富**：櫃台繳費\n• 🏪 **OK便利商店**：櫃台繳費",
-            inline=False
-        )
+        # 檢查使用頻率
+        if not await self.check_rate_limit(interaction, "批次查詢付款狀態"):
+            return
         
-        embed.add_field(
-            name="📱 使用方式",
-            value="1️⃣ 使用 `/建立付款單` 指令\n2️⃣ 選擇付款方式和金額\n3️⃣ 填寫商品資訊\n4️⃣ 根據付款方式完成付款\n5️⃣ 保留付款憑證",
-            inline=False
-        )
+        settings = {**BULK_QUERY_DEFAULTS, **BULK_QUERY_CONFIG}
         
-        embed.add_field(
-            name="⚠️ 注意事項",
-            value="• Google Pay需要特別申請才能使用\n• 信用卡分期需選擇期數\n• 超商付款需選擇超商類型\n• 付款資訊僅能使用一次\n• 請在期限內完成付款",
-            inline=False
-        )
+        if 檔案 and 檔案.size > settings['max_file_size']:
+            await interaction.response.send_message("❌ 附件檔案過大！", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=False)
+        
+        text = 交易編號列表 or ""
+        if 檔案:
+            text += "\n" + (await 檔案.read()).decode('utf-8', errors='ignore')
+        
+        # 多取一筆以判斷是否超過上限
+        trade_nos = parse_trade_numbers(text, settings['max_trades'] + 1)
+        if not trade_nos:
+            await interaction.followup.send("❌ 請提供至少一個交易編號！")
+            return
         
-        embed.set_footer(text=f"ECPay Discord Bot v{BOT_VERSION}")
+        if len(trade_nos) > settings['max_trades']:
+            await interaction.followup.send(f"❌ 單次最多查詢 {settings['max_trades']} 筆交易！")
+            return
+        
+        invalid, invalid_count = invalid_trade_numbers(trade_nos)
+        if invalid:
+            listed = "、".join(discord.utils.escape_markdown(trade_no) for trade_no in invalid)
+            more = f" 等 {invalid_count} 筆" if invalid_count > len(invalid) else ""
+            await interaction.followup.send(f"❌ 交易編號格式錯誤（需為最多20字元的英數字）: {listed}{more}")
+            return
+        
+        paginator = TradeStatusPaginator(trade_nos, settings['page_size'], interaction.user)
+        message = await interaction.followup.send(embed=paginator.build_embed(), wait=True)
+        
+        last_update = time.monotonic()
+        async for trade_no, result, error in self.trade_status_cache.query_many(trade_nos, settings['concurrency']):
+            if error:
+                logger.warning(f"批次查詢付款狀態失敗: {trade_no}, {error}")
+            if self.event_log:
+                self.event_log.status_queried(trade_no, interaction.user.id, result, bulk=True)
+            paginator.results[trade_no] = result
+            
+            # 節流更新，避免觸發Discord編輯訊息的速率限制
+            if message and time.monotonic() - last_update >= settings['update_interval']:
+                try:
+                    await message.edit(embed=paginator.build_embed())
+                except discord.HTTPException as e:
+                    # 訊息已刪除或Webhook已過期時不再更新進度，查詢照常完成
+                    logger.warning(f"更新批次查詢進度失敗: {e}")
+                    message = None
+                last_update = time.monotonic()
+        
+        paginator.update_buttons()
+        if message:
+            try:
+                await message.edit(embed=paginator.build_embed(), view=paginator if paginator.page_count > 1 else None)
+            except discord.HTTPException as e:
+                logger.warning(f"更新批次查詢結果失敗: {e}")
+        
+        logger.info(f"使用者 {interaction.user} 批次查詢了 {len(trade_nos)} 筆付款狀態")
+
+    @discord.app_commands.command(name="繳費說明", description="顯示ECPay指令說明")
+    async def help_ecpay(self, interaction: discord.Interaction):
+        """說明指令"""
+        embed = build_help_ecpay_embed(self.bot_version, timestamp=datetime.now())
         
         await interaction.response.send_message(embed=embed, ephemeral=False)
 
@@ -610,11 +745,15 @@ class PaymentCommands(commands.Cog):
     ):
         """建立多種付款方式的付款單指令"""
         # 檢查權限
-        allowed_roles = self.runtime_config.get('ALLOWED_ROLE_IDS', [])
-        if not check_permissions(interaction, allowed_roles):
+        if not self.permissions.check(interaction, "建立付款單"):
+            self.record_permission_denied(interaction, "建立付款單")
             await interaction.response.send_message("❌ 您沒有權限使用此指令！", ephemeral=True)
             return
         
+        # 檢查使用頻率
+        if not await self.check_rate_limit(interaction, "建立付款單"):
+            return
+        
         # 檢查金額
         if 金額 <= 0:
             await interaction.response.send_message("❌ 金額必須大於0！", ephemeral=True)
@@ -640,25 +779,32 @@ class PaymentCommands(commands.Cog):
             await interaction.response.send_message("❌ 信用卡分期付款需要選擇分期期數！", ephemeral=True)
             return
         
+        # 全域同時建立數量上限
+        if not self.rate_limiter.order_slots.try_acquire():
+            await interaction.response.send_message("⏳ 目前建立付款單的人數過多，請稍後再試！", ephemeral=True)
+            return
+        
         try:
             await interaction.response.defer(ephemeral=False)
             
             # 產生唯一交易編號
-            trade_no = f"DC{datetime.now().strftime('%Y%m%d%H%M%S')}{str(uuid.uuid4())[:8]}"
+            trade_no = self.trade_no_generator.next()
             
             # 準備參數
             store_type = 超商選擇.value if 超商選擇 else "ALL"
             installment_period = 分期期數.value if 分期期數 else None
             
             # 建立付款表單
-            form_html, params, order_info = self.ecpay_handler.generate_payment_url(
+            form_html, params, order_info = await self.order_executor.generate_payment_url(
                 trade_no=trade_no,
                 total_amount=金額,
                 trade_desc=說明,
                 item_name=商品名稱,
                 payment_method=付款方式.value,
                 store_type=store_type,
-                installment_period=installment_period
+                installment_period=installment_period,
+                as_bytes=True,
+                owner=self.order_owner(interaction)
             )
             
             # 格式化付款資訊
@@ -697,28 +843,26 @@ class PaymentCommands(commands.Cog):
             
             embed.set_footer(text=f"建立者: {interaction.user.display_name}")
             
-            # 建立臨時HTML檔案
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-                f.write(form_html)
-                temp_file_path = f.name
-            
-            # 發送嵌入訊息和檔案
-            with open(temp_file_path, 'rb') as f:
-                file = discord.File(f, filename=f"ecpay_payment_{trade_no}.html")
-                await interaction.followup.send(
-                    content=f"✅ **付款單已建立完成！** <@{interaction.user.id}>\n\n⚠️ **重要提醒：**\n• 請在期限內完成付款\n• 付款資訊僅能使用一次\n• 如有問題請聯繫客服",
-                    embed=embed, 
-                    file=file
-                )
+            # 發送嵌入訊息，附上付款頁面連結或付款HTML檔案
+            await self.send_payment(
+                interaction, "建立付款單", form_html, trade_no,
+                content=f"✅ **付款單已建立完成！** <@{interaction.user.id}>\n\n⚠️ **重要提醒：**\n• 請在期限內完成付款\n• 付款資訊僅能使用一次\n• 如有問題請聯繫客服",
+                embed=embed
+            )
             
-            # 清理臨時檔案
-            os.unlink(temp_file_path)
+            # 記錄訂單（背景批次寫入）
+            self.record_order(order_info, interaction)
             
             logger.info(f"使用者 {interaction.user} 建立了付款單: {trade_no}, 金額: {金額}, 付款方式: {付款方式.name}")
             
+        except OrderQueueFullError:
+            logger.warning(f"訂單佇列已滿，拒絕使用者 {interaction.user} 的付款單請求")
+            await interaction.followup.send("⏳ 目前建立付款單的人數過多，請稍後再試！")
         except Exception as e:
             logger.error(f"建立付款單時發生錯誤: {e}")
             await interaction.followup.send("❌ 建立付款單時發生錯誤，請稍後再試！")
+        finally:
+            self.rate_limiter.order_slots.release()
 
     async def add_payment_specific_fields(self, embed, payment_info, payment_method, store_choice):
         """根據付款方式添加特定欄位"""
@@ -776,82 +920,84 @@ class PaymentCommands(commands.Cog):
             # 線上付款方式
             embed.add_field(
                 name="🌐 付款方式",
-                value="點擊下方連結或使用HTML檔案進行付款",
+                value="點擊下方「前往付款」按鈕進行付款" if self.checkout else "點擊下方連結或使用HTML檔案進行付款",
                 inline=False
             )
 
     async def add_payment_instructions(self, embed, payment_method, store_choice):
         """根據付款方式添加使用說明"""
-        if payment_method == 'CVS':
-            # 超商代碼說明
-            if store_choice and store_choice.value == "ALL":
-                embed.add_field(
-                    name="🏪 繳費步驟",
-                    value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
-                    inline=False
-                )
-            elif store_choice and store_choice.value == "SEVEN":
-                embed.add_field(
-                    name="📱 ibon機台繳費步驟",
-                    value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
-                    inline=False
-                )
-            else:
-                store_steps = self.get_store_steps(store_choice.value if store_choice else "ALL")
-                embed.add_field(
-                    name=f"🏪 繳費步驟",
-                    value=store_steps,
-                    inline=False
-                )
-        
-        elif payment_method == 'BARCODE':
-            embed.add_field(
-                name="📊 條碼繳費步驟",
-                value="1️⃣ 前往任一支援的超商\n2️⃣ 告知店員「條碼繳費」\n3️⃣ 出示上方三組條碼給店員掃描\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
-                inline=False
-            )
-        
-        elif payment_method == 'ATM':
-            embed.add_field(
-                name="🏧 ATM轉帳步驟",
-                value="1️⃣ 前往任一ATM櫃員機\n2️⃣ 選擇「轉帳」功能\n3️⃣ 輸入銀行代碼和虛擬帳號\n4️⃣ 輸入轉帳金額\n5️⃣ 確認資訊後完成轉帳\n6️⃣ 保留交易明細",
-                inline=False
-            )
-        
-        elif payment_method == 'WEBATM':
-            embed.add_field(
-                name="🌐 網路ATM步驟",
-                value="1️⃣ 點擊付款連結\n2️⃣ 選擇您的銀行\n3️⃣ 插入金融卡並輸入密碼\n4️⃣ 確認交易資訊\n5️⃣ 完成轉帳付款",
-                inline=False
-            )
-        
-        elif payment_method == 'CREDIT':
-            embed.add_field(
-                name="💳 信用卡付款步驟",
-                value="1️⃣ 點擊付款連結\n2️⃣ 輸入信用卡資訊\n3️⃣ 輸入安全驗證碼\n4️⃣ 確認交易資訊\n5️⃣ 完成付款",
-                inline=False
-            )
+        add_payment_instructions(embed, payment_method, store_choice.value if store_choice else None)
+
+class TradeStatusPaginator(discord.ui.View):
+    """批次查詢結果分頁顯示"""
+
+    def __init__(self, trade_nos, page_size, owner):
+        super().__init__(timeout=600)
+        self.trade_nos = trade_nos
+        self.page_size = page_size
+        self.owner = owner
+        self.page = 0
+        self.results = {}  # trade_no -> 查詢結果（None表示查詢失敗）
+
+    @property
+    def page_count(self):
+        return max(1, (len(self.trade_nos) + self.page_size - 1) // self.page_size)
+
+    def format_line(self, trade_no):
+        """格式化單筆查詢結果"""
+        if trade_no not in self.results:
+            return f"⏳ `{trade_no}` 查詢中..."
+        result = self.results[trade_no]
+        if result is None:
+            return f"⚠️ `{trade_no}` 查詢失敗"
+        status_info = result['status_info']
+        return f"{status_info['emoji']} `{trade_no}` {status_info['name']} NT$ {int(result.get('TradeAmt') or 0):,}"
+
+    def build_embed(self):
+        """建立目前頁面的嵌入訊息"""
+        done = len(self.results)
+        total = len(self.trade_nos)
+        start = self.page * self.page_size
+        lines = [self.format_line(trade_no) for trade_no in self.trade_nos[start:start + self.page_size]]
         
-        elif payment_method == 'CREDIT_INSTALLMENT':
-            embed.add_field(
-                name="💳 信用卡分期步驟",
-                value="1️⃣ 點擊付款連結\n2️⃣ 輸入信用卡資訊\n3️⃣ 選擇分期期數\n4️⃣ 確認每期金額\n5️⃣ 完成分期付款設定",
-                inline=False
-            )
+        embed = discord.Embed(
+            title="🔍 批次付款狀態查詢" + ("" if done == total else f"（{done}/{total}）"),
+            description="\n".join(lines),
+            color=0x00ff00 if done == total else 0x0099ff,
+            timestamp=datetime.now()
+        )
         
-        elif payment_method == 'GOOGLEPAY':
+        # 狀態統計
+        counts = {}
+        for result in self.results.values():
+            name = result['status_info']['name'] if result else '查詢失敗'
+            counts[name] = counts.get(name, 0) + 1
+        if counts:
             embed.add_field(
-                name="📱 Google Pay步驟",
-                value="1️⃣ 點擊付款連結\n2️⃣ 選擇Google Pay\n3️⃣ 使用手機驗證\n4️⃣ 確認付款資訊\n5️⃣ 完成付款",
+                name="📊 統計",
+                value="\n".join(f"**{name}:** {count}" for name, count in counts.items()),
                 inline=False
             )
         
-        elif payment_method == 'APPLEPAY':
-            embed.add_field(
-                name="🍎 Apple Pay步驟",
-                value="1️⃣ 點擊付款連結\n2️⃣ 選擇Apple Pay\n3️⃣ 使用Touch ID或Face ID驗證\n4️⃣ 確認付款資訊\n5️⃣ 完成付款",
-                inline=False
-            )
+        embed.set_footer(text=f"第 {self.page + 1}/{self.page_count} 頁 | 查詢者: {self.owner.display_name}")
+        return embed
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def change_page(self, interaction, offset):
+        self.page = min(max(self.page + offset, 0), self.page_count - 1)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="上一頁", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.change_page(interaction, -1)
+
+    @discord.ui.button(label="下一頁", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.change_page(interaction, 1)
 
 async def setup(bot, ecpay_handler, runtime_config):
     """設定指令模塊"""
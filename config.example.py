@@ -16,7 +16,8 @@ USE_WEB_UI = False  # True: 使用網頁配置, False: 使用終端輸入配置
 WEB_UI_CONFIG = {
     "host": "127.0.0.1",  # WebUI主機位址
     "port": 5000,         # WebUI端口
-    "debug": False        # 是否開啟除錯模式
+    "debug": False,       # 是否開啟除錯模式（僅flask）
+    "server": "flask"     # flask: 背景執行緒, aiohttp: 與Bot共用事件迴圈（不需安裝flask）
 }
 
 # 允許使用指令的身分組ID列表
@@ -38,7 +39,8 @@ ECPAY_CONFIG = {
     "ChoosePayment": "CVS",               # 超商代碼繳費
     "EncryptType": 1,                     # 加密類型
     "ExpireDate": 7,                      # 繳費期限(天)
-    "PaymentInfoURL": "https://your-domain.com/payment_info",  # 付款資訊接收網址
+    "ReturnURL": "",                      # 付款結果通知網址（留空時由 CALLBACK_SERVER_CONFIG["public_url"] 產生）
+    "PaymentInfoURL": "",                 # 付款資訊（取號結果）接收網址（留空時由 CALLBACK_SERVER_CONFIG["public_url"] 產生）
     "ClientRedirectURL": "https://your-domain.com/redirect",   # Client端返回網址
 }
 
@@ -46,6 +48,9 @@ ECPAY_CONFIG = {
 ECPAY_TEST_URL = "https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5"
 # ECPay 正式環境網址（請勿修改）
 ECPAY_PROD_URL = "https://payment.ecpay.com.tw/Cashier/AioCheckOut/V5"
+# ECPay 交易查詢網址（請勿修改）
+ECPAY_TEST_QUERY_URL = "https://payment-stage.ecpay.com.tw/Cashier/QueryTradeInfo/V5"
+ECPAY_PROD_QUERY_URL = "https://payment.ecpay.com.tw/Cashier/QueryTradeInfo/V5"
 
 # 是否使用測試環境
 # True: 測試環境（開發時使用）
@@ -60,8 +65,199 @@ LOG_CONFIG = {
     "show_backend": False,              # 是否顯示後端框架日誌（Discord.py, Flask等）
     "max_file_size": 10,                # 日誌檔案最大大小(MB)
     "backup_count": 5,                  # 保留的日誌備份檔案數量
+    "queue_size": 10000,                # 日誌佇列上限（由背景執行緒寫入檔案與終端）
+    "queue_policy": "block",            # 佇列已滿時: "block" 等待寫入, "drop" 捨棄日誌（WARNING以上仍等待寫入）
     "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"  # 日誌格式
 }
 
+# ECPay API連線設定
+ECPAY_HTTP_CONFIG = {
+    "limit": 20,                        # 連線池總連線數
+    "limit_per_host": 10,               # 每個主機的連線數上限
+    "keepalive_timeout": 30,            # keep-alive保留時間(秒)
+    "connect_timeout": 5,               # 連線逾時(秒)
+    "total_timeout": 10,                # 單次請求逾時(秒)
+    "retries": 2,                       # 失敗重試次數
+    "backoff": 0.5                      # 重試間隔基數(秒)
+}
+
+# ECPay回調接收伺服器設定（與Bot共用事件迴圈）
+CALLBACK_SERVER_CONFIG = {
+    "enabled": False,                   # 是否啟動回調接收伺服器
+    "host": "0.0.0.0",                  # 監聽位址
+    "port": 8080,                       # 監聽端口
+    "public_url": "",                   # 對外網址（例如 https://your-domain.com），ECPAY_CONFIG未設定通知網址時自動使用
+    "return_path": "/ecpay/return",     # 付款結果通知路徑
+    "payment_info_path": "/ecpay/payment_info",  # 取號結果通知路徑
+    "max_queue": 10000,                 # 待處理回調上限（超過時回覆失敗讓ECPay重送）
+    "workers": 2,                       # 處理回調的工作者數量
+    "dedupe_size": 20000                # 記錄已處理回調的數量（去除重送）
+}
+
+# 交易狀態查詢快取設定
+TRADE_STATUS_CACHE_CONFIG = {
+    "max_entries": 10000,               # 快取筆數上限（超過時淘汰最久未使用）
+    "final_ttl": 3600,                  # 已付款/交易失敗等最終狀態的保留時間(秒)
+    "pending_ttl": 15,                  # 未付款狀態的保留時間(秒)
+    "not_found_ttl": 60                 # 查無交易的保留時間(秒)
+}
+
+# 批次查詢付款狀態設定
+BULK_QUERY_CONFIG = {
+    "concurrency": 10,                  # 同時查詢數量
+    "max_trades": 500,                  # 單次最多查詢筆數
+    "page_size": 20,                    # 每頁顯示筆數
+    "update_interval": 1.5,             # 查詢進度更新間隔(秒)
+    "max_file_size": 65536              # 附件檔案大小上限(位元組)
+}
+
+# 訂單資料庫設定（SQLite，背景批次寫入）
+ORDER_STORE_CONFIG = {
+    "enabled": True,                    # 是否記錄訂單
+    "path": "orders.db",                # 資料庫檔案
+    "batch_size": 100,                  # 每次提交的最大筆數
+    "flush_interval": 0.5,              # 批次提交間隔(秒)
+    "max_queue": 10000                  # 待寫入佇列上限
+}
+
+# 訂單執行池設定（簽章與HTML組裝在事件迴圈外執行）
+ORDER_EXECUTOR_CONFIG = {
+    "mode": "thread",                   # thread: 執行緒池, process: 程序池
+    "max_workers": 4,                   # 工作者數量
+    "max_in_flight": 8,                 # 同時執行中的訂單數量
+    "max_pending": 100,                 # 等待中的訂單上限（超過則回覆忙碌）
+    "metrics_window": 500               # 延遲統計保留的樣本數
+}
+
+# 多程序工作者模式（啟用後取代上方的訂單執行池）
+# Bot只接收指令並將建立訂單工作放入SQLite佇列，由工作者程序簽章、產生表單並寫入訂單資料庫
+# 也可在其他終端另行啟動工作者: python order_worker.py --broker order_broker.db
+# 注意：目前佇列開銷大於建立訂單本身，benchmarks/bench_workers.py 的結果約為單程序執行緒池的一半，
+# 增加工作者也沒有提高吞吐量，建議維持停用，除非在多核心主機上實測確有改善
+ORDER_BROKER_CONFIG = {
+    "enabled": False,                   # 是否使用多程序工作者模式（預設停用，見上方說明）
+    "path": "order_broker.db",          # 工作佇列資料庫檔案
+    "workers": 2,                       # 由Bot自動啟動的工作者數量（0表示工作者另行啟動）
+    "batch_size": 32,                   # 工作者每次領取的工作數量
+    "poll_interval": 0.005,             # 輪詢間隔(秒)
+    "max_poll_interval": 0.25,          # 閒置時輪詢間隔逐步加倍的上限(秒)
+    "job_timeout": 30,                  # 等待單筆工作完成的時間上限(秒)，逾時的工作從佇列取消，不會建立訂單
+    "lease_timeout": 15,                # 工作者中斷時，工作重新排入佇列的時間(秒)
+    "max_pending": 1000                 # 等待中的工作上限（超過則回覆忙碌）
+}
+
+# 付款HTML檔案發送設定
+PAYMENT_DELIVERY_CONFIG = {
+    "use_temp_file": False              # True: 先寫入暫存檔再上傳（備用方案）, False: 直接從記憶體上傳
+}
+
+# 系統狀況背景取樣設定
+SYSTEM_SAMPLER_CONFIG = {
+    "interval": 10,                     # 取樣間隔(秒)
+    "window": 900                       # 保留的時間範圍(秒)，/系統狀況 顯示5分鐘與15分鐘趨勢
+}
+
+# 權限設定
+PERMISSION_CONFIG = {
+    "command_roles": {},                # 個別指令的允許身分組，例如 {"批次查詢付款狀態": [123456789]}；未列出的指令使用 ALLOWED_ROLE_IDS
+}
+
+# 使用頻率限制（權杖桶），格式為 (次數, 秒數)
+RATE_LIMIT_CONFIG = {
+    "enabled": True,                    # 是否啟用使用頻率限制
+    "commands": {                       # 每個指令的使用者(user)與伺服器(guild)限制
+        "建立繳費單": {"user": (5, 60), "guild": (60, 60)},
+        "建立付款單": {"user": (5, 60), "guild": (60, 60)},
+        "查詢付款狀態": {"user": (20, 60)},
+        "批次查詢付款狀態": {"user": (3, 60), "guild": (20, 60)},
+    },
+    "role_limits": {},                  # 特定身分組的使用者限制，例如 {123456789: {"建立付款單": (30, 60)}}
+    "max_concurrent_orders": 20,        # 同時建立中的付款單上限（0表示不限制）
+    "sweep_interval": 60,               # 清除閒置計數的間隔(秒)
+}
+
+# 分片設定（伺服器數量較多時使用 AutoShardedBot，每個分片各自一條Gateway連線）
+SHARDING_CONFIG = {
+    "enabled": False,                   # 是否啟用分片
+    "shard_count": None,                # 分片數量（None表示由Discord建議）
+    "shard_ids": None,                  # 此程序負責的分片，例如 [0, 1]（None表示全部）
+    "members_intent": False,            # 是否接收成員加入/離開事件以更新用戶數量（需開啟 Server Members Intent）
+}
+
+# 交易編號設定（前綴 + 時間基準 + 節點編號 + 計數器，共20字元）
+TRADE_NO_CONFIG = {
+    "prefix": "DC",                     # 交易編號前綴（最多2字元）
+    "node_id": 0,                       # 節點編號（0-1295），多個程序共用同一商店代號時每個程序需設定不同值
+                                        # 啟用工作者模式時，Bot啟動的工作者依序使用 node_id+1 起的編號
+    "state_file": "trade_no_{node_id}.state",  # 記錄時間基準的檔案，確保重新啟動後不會重複
+}
+
+# 結構化事件記錄設定（order_created, callback_received, status_queried, permission_denied）
+# 查詢工具: python event_log.py --event order_created --trade-no DC...（安裝 orjson 可加快序列化，選用）
+EVENT_LOG_CONFIG = {
+    "enabled": True,                    # 是否記錄結構化事件
+    "file": "events.jsonl",             # 事件檔案（每行一筆JSON）
+    "max_file_size": 10,                # 事件檔案最大大小(MB)
+    "backup_count": 5,                  # 保留的備份檔案數量（未啟用封存時）
+    "archive": False,                   # 輪轉時是否轉為壓縮區段
+    "archive_dir": "event_archive",     # 壓縮區段存放目錄
+    "queue_size": 10000,                # 待寫入佇列上限
+    "queue_policy": "block",            # 佇列已滿時: "block" 等待寫入, "drop" 捨棄事件（order_created、callback_received 仍等待寫入）
+}
+
+# Slash指令同步設定（只在指令定義改變時同步，避免每次重新部署都呼叫有頻率限制的全域同步）
+COMMAND_SYNC_CONFIG = {
+    "mode": "auto",                     # auto: 指令定義改變時才同步, always: 每次啟動都同步, never: 不同步
+    "hash_file": "command_tree.hash",   # 記錄上次同步的指令定義雜湊（刪除此檔案可強制重新同步）
+    "dev_guild_ids": [],                # 開發用伺服器ID，設定時只同步到這些伺服器（立即生效，不進行全域同步）
+}
+
+# 配置熱重新載入設定
+# 修改 config.py 或 TOML設定檔後自動套用，不需重新啟動；
+# 適用於身分組ID、擁有者ID、ECPAY_CONFIG、測試環境切換、BOT_VERSION、PERMISSION_CONFIG["command_roles"]。
+# Discord Bot Token 變更只會記錄警告，需重新啟動Bot才會生效。
+# TOML設定檔使用相同的名稱，例如:
+#     USE_TEST_ENVIRONMENT = false
+#     [ECPAY_CONFIG]
+#     HashKey = "..."
+# 環境變數使用前綴，巢狀欄位以 __ 分隔，例如 ECPAY_BOT_ECPAY_CONFIG__HashIV=...
+CONFIG_RELOAD_CONFIG = {
+    "enabled": True,                    # 是否監看設定檔並自動重新載入（Unix上也可送出 SIGHUP 立即重新載入）
+    "toml_file": "config.toml",         # TOML設定檔（不存在時略過）
+    "env_prefix": "ECPAY_BOT_",         # 環境變數前綴
+    "interval": 2,                      # 檢查修改時間的間隔(秒)
+}
+
+# 啟動分析設定（python main.py --startup-profile [--startup-budget 秒數]）
+# 輸出模組載入時間與各階段耗時，Bot就緒後結束；超出預算時以狀態碼1結束
+STARTUP_PROFILE_CONFIG = {
+    "budget": 10.0,                     # 程序啟動到 on_ready 的時間預算(秒)
+    "history_file": "startup_profile.jsonl",  # 每次分析結果附加到此檔案（None表示不記錄）
+    "top_imports": 15,                  # 顯示載入最久的模組數量
+}
+
+# 付款頁面設定（以簽章且有期限的連結取代付款HTML附件）
+CHECKOUT_CONFIG = {
+    "enabled": False,                   # 是否以付款頁面連結取代HTML附件
+    "host": "0.0.0.0",                  # 監聽位址
+    "port": 8081,                       # 監聽端口
+    "public_url": "",                   # 對外網址（例如 https://your-domain.com），未設定時不啟用
+    "path": "/pay",                     # 付款頁面路徑
+    "secret": "",                       # 連結簽章金鑰（請設定隨機字串，未設定時重新啟動後舊連結失效）
+    "ttl": 3600,                        # 連結有效時間(秒)
+    "max_forms": 10000,                 # 記憶體中保留的表單數量
+    "persist": True,                    # 同時寫入訂單資料庫，重新啟動後連結仍可使用
+    "purge_interval": 600,              # 刪除資料庫中過期表單的間隔(秒)
+}
+
+# 效能指標設定（Prometheus 文字格式）
+METRICS_CONFIG = {
+    "enabled": False,                   # 是否啟動 /metrics 端點
+    "host": "127.0.0.1",                # 監聽位址（建議只開放給監控主機）
+    "port": 9464,                       # 監聽端口
+    "path": "/metrics",                 # 端點路徑
+    "lag_interval": 0.5,                # 事件迴圈延遲取樣間隔(秒)
+}
+
 # 版本資訊
 BOT_VERSION = "1.5.0" 
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""不可變的執行配置快照（可熱重新載入）
+
+配置依序由以下來源合併，後者覆蓋前者:
+    1. config.py
+    2. TOML設定檔（CONFIG_RELOAD_CONFIG["toml_file"]，選用，需 Python 3.11+ 或安裝 tomli）
+    3. 環境變數（前綴 ECPAY_BOT_，例如 ECPAY_BOT_DISCORD_BOT_TOKEN、ECPAY_BOT_ECPAY_CONFIG__HashKey）
+    4. 終端或WebUI輸入的配置
+
+ConfigManager 監看 config.py 與TOML檔的修改時間（Unix上也可送出 SIGHUP），
+變更時建立新的快照並以單一指派替換，再通知監聽者只重建受影響的元件。
+讀取端取得的快照不會改變，進行中的訂單會以開始時的快照完成。
+"""
+import asyncio
+import logging
+import os
+import runpy
+import signal
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import CONFIG_RELOAD_CONFIG
+except ImportError:
+    CONFIG_RELOAD_CONFIG = {}
+
+DEFAULT_RELOAD_CONFIG = {
+    "enabled": True,                   # 是否監看設定檔並自動重新載入
+    "toml_file": "config.toml",        # TOML設定檔（不存在時略過）
+    "env_prefix": "ECPAY_BOT_",        # 環境變數前綴
+    "interval": 2,                     # 檢查修改時間的間隔(秒)
+}
+
+# 各來源讀取的設定名稱
+SOURCE_KEYS = (
+    'DISCORD_BOT_TOKEN', 'ALLOWED_ROLE_IDS', 'BOT_OWNER_ID', 'ECPAY_CONFIG', 'USE_TEST_ENVIRONMENT',
+    'ECPAY_TEST_URL', 'ECPAY_PROD_URL', 'ECPAY_TEST_QUERY_URL', 'ECPAY_PROD_QUERY_URL',
+    'BOT_VERSION', 'PERMISSION_CONFIG',
+)
+
+# 舊版 runtime_config 的鍵 -> 快照欄位
+LEGACY_KEYS = {
+    'DISCORD_BOT_TOKEN': 'discord_token',
+    'ALLOWED_ROLE_IDS': 'allowed_role_ids',
+    'BOT_OWNER_ID': 'bot_owner_id',
+    'ECPAY_CONFIG': 'ecpay_config',
+    'USE_TEST_ENVIRONMENT': 'use_test_environment',
+    'BOT_VERSION': 'bot_version',
+}
+
+DEFAULT_URLS = {
+    'ECPAY_TEST_URL': "https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5",
+    'ECPAY_PROD_URL': "https://payment.ecpay.com.tw/Cashier/AioCheckOut/V5",
+    'ECPAY_TEST_QUERY_URL': "https://payment-stage.ecpay.com.tw/Cashier/QueryTradeInfo/V5",
+    'ECPAY_PROD_QUERY_URL': "https://payment.ecpay.com.tw/Cashier/QueryTradeInfo/V5",
+}
+
+# ECPAY_CONFIG中需轉為整數的欄位（環境變數皆為字串）
+INTEGER_ECPAY_FIELDS = {'ExpireDate', 'EncryptType'}
+
+
+class ConfigError(Exception):
+    """配置來源讀取失敗"""
+
+
+@dataclass(frozen=True, eq=False)
+class ConfigSnapshot(Mapping):
+    """執行配置快照（建立後不可修改）
+
+    同時提供舊版 runtime_config 的讀取方式，例如 snapshot.get('BOT_OWNER_ID')。
+    """
+
+    discord_token: str
+    allowed_role_ids: tuple
+    bot_owner_id: int
+    ecpay_config: Mapping
+    use_test_environment: bool
+    api_url: str
+    query_url: str
+    bot_version: str
+    command_roles: Mapping
+    version: int = 0
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, LEGACY_KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(LEGACY_KEYS)
+
+    def __len__(self):
+        return len(LEGACY_KEYS)
+
+    def to_dict(self):
+        """轉為可修改的 runtime_config（終端與WebUI配置使用）"""
+        return {
+            'DISCORD_BOT_TOKEN': self.discord_token,
+            'ALLOWED_ROLE_IDS': list(self.allowed_role_ids),
+            'BOT_OWNER_ID': self.bot_owner_id,
+            'ECPAY_CONFIG': dict(self.ecpay_config),
+            'USE_TEST_ENVIRONMENT': self.use_test_environment,
+            'BOT_VERSION': self.bot_version,
+        }
+
+    def changed(self, other):
+        """與另一個快照不同的欄位名稱"""
+        return {
+            field.name for field in fields(self)
+            if field.name != 'version' and getattr(self, field.name) != getattr(other, field.name)
+        }
+
+
+def build_snapshot(values, version=0):
+    """由合併後的設定建立快照"""
+    use_test = bool(values.get('USE_TEST_ENVIRONMENT', True))
+    environment = 'TEST' if use_test else 'PROD'
+    command_roles = (values.get('PERMISSION_CONFIG') or {}).get('command_roles', {})
+    return ConfigSnapshot(
+        discord_token=values.get('DISCORD_BOT_TOKEN', ''),
+        allowed_role_ids=tuple(int(role_id) for role_id in values.get('ALLOWED_ROLE_IDS', ())),
+        bot_owner_id=int(values.get('BOT_OWNER_ID', 0)),
+        ecpay_config=MappingProxyType(dict(values.get('ECPAY_CONFIG', {}))),
+        use_test_environment=use_test,
+        api_url=values.get(f'ECPAY_{environment}_URL', DEFAULT_URLS[f'ECPAY_{environment}_URL']),
+        query_url=values.get(f'ECPAY_{environment}_QUERY_URL', DEFAULT_URLS[f'ECPAY_{environment}_QUERY_URL']),
+        bot_version=values.get('BOT_VERSION', ''),
+        command_roles=MappingProxyType({
+            command: tuple(roles) for command, roles in command_roles.items()
+        }),
+        version=version,
+    )
+
+
+def merge_values(values, updates):
+    """合併設定（ECPAY_CONFIG逐欄位合併，其他設定直接覆蓋）"""
+    for key, value in updates.items():
+        if key == 'ECPAY_CONFIG' and isinstance(value, Mapping):
+            values[key] = {**values.get(key, {}), **value}
+        else:
+            values[key] = value
+
+
+def parse_env_value(key, text):
+    if key == 'ALLOWED_ROLE_IDS':
+        return [int(role_id) for role_id in text.split(',') if role_id.strip()]
+    if key == 'BOT_OWNER_ID':
+        return int(text)
+    if key == 'USE_TEST_ENVIRONMENT':
+        return text.strip().lower() in ('1', 'true', 'yes', 'y')
+    return text
+
+
+def read_env(prefix, environ=None):
+    """讀取環境變數設定（巢狀欄位以 __ 分隔）"""
+    environ = os.environ if environ is None else environ
+    values = {}
+    for name, text in environ.items():
+        if not name.startswith(prefix):
+            continue
+        key, _, field = name[len(prefix):].partition('__')
+        if key == 'ECPAY_CONFIG' and field:
+            value = int(text) if field in INTEGER_ECPAY_FIELDS else text
+            values.setdefault('ECPAY_CONFIG', {})[field] = value
+        elif key in SOURCE_KEYS and not field:
+            values[key] = parse_env_value(key, text)
+    return values
+
+
+def read_toml(path):
+    if not path or not os.path.exists(path):
+        return {}
+    if tomllib is None:
+        logger.warning(f"無法讀取 {path}：需要 Python 3.11 或安裝 tomli")
+        return {}
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    return {key: value for key, value in data.items() if key in SOURCE_KEYS}
+
+
+def config_module_file():
+    try:
+        import config
+    except ImportError:
+        return None
+    return getattr(config, '__file__', None)
+
+
+def read_config_module(reload):
+    """讀取 config.py（重新載入時直接執行檔案，不修改已匯入的模組與位元組碼快取）"""
+    if reload:
+        path = config_module_file()
+        namespace = runpy.run_path(path) if path else {}
+    else:
+        try:
+            import config
+            namespace = vars(config)
+        except ImportError:
+            namespace = {}
+    return {key: namespace[key] for key in SOURCE_KEYS if key in namespace}
+
+
+class ConfigManager:
+    """配置快照的載入、監看與替換
+
+    監聽者 listener(old, new, changed) 在替換後於事件迴圈上同步呼叫，
+    changed 為變更的欄位名稱，監聽者只需重建受影響的元件。
+    """
+
+    def __init__(self, config=None, overrides=None, environ=None):
+        self.config = {**DEFAULT_RELOAD_CONFIG, **CONFIG_RELOAD_CONFIG, **(config or {})}
+        self.overrides = dict(overrides or {})
+        self.environ = environ
+        self.listeners = []
+        self.reloads = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._task = None
+        self._reload_task = None
+        self._mtimes = self._stat()
+        self.current = build_snapshot(self._read(reload=False))
+
+    def watched_files(self):
+        return [path for path in (config_module_file(), self.config['toml_file']) if path]
+
+    def _stat(self):
+        mtimes = {}
+        for path in self.watched_files():
+            try:
+                stat = os.stat(path)
+                mtimes[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def _read(self, reload):
+        try:
+            values = read_config_module(reload)
+            merge_values(values, read_toml(self.config['toml_file']))
+            merge_values(values, read_env(self.config['env_prefix'], self.environ))
+        except Exception as e:
+            raise ConfigError(f"{type(e).__name__}: {e}") from e
+        # 終端或WebUI輸入的配置直接覆蓋
+        values.update(self.overrides)
+        return values
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def set_overrides(self, overrides):
+        """設定終端或WebUI輸入的配置並重新建立快照"""
+        self.overrides = dict(overrides)
+        return self.reload(reload_files=False)
+
+    async def set_overrides_async(self, overrides):
+        """與 set_overrides 相同，讀取在執行緒中進行"""
+        self.overrides = dict(overrides)
+        return await self.reload_async(reload_files=False)
+
+    def reload(self, reload_files=True):
+        """重新讀取所有來源並替換快照，回傳變更的欄位
+
+        讀取失敗（例如 config.py 語法錯誤）時保留目前的快照。
+        """
+        try:
+            values = self._read(reload=reload_files)
+        except ConfigError as e:
+            return self._read_failed(e)
+        return self._replace(values)
+
+    async def reload_async(self, reload_files=True):
+        """與 reload 相同，但設定檔的讀取與執行在執行緒中進行，不阻塞事件迴圈
+
+        快照替換與監聽者通知仍在事件迴圈上進行。
+        """
+        try:
+            values = await asyncio.to_thread(self._read, reload_files)
+        except ConfigError as e:
+            return self._read_failed(e)
+        return self._replace(values)
+
+    def _read_failed(self, error):
+        self.errors += 1
+        logger.error(f"重新載入配置失敗，繼續使用目前的配置: {error}")
+        return set()
+
+    def _replace(self, values):
+        """以讀取到的配置建立新快照並替換，通知監聽者"""
+        with self._lock:
+            try:
+                snapshot = build_snapshot(values, self.current.version + 1)
+            except (TypeError, ValueError) as e:
+                return self._read_failed(e)
+
+            old = self.current
+            changed = old.changed(snapshot)
+            if not changed:
+                return changed
+            # 單一指派，讀取端只會看到完整的舊快照或新快照
+            self.current = snapshot
+            self.reloads += 1
+
+        logger.info(f"配置已重新載入（版本 {snapshot.version}），變更: {', '.join(sorted(changed))}")
+        for listener in list(self.listeners):
+            try:
+                listener(old, snapshot, changed)
+            except Exception as e:
+                logger.error(f"套用新配置時發生錯誤: {e}")
+        return changed
+
+    def check_files(self):
+        """設定檔修改時間改變時重新載入"""
+        mtimes = self._stat()
+        if mtimes == self._mtimes:
+            return set()
+        self._mtimes = mtimes
+        return self.reload()
+
+    async def check_files_async(self):
+        """與 check_files 相同，檔案狀態與內容在執行緒中讀取"""
+        mtimes = await asyncio.to_thread(self._stat)
+        if mtimes == self._mtimes:
+            return set()
+        self._mtimes = mtimes
+        return await self.reload_async()
+
+    def _schedule_reload(self):
+        """SIGHUP：在事件迴圈上排程重新載入"""
+        self._reload_task = asyncio.get_running_loop().create_task(self.reload_async())
+
+    def start(self):
+        """在目前的事件迴圈上啟動監看"""
+        if not self.config['enabled'] or self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._task = loop.create_task(self._watch())
+        if hasattr(signal, 'SIGHUP'):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, self._schedule_reload)
+            except (NotImplementedError, RuntimeError):
+                pass
+        logger.info(f"配置監看已啟動: {', '.join(self.watched_files())}")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.config['interval'])
+            # config.py 以 runpy 執行，於執行緒中讀取以免阻塞事件迴圈
+            await self.check_files_async()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if hasattr(signal, 'SIGHUP'):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            except (NotImplementedError, RuntimeError):
+                pass
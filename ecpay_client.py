@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+import urllib.parse
+
+import aiohttp
+
+from config import USE_TEST_ENVIRONMENT
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import ECPAY_TEST_QUERY_URL, ECPAY_PROD_QUERY_URL
+except ImportError:
+    ECPAY_TEST_QUERY_URL = "https://payment-stage.ecpay.com.tw/Cashier/QueryTradeInfo/V5"
+    ECPAY_PROD_QUERY_URL = "https://payment.ecpay.com.tw/Cashier/QueryTradeInfo/V5"
+
+try:
+    from config import ECPAY_HTTP_CONFIG
+except ImportError:
+    ECPAY_HTTP_CONFIG = {}
+
+DEFAULT_HTTP_CONFIG = {
+    "limit": 20,               # 連線池總連線數
+    "limit_per_host": 10,      # 每個主機的連線數上限
+    "keepalive_timeout": 30,   # keep-alive保留時間(秒)
+    "connect_timeout": 5,      # 連線逾時(秒)
+    "total_timeout": 10,       # 單次請求逾時(秒)
+    "retries": 2,              # 失敗重試次數
+    "backoff": 0.5,            # 重試間隔基數(秒)
+}
+
+# ECPay交易狀態對應表
+TRADE_STATUS = {
+    '0': {'name': '未付款', 'emoji': '⏳', 'color': 0xFFA500},
+    '1': {'name': '已付款', 'emoji': '✅', 'color': 0x00FF00},
+    '10200095': {'name': '交易失敗', 'emoji': '❌', 'color': 0xFF0000},
+    '10200047': {'name': '查無交易', 'emoji': '❓', 'color': 0x808080},
+}
+
+UNKNOWN_STATUS = {'name': '未知狀態', 'emoji': '❔', 'color': 0x808080}
+
+
+class ECPayClientError(Exception):
+    """ECPay API請求失敗"""
+
+
+def get_trade_status_info(trade_status):
+    """取得交易狀態資訊"""
+    return TRADE_STATUS.get(f"{trade_status}", UNKNOWN_STATUS)
+
+
+class ECPayClient:
+    """ECPay非同步HTTP客戶端
+
+    所有請求共用同一個keep-alive連線池，並限制每個主機的連線數，
+    逾時或伺服器錯誤時以指數退避重試。
+    """
+
+    def __init__(self, ecpay_handler, query_url=None, config=None):
+        self.ecpay_handler = ecpay_handler
+        self.query_url = query_url or (ECPAY_TEST_QUERY_URL if USE_TEST_ENVIRONMENT else ECPAY_PROD_QUERY_URL)
+        self.config = {**DEFAULT_HTTP_CONFIG, **ECPAY_HTTP_CONFIG, **(config or {})}
+        self._session = None
+
+    async def get_session(self):
+        """取得共用的HTTP連線（第一次使用時建立）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config['limit'],
+                limit_per_host=self.config['limit_per_host'],
+                keepalive_timeout=self.config['keepalive_timeout'],
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.config['total_timeout'],
+                connect=self.config['connect_timeout'],
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        """關閉連線池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def post_form(self, url, data):
+        """送出表單請求（含重試），回傳回應文字"""
+        session = await self.get_session()
+        retries = self.config['retries']
+
+        for attempt in range(retries + 1):
+            try:
+                async with session.post(url, data=data) as response:
+                    if response.status == 200:
+                        return await response.text()
+                    error = ECPayClientError(f"ECPay請求失敗: HTTP {response.status}")
+                    if response.status < 500:
+                        # 4xx錯誤重試也不會成功
+                        raise error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = ECPayClientError(f"ECPay請求失敗: {str(e) or type(e).__name__}")
+
+            if attempt >= retries:
+                raise error
+            delay = self.config['backoff'] * (2 ** attempt)
+            logger.warning(f"{error}，{delay:.1f}秒後重試 ({attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
+
+    async def query_trade_info(self, trade_no):
+        """查詢交易狀態（QueryTradeInfo）"""
+        config = self.ecpay_handler.config
+        params = {
+            'MerchantID': config['MerchantID'],
+            'MerchantTradeNo': trade_no,
+            'TimeStamp': str(int(time.time())),
+        }
+        params['CheckMacValue'] = self.ecpay_handler.signer.sign(params)
+
+        text = await self.post_form(self.query_url, params)
+        result = dict(urllib.parse.parse_qsl(text, keep_blank_values=True))
+
+        if 'CheckMacValue' in result and not self.ecpay_handler.signer.verify(result):
+            raise ECPayClientError("ECPay回應檢查碼驗證失敗")
+
+        result['status_info'] = get_trade_status_info(result.get('TradeStatus'))
+        return result
+
+    async def query_many(self, trade_nos, concurrency=10):
+        """並行查詢多筆交易狀態，依完成順序產生 (trade_no, result, error)"""
+        async for item in query_many(self.query_trade_info, trade_nos, concurrency):
+            yield item
+
+
+async def query_many(query, trade_nos, concurrency=10):
+    """以 query 並行查詢多筆交易，依完成順序產生 (trade_no, result, error)
+
+    重複的交易編號只會查詢一次，同時進行的請求數量以 concurrency 限制。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def query_one(trade_no):
+        async with semaphore:
+            try:
+                return trade_no, await query(trade_no), None
+            except ECPayClientError as e:
+                return trade_no, None, e
+
+    tasks = [asyncio.ensure_future(query_one(trade_no)) for trade_no in dict.fromkeys(trade_nos)]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
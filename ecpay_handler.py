@@ -1,17 +1,21 @@
-import hashlib
-import urllib.parse
 from datetime import datetime, timedelta
-import requests
 import logging
-import json
+import time
 from config import ECPAY_CONFIG, ECPAY_TEST_URL, ECPAY_PROD_URL, USE_TEST_ENVIRONMENT
+from ecpay_signer import CheckMacSigner
+from payment_form import PaymentFormRenderer
+from metrics import SIGNING_SECONDS
 
 logger = logging.getLogger(__name__)
 
 class ECPayHandler:
     def __init__(self):
-        self.config = ECPAY_CONFIG
-        self.api_url = ECPAY_TEST_URL if USE_TEST_ENVIRONMENT else ECPAY_PROD_URL
+        # (ECPay設定, 付款網址) 以單一屬性保存，重新載入配置時一次替換
+        self._settings = (ECPAY_CONFIG, ECPAY_TEST_URL if USE_TEST_ENVIRONMENT else ECPAY_PROD_URL)
+        self._signer = None
+        self._form_renderer = None
+        # 回調驗證成功時通知的函式（例如清除交易狀態快取）
+        self.callback_listeners = []
         
         # 付款方式對應表
         self.payment_methods = {
@@ -90,55 +94,83 @@ class ECPayHandler:
         """取得超商類型資訊"""
         return self.store_types.get(store_type, self.store_types['ALL'])
 
+    @property
+    def config(self):
+        return self._settings[0]
+
+    @config.setter
+    def config(self, config):
+        self._settings = (config, self._settings[1])
+
+    @property
+    def api_url(self):
+        return self._settings[1]
+
+    @api_url.setter
+    def api_url(self, api_url):
+        self._settings = (self._settings[0], api_url)
+
+    def apply_config(self, config, api_url):
+        """同時替換ECPay設定與付款網址（進行中的訂單繼續使用開始時的設定）"""
+        self._settings = (config, api_url)
+
+    def signer_for(self, config):
+        """取得對應HashKey/HashIV的簽章器（設定變更時自動重建）"""
+        signer = self._signer
+        if signer is None or not signer.matches(config):
+            signer = self._signer = CheckMacSigner.from_config(config)
+        return signer
+
+    @property
+    def signer(self):
+        """取得對應目前HashKey/HashIV的簽章器"""
+        return self.signer_for(self.config)
+
+    def form_renderer_for(self, api_url):
+        """取得對應付款網址的表單產生器"""
+        renderer = self._form_renderer
+        if renderer is None or renderer.api_url != api_url:
+            renderer = self._form_renderer = PaymentFormRenderer(api_url)
+        return renderer
+
+    @property
+    def form_renderer(self):
+        """取得對應目前付款網址的表單產生器"""
+        return self.form_renderer_for(self.api_url)
+
     def generate_check_mac_value(self, params):
         """產生檢查碼"""
         # 移除CheckMacValue參數
         if 'CheckMacValue' in params:
             del params['CheckMacValue']
         
-        # 按照字母順序排序
-        sorted_params = sorted(params.items())
-        
-        # 組合字串
-        query_string = '&'.join([f"{key}={value}" for key, value in sorted_params])
-        
-        # 加上HashKey和HashIV
-        raw_string = f"HashKey={self.config['HashKey']}&{query_string}&HashIV={self.config['HashIV']}"
-        
-        # URL編碼
-        encoded_string = urllib.parse.quote_plus(raw_string, safe='')
-        
-        # 轉小寫
-        encoded_string = encoded_string.lower()
-        
-        # SHA256加密
-        check_mac_value = hashlib.sha256(encoded_string.encode('utf-8')).hexdigest().upper()
-        
-        return check_mac_value
+        return self.signer.sign(params)
     
-    def create_payment_form(self, trade_no, total_amount, trade_desc, item_name, payment_method="CVS", store_type="ALL", installment_period=None):
-        """建立付款表單"""
+    def create_payment_form(self, trade_no, total_amount, trade_desc, item_name, payment_method="CVS", store_type="ALL", installment_period=None, config=None):
+        """建立付款表單（config 未提供時使用目前的ECPay設定）"""
+        config = config or self.config
+        
         # 計算到期日
-        expire_date = (datetime.now() + timedelta(days=self.config['ExpireDate'])).strftime('%Y/%m/%d')
+        expire_date = (datetime.now() + timedelta(days=config['ExpireDate'])).strftime('%Y/%m/%d')
         create_time = datetime.now()
-        expire_time = create_time + timedelta(days=self.config['ExpireDate'])
+        expire_time = create_time + timedelta(days=config['ExpireDate'])
         
         # 取得付款方式資訊
         payment_info = self.get_payment_method_info(payment_method)
         
         # 基本參數
         params = {
-            'MerchantID': self.config['MerchantID'],
+            'MerchantID': config['MerchantID'],
             'MerchantTradeNo': trade_no,
             'MerchantTradeDate': create_time.strftime('%Y/%m/%d %H:%M:%S'),
-            'PaymentType': self.config['PaymentType'],
+            'PaymentType': config['PaymentType'],
             'TotalAmount': str(total_amount),
             'TradeDesc': trade_desc,
             'ItemName': item_name,
-            'ReturnURL': self.config.get('PaymentInfoURL', ''),
+            'ReturnURL': config.get('ReturnURL') or config.get('PaymentInfoURL', ''),
             'ChoosePayment': payment_info['choose_payment'],
-            'EncryptType': str(self.config['EncryptType']),
-            'ClientRedirectURL': self.config.get('ClientRedirectURL', ''),
+            'EncryptType': str(config['EncryptType']),
+            'ClientRedirectURL': config.get('ClientRedirectURL', ''),
         }
         
         # 根據付款方式添加特殊參數
@@ -156,8 +188,14 @@ class ECPayHandler:
             atm_expire_date = (datetime.now() + timedelta(days=3)).strftime('%Y/%m/%d')
             params['ExpireDate'] = atm_expire_date
         
+        if payment_method in ['CVS', 'BARCODE', 'ATM'] and config.get('ReturnURL') and config.get('PaymentInfoURL'):
+            # 另外設定ReturnURL時，取號結果送至PaymentInfoURL
+            params['PaymentInfoURL'] = config['PaymentInfoURL']
+        
         # 產生檢查碼
-        params['CheckMacValue'] = self.generate_check_mac_value(params.copy())
+        started = time.perf_counter()
+        params['CheckMacValue'] = self.signer_for(config).sign(params)
+        SIGNING_SECONDS.observe(time.perf_counter() - started)
         
         # 建立訂單資訊物件
         order_info = {
@@ -168,7 +206,7 @@ class ECPayHandler:
             'create_time': create_time,
             'expire_time': expire_time,
             'expire_date': expire_date,
-            'merchant_id': self.config['MerchantID'],
+            'merchant_id': config['MerchantID'],
             'payment_method': payment_method,
             'payment_info': payment_info,
             'store_type': store_type,
@@ -278,39 +316,25 @@ class ECPayHandler:
     def verify_callback(self, callback_data):
         """驗證回調資料"""
         try:
-            # 取得回調的CheckMacValue
-            received_check_mac = callback_data.get('CheckMacValue', '')
-            
-            # 重新計算CheckMacValue
-            calculated_check_mac = self.generate_check_mac_value(callback_data.copy())
+            # 重新計算CheckMacValue並比對檢查碼
+            if not self.signer.verify(callback_data):
+                return False
             
-            # 比對檢查碼
-            return received_check_mac.upper() == calculated_check_mac.upper()
+            for listener in self.callback_listeners:
+                listener(callback_data)
+            return True
         except Exception as e:
             logger.error(f"驗證回調資料時發生錯誤: {e}")
             return False
     
-    def generate_payment_url(self, trade_no, total_amount, trade_desc, item_name, payment_method="CVS", store_type="ALL", installment_period=None):
-        """產生付款網址"""
-        params, order_info = self.create_payment_form(trade_no, total_amount, trade_desc, item_name, payment_method, store_type, installment_period)
+    def generate_payment_url(self, trade_no, total_amount, trade_desc, item_name, payment_method="CVS", store_type="ALL", installment_period=None, as_bytes=False):
+        """產生付款網址（as_bytes為True時表單以UTF-8位元組回傳）"""
+        # 整筆訂單使用同一份設定，重新載入配置不會影響進行中的訂單
+        config, api_url = self._settings
+        params, order_info = self.create_payment_form(trade_no, total_amount, trade_desc, item_name, payment_method, store_type, installment_period, config=config)
         
         # 建立表單HTML
-        form_html = f"""
-        <html>
-        <head><meta charset="utf-8"></head>
-        <body>
-        <form id="ecpay_form" method="post" action="{self.api_url}">
-        """
-        
-        for key, value in params.items():
-            form_html += f'<input type="hidden" name="{key}" value="{value}">\n'
-        
-        form_html += """
-        </form>
-        <script>document.getElementById('ecpay_form').submit();</script>
-        </body>
-        </html>
-        """
+        form_html = self.form_renderer_for(api_url).render(params, as_bytes=as_bytes)
         
         return form_html, params, order_info
     
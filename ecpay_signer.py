@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import urllib.parse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 參數值編碼快取上限（MerchantID、PaymentType、ReturnURL等重複值會命中快取）
+DEFAULT_CACHE_SIZE = 4096
+
+
+class CheckMacSigner:
+    """可重複使用的CheckMacValue簽章器
+
+    與 ECPayHandler.generate_check_mac_value 產生完全相同的檢查碼，
+    但HashKey/HashIV前後綴只在建立時編碼一次，重複出現的參數值也會快取編碼結果。
+    URL編碼與轉小寫都是逐字元處理，因此可以分段編碼後再串接。
+    """
+
+    def __init__(self, hash_key, hash_iv, cache_size=DEFAULT_CACHE_SIZE):
+        self.hash_key = hash_key
+        self.hash_iv = hash_iv
+        self.cache_size = cache_size
+
+        # 預先編碼 "HashKey=...&" 與 "&HashIV=..."
+        self._prefix = self._quote(f"HashKey={hash_key}&")
+        self._suffix = self._quote(f"&HashIV={hash_iv}")
+        self._separator = self._quote("&")
+        self._equals = self._quote("=")
+
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config, cache_size=DEFAULT_CACHE_SIZE):
+        """從ECPAY_CONFIG建立簽章器"""
+        return cls(config.get('HashKey', ''), config.get('HashIV', ''), cache_size)
+
+    def matches(self, config):
+        """檢查簽章器是否仍對應目前的HashKey/HashIV"""
+        return self.hash_key == config.get('HashKey', '') and self.hash_iv == config.get('HashIV', '')
+
+    @staticmethod
+    def _quote(text):
+        return urllib.parse.quote_plus(text, safe='').lower()
+
+    def _encode(self, text):
+        """編碼單一參數名稱或值（含快取）"""
+        encoded = self._cache.get(text)
+        if encoded is not None:
+            self.hits += 1
+            return encoded
+
+        self.misses += 1
+        encoded = self._quote(text)
+        if len(self._cache) >= self.cache_size:
+            # 快取已滿時整批清空，避免唯一值（交易編號、時間）無限累積
+            self._cache.clear()
+        self._cache[text] = encoded
+        return encoded
+
+    def encode_payload(self, params):
+        """產生待雜湊的已編碼字串（不含CheckMacValue）"""
+        encode = self._encode
+        equals = self._equals
+        parts = [
+            encode(key) + equals + encode(f"{params[key]}")
+            for key in sorted(params)
+            if key != 'CheckMacValue'
+        ]
+        return self._prefix + self._separator.join(parts) + self._suffix
+
+    def sign(self, params):
+        """產生檢查碼（不會修改傳入的參數）"""
+        payload = self.encode_payload(params)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest().upper()
+
+    def sign_many(self, params_list):
+        """批次產生檢查碼"""
+        sign = self.sign
+        return [sign(params) for params in params_list]
+
+    def verify(self, params):
+        """驗證參數中的CheckMacValue"""
+        received = f"{params.get('CheckMacValue', '')}".upper()
+        # 固定時間比較，避免由回應時間推測檢查碼（非ASCII字元以位元組比較）
+        return hmac.compare_digest(received.encode('utf-8'), self.sign(params).encode('ascii'))
+
+    def stats(self):
+        """取得快取統計"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._cache),
+        }
@@ -0,0 +1,253 @@
+import discord
+
+# 超商資訊
+STORE_INFO = {
+    "ALL": {
+        "name": "全通用",
+        "description": "可在所有支援的超商繳費",
+        "color": 0x00ff00
+    },
+    "SEVEN": {
+        "name": "7-ELEVEN",
+        "description": "專用於7-ELEVEN ibon機台繳費",
+        "color": 0xff6600
+    },
+    "FAMILY": {
+        "name": "全家便利商店",
+        "description": "專用於全家便利商店繳費",
+        "color": 0x0066ff
+    },
+    "HILIFE": {
+        "name": "萊爾富",
+        "description": "專用於萊爾富便利商店繳費",
+        "color": 0xff0066
+    },
+    "OK": {
+        "name": "OK便利商店",
+        "description": "專用於OK便利商店繳費",
+        "color": 0x66ff00
+    }
+}
+
+# 超商繳費步驟
+STORE_STEPS = {
+    "FAMILY": "1️⃣ 前往全家便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
+    "HILIFE": "1️⃣ 前往萊爾富便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
+    "OK": "1️⃣ 前往OK便利商店\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼給店員\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證"
+}
+
+DEFAULT_STORE_STEPS = "1️⃣ 前往指定超商\n2️⃣ 告知店員「代碼繳費」\n3️⃣ 提供繳費代碼\n4️⃣ 完成繳費"
+
+def get_store_info(store_type):
+    """取得超商資訊"""
+    return STORE_INFO.get(store_type, STORE_INFO["ALL"])
+
+
+def get_store_steps(store_type):
+    """取得超商繳費步驟"""
+    return STORE_STEPS.get(store_type, DEFAULT_STORE_STEPS)
+
+
+def build_help_embed(bot_version, include_owner, timestamp=None):
+    """建立 /help 嵌入訊息"""
+    embed = discord.Embed(
+        title="🤖 ECPay Discord Bot 指令說明",
+        description=f"**版本:** {bot_version}\n以下是所有可用的指令：",
+        color=0x00ff00,
+        timestamp=timestamp
+    )
+    
+    # 付款相關指令
+    embed.add_field(
+        name="💳 付款相關指令",
+        value="`/建立繳費單` - 建立ECPay超商繳費單（舊版）\n`/建立付款單` - 建立ECPay付款單（支援多種付款方式）\n`/查詢付款狀態` - 查詢付款狀態\n`/批次查詢付款狀態` - 一次查詢多筆付款狀態\n`/繳費說明` - 顯示繳費功能說明",
+        inline=False
+    )
+    
+    # 資訊指令
+    embed.add_field(
+        name="ℹ️ 資訊指令",
+        value="`/help` - 顯示此說明\n`/機器人資訊` - 查看機器人詳細資訊",
+        inline=False
+    )
+    
+    # 管理指令（僅擁有者可見）
+    if include_owner:
+        embed.add_field(
+            name="🔧 管理指令（僅擁有者）",
+            value="`/系統狀況` - 查看伺服器系統狀況",
+            inline=False
+        )
+    
+    # 支援付款方式
+    embed.add_field(
+        name="💳 支援付款方式",
+        value="• 💳 信用卡（一次付清/分期付款）\n• 🏧 網路ATM\n• 🏧 ATM櫃員機\n• 🏪 超商代碼\n• 📊 超商條碼\n• 📱 Google Pay（需特別申請）\n• 🍎 Apple Pay",
+        inline=False
+    )
+    
+    # 支援超商
+    embed.add_field(
+        name="🏪 支援超商（超商付款）",
+        value="• 🏪 全通用（所有超商）\n• 🏪 7-ELEVEN (ibon機台)\n• 🏪 全家便利商店\n• 🏪 萊爾富\n• 🏪 OK便利商店",
+        inline=False
+    )
+    
+    # 付款限制
+    embed.add_field(
+        name="💰 付款限制",
+        value="• 超商付款: NT$ 1 - 20,000\n• 信用卡付款: NT$ 1 - 1,000,000\n• ATM付款: NT$ 1 - 50,000\n• 繳費期限: 7天（ATM為3天）",
+        inline=False
+    )
+    
+    embed.set_footer(text=f"ECPay Discord Bot v{bot_version}")
+    return embed
+
+
+def build_help_ecpay_embed(bot_version, timestamp=None):
+    """建立 /繳費說明 嵌入訊息"""
+    embed = discord.Embed(
+        title="📚 ECPay Discord Bot 使用說明",
+        description=f"這個Bot可以幫助您建立ECPay多種付款方式的付款單\n**版本:** {bot_version}",
+        color=0x0099ff,
+        timestamp=timestamp
+    )
+    
+    embed.add_field(
+        name="🔧 可用指令",
+        value="`/建立繳費單` - 建立超商繳費單（舊版）\n`/建立付款單` - 建立多種付款方式付款單\n`/查詢付款狀態` - 查詢付款狀態\n`/批次查詢付款狀態` - 一次查詢多筆付款狀態\n`/繳費說明` - 顯示此說明",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="💳 支援付款方式",
+        value="• 💳 **信用卡**：一次付清或分期付款（3/6/12/18/24期）\n• 🏧 **網路ATM**：線上金融卡轉帳\n• 🏧 **ATM櫃員機**：實體ATM轉帳\n• 🏪 **超商代碼**：超商代碼繳費\n• 📊 **超商條碼**：超商條碼繳費\n• 📱 **Google Pay**：Google行動支付\n• 🍎 **Apple Pay**：Apple行動支付",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="💰 付款限制",
+        value="• **超商付款**：NT$ 1 - 20,000\n• **信用卡付款**：NT$ 1 - 1,000,000\n• **ATM付款**：NT$ 1 - 50,000\n• **繳費期限**：7天（ATM為3天）",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="🏪 支援超商（超商付款）",
+        value="• 🏪 **全通用**：適用所有支援超商\n• 🏪 **7-ELEVEN**：ibon機台專用\n• 🏪 **全家便利商店**：櫃台繳費\n• 🏪 **萊爾富**：櫃台繳費\n• 🏪 **OK便利商店**：櫃台繳費",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="📱 使用方式",
+        value="1️⃣ 使用 `/建立付款單` 指令\n2️⃣ 選擇付款方式和金額\n3️⃣ 填寫商品資訊\n4️⃣ 根據付款方式完成付款\n5️⃣ 保留付款憑證",
+        inline=False
+    )
+    
+    embed.add_field(
+        name="⚠️ 注意事項",
+        value="• Google Pay需要特別申請才能使用\n• 信用卡分期需選擇期數\n• 超商付款需選擇超商類型\n• 付款資訊僅能使用一次\n• 請在期限內完成付款",
+        inline=False
+    )
+    
+    embed.set_footer(text=f"ECPay Discord Bot v{bot_version}")
+    return embed
+
+
+def add_payment_instructions(embed, payment_method, store_type):
+    """根據付款方式添加使用說明（store_type為None表示未選擇超商）"""
+    if payment_method == 'CVS':
+        # 超商代碼說明
+        if store_type == "ALL":
+            embed.add_field(
+                name="🏪 繳費步驟",
+                value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
+                inline=False
+            )
+        elif store_type == "SEVEN":
+            embed.add_field(
+                name="📱 ibon機台繳費步驟",
+                value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
+                inline=False
+            )
+        else:
+            store_steps = get_store_steps(store_type or "ALL")
+            embed.add_field(
+                name=f"🏪 繳費步驟",
+                value=store_steps,
+                inline=False
+            )
+    
+    elif payment_method == 'BARCODE':
+        embed.add_field(
+            name="📊 條碼繳費步驟",
+            value="1️⃣ 前往任一支援的超商\n2️⃣ 告知店員「條碼繳費」\n3️⃣ 出示上方三組條碼給店員掃描\n4️⃣ 確認金額後完成繳費\n5️⃣ 保留收據作為憑證",
+            inline=False
+        )
+    
+    elif payment_method == 'ATM':
+        embed.add_field(
+            name="🏧 ATM轉帳步驟",
+            value="1️⃣ 前往任一ATM櫃員機\n2️⃣ 選擇「轉帳」功能\n3️⃣ 輸入銀行代碼和虛擬帳號\n4️⃣ 輸入轉帳金額\n5️⃣ 確認資訊後完成轉帳\n6️⃣ 保留交易明細",
+            inline=False
+        )
+    
+    elif payment_method == 'WEBATM':
+        embed.add_field(
+            name="🌐 網路ATM步驟",
+            value="1️⃣ 點擊付款連結\n2️⃣ 選擇您的銀行\n3️⃣ 插入金融卡並輸入密碼\n4️⃣ 確認交易資訊\n5️⃣ 完成轉帳付款",
+            inline=False
+        )
+    
+    elif payment_method == 'CREDIT':
+        embed.add_field(
+            name="💳 信用卡付款步驟",
+            value="1️⃣ 點擊付款連結\n2️⃣ 輸入信用卡資訊\n3️⃣ 輸入安全驗證碼\n4️⃣ 確認交易資訊\n5️⃣ 完成付款",
+            inline=False
+        )
+    
+    elif payment_method == 'CREDIT_INSTALLMENT':
+        embed.add_field(
+            name="💳 信用卡分期步驟",
+            value="1️⃣ 點擊付款連結\n2️⃣ 輸入信用卡資訊\n3️⃣ 選擇分期期數\n4️⃣ 確認每期金額\n5️⃣ 完成分期付款設定",
+            inline=False
+        )
+    
+    elif payment_method == 'GOOGLEPAY':
+        embed.add_field(
+            name="📱 Google Pay步驟",
+            value="1️⃣ 點擊付款連結\n2️⃣ 選擇Google Pay\n3️⃣ 使用手機驗證\n4️⃣ 確認付款資訊\n5️⃣ 完成付款",
+            inline=False
+        )
+    
+    elif payment_method == 'APPLEPAY':
+        embed.add_field(
+            name="🍎 Apple Pay步驟",
+            value="1️⃣ 點擊付款連結\n2️⃣ 選擇Apple Pay\n3️⃣ 使用Touch ID或Face ID驗證\n4️⃣ 確認付款資訊\n5️⃣ 完成付款",
+            inline=False
+        )
+
+
+def add_store_instructions(embed, store_type):
+    """/建立繳費單 依超商類型添加繳費步驟"""
+    if store_type == "ALL":
+        # 全通用說明
+        embed.add_field(
+            name="🏪 繳費步驟",
+            value="**ibon機台（7-ELEVEN）:**\n使用14位數ibon代碼\n\n**其他超商（全家/萊爾富/OK）:**\n使用一般繳費代碼，告知店員「代碼繳費」",
+            inline=False
+        )
+    elif store_type == "SEVEN":
+        # 7-ELEVEN專用說明
+        embed.add_field(
+            name="📱 ibon機台繳費步驟",
+            value="1️⃣ 前往7-ELEVEN找到ibon機台\n2️⃣ 點選「儲值/繳費」\n3️⃣ 選擇「繳費」\n4️⃣ 選擇「輸入代碼」\n5️⃣ 輸入上方14位數繳費代碼\n6️⃣ 確認金額後列印繳費單\n7️⃣ 持繳費單至櫃台付款",
+            inline=False
+        )
+    else:
+        # 其他超商專用說明
+        store_info = get_store_info(store_type)
+        embed.add_field(
+            name=f"🏪 {store_info['name']}繳費步驟",
+            value=get_store_steps(store_type),
+            inline=False
+        )
@@ -0,0 +1,291 @@
+"""結構化訂單事件記錄
+
+每個事件以一行JSON寫入獨立的輪轉檔案（預設 events.jsonl），供日誌收集程式直接解析：
+
+    {"ts": 1760000000.123, "event": "order_created", "trade_no": "...", ...}
+
+事件類型: order_created, callback_received, status_queried, permission_denied
+
+啟用封存時，輪轉出的檔案會轉為壓縮區段（.seg）：
+    檔頭 SEGMENT_MAGIC，之後為多個區塊，每個區塊為
+    4位元組長度 + 4位元組筆數（big-endian）+ zlib壓縮的JSON行
+
+查詢工具逐區塊解壓，不需將整個檔案載入記憶體：
+    python event_log.py --event order_created --user-id 123456789
+"""
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from log_pipeline import LogPipeline
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import EVENT_LOG_CONFIG
+except ImportError:
+    EVENT_LOG_CONFIG = {}
+
+DEFAULT_EVENT_LOG_CONFIG = {
+    "enabled": True,               # 是否記錄結構化事件
+    "file": "events.jsonl",        # 事件檔案
+    "max_file_size": 10,           # 事件檔案最大大小(MB)
+    "backup_count": 5,             # 保留的備份檔案數量（未啟用封存時）
+    "archive": False,              # 輪轉時是否轉為壓縮區段
+    "archive_dir": "event_archive",  # 壓縮區段存放目錄
+    "frame_size": 65536,           # 每個壓縮區塊的原始大小上限(位元組)
+    "queue_size": 10000,           # 待寫入佇列上限
+    "queue_policy": "block",       # 佇列已滿時: "block" 等待, "drop" 捨棄（order_created、callback_received 一律等待）
+}
+
+# 佇列已滿時也不可捨棄的事件（日誌收集程式依此對帳）
+KEEP_EVENTS = frozenset({'order_created', 'callback_received'})
+
+SEGMENT_MAGIC = b'ECEVSEG1'
+FRAME_HEADER = struct.Struct('>II')
+
+
+def encode_event(record):
+    """將事件序列化為JSON字串（優先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(record).decode('utf-8')
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_event(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def write_segment(source, path, frame_size=DEFAULT_EVENT_LOG_CONFIG['frame_size']):
+    """將JSON行檔案轉為壓縮區段"""
+    with open(source, 'rb') as src, open(path, 'wb') as dst:
+        dst.write(SEGMENT_MAGIC)
+        lines = []
+        size = 0
+        for line in src:
+            lines.append(line)
+            size += len(line)
+            if size >= frame_size:
+                write_frame(dst, lines)
+                lines = []
+                size = 0
+        if lines:
+            write_frame(dst, lines)
+
+
+def write_frame(dst, lines):
+    payload = zlib.compress(b''.join(lines))
+    dst.write(FRAME_HEADER.pack(len(payload), len(lines)))
+    dst.write(payload)
+
+
+def iter_segment(path):
+    """逐筆讀取壓縮區段中的事件（每次只解壓一個區塊）"""
+    with open(path, 'rb') as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"不是事件封存區段: {path}")
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            length, _ = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                raise ValueError(f"事件封存區段不完整: {path}")
+            for line in zlib.decompress(payload).splitlines():
+                if line:
+                    yield decode_event(line)
+
+
+def iter_jsonl(path):
+    """逐行讀取JSON行事件檔案"""
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield decode_event(line)
+
+
+def iter_events(path):
+    """依副檔名讀取事件檔案或壓縮區段"""
+    if path.endswith('.seg'):
+        return iter_segment(path)
+    return iter_jsonl(path)
+
+
+def default_paths(config=None):
+    """預設查詢的檔案：封存區段（依時間排序）、備份檔與目前的事件檔案"""
+    config = {**DEFAULT_EVENT_LOG_CONFIG, **EVENT_LOG_CONFIG, **(config or {})}
+    paths = []
+    archive_dir = config['archive_dir']
+    if os.path.isdir(archive_dir):
+        paths.extend(sorted(
+            os.path.join(archive_dir, name) for name in os.listdir(archive_dir) if name.endswith('.seg')
+        ))
+    for index in range(config['backup_count'], 0, -1):
+        backup = f"{config['file']}.{index}"
+        if os.path.exists(backup):
+            paths.append(backup)
+    if os.path.exists(config['file']):
+        paths.append(config['file'])
+    return paths
+
+
+def scan(paths, event=None, trade_no=None, user_id=None, since=None):
+    """串流掃描事件並依條件篩選"""
+    for path in paths:
+        for record in iter_events(path):
+            if event and record.get('event') != event:
+                continue
+            if trade_no and record.get('trade_no') != trade_no:
+                continue
+            if user_id and record.get('user_id') != user_id:
+                continue
+            if since and record.get('ts', 0) < since:
+                continue
+            yield record
+
+
+class ArchivingRotatingFileHandler(RotatingFileHandler):
+    """輪轉時將舊檔轉為壓縮區段的事件檔案處理器"""
+
+    def __init__(self, filename, archive_dir=None, frame_size=65536, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.archive_dir = archive_dir
+        self.frame_size = frame_size
+
+    def rotate(self, source, dest):
+        if not self.archive_dir:
+            super().rotate(source, dest)
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        name = f"events-{datetime.now():%Y%m%d-%H%M%S}-{time.time_ns() % 1_000_000_000:09d}.seg"
+        write_segment(source, os.path.join(self.archive_dir, name), self.frame_size)
+        os.remove(source)
+
+
+class EventLog:
+    """結構化事件記錄
+
+    事件在呼叫端序列化為一行JSON後放入佇列，由背景執行緒寫入輪轉檔案，
+    不會在事件迴圈上進行磁碟I/O。
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_EVENT_LOG_CONFIG, **EVENT_LOG_CONFIG, **(config or {})}
+        self.path = self.config['file']
+
+        handler = ArchivingRotatingFileHandler(
+            self.path,
+            archive_dir=self.config['archive_dir'] if self.config['archive'] else None,
+            frame_size=self.config['frame_size'],
+            maxBytes=self.config['max_file_size'] * 1024 * 1024,
+            # 封存模式下輪轉不保留備份，但backupCount需大於0才會觸發輪轉
+            backupCount=max(1, self.config['backup_count']),
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        # 捨棄統計不寫入事件檔案，避免混入非JSON內容
+        self.pipeline = LogPipeline([handler], self.config, report_drops=False)
+        self.pipeline.start()
+
+        self._logger = logging.getLogger('ecpay.events')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(self.pipeline.handler)
+
+    def emit(self, event, **fields):
+        """記錄一筆事件"""
+        # drop 策略不捨棄 WARNING 以上的紀錄，必須保留的事件以此等級放入佇列（事件檔案不含等級）
+        level = logging.WARNING if event in KEEP_EVENTS else logging.INFO
+        self._logger.log(level, encode_event({'ts': round(time.time(), 3), 'event': event, **fields}))
+
+    def order_created(self, order_info, user_id=None, guild_id=None, channel_id=None):
+        self.emit(
+            'order_created',
+            trade_no=order_info['trade_no'],
+            user_id=user_id,
+            guild_id=guild_id,
+            channel_id=channel_id,
+            amount=order_info['total_amount'],
+            payment_method=order_info['payment_method'],
+            store_type=order_info.get('store_type'),
+            installment_period=order_info.get('installment_period'),
+        )
+
+    def callback_received(self, kind, data, verified):
+        self.emit(
+            'callback_received',
+            trade_no=data.get('MerchantTradeNo'),
+            kind=kind,
+            rtn_code=data.get('RtnCode'),
+            verified=verified,
+            amount=int(data['TradeAmt']) if str(data.get('TradeAmt', '')).isdigit() else None,
+            payment_type=data.get('PaymentType'),
+        )
+
+    def status_queried(self, trade_no, user_id, result, bulk=False):
+        self.emit(
+            'status_queried',
+            trade_no=trade_no,
+            user_id=user_id,
+            trade_status=result.get('TradeStatus') if result else None,
+            ok=result is not None,
+            bulk=bulk,
+        )
+
+    def permission_denied(self, command, user_id, guild_id=None):
+        self.emit('permission_denied', command=command, user_id=user_id, guild_id=guild_id)
+
+    def close(self):
+        """寫完剩餘事件並關閉檔案"""
+        self._logger.removeHandler(self.pipeline.handler)
+        self.pipeline.stop()
+        for handler in self.pipeline.handlers:
+            handler.close()
+        if self.pipeline.handler.dropped:
+            logger.warning(f"事件佇列已滿，共捨棄 {self.pipeline.handler.dropped} 筆事件")
+
+
+def create_event_log(config=None):
+    """依設定建立事件記錄，未啟用時回傳None"""
+    merged = {**DEFAULT_EVENT_LOG_CONFIG, **EVENT_LOG_CONFIG, **(config or {})}
+    if not merged['enabled']:
+        return None
+    return EventLog(merged)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查詢結構化訂單事件")
+    parser.add_argument('paths', nargs='*', help="事件檔案或壓縮區段（預設為設定中的檔案與封存目錄）")
+    parser.add_argument('--event', help="事件類型")
+    parser.add_argument('--trade-no', help="交易編號")
+    parser.add_argument('--user-id', type=int, help="使用者ID")
+    parser.add_argument('--since', help="起始時間（例如 2025-01-31 或 2025-01-31T12:00）")
+    parser.add_argument('--limit', type=int, help="最多輸出筆數")
+    args = parser.parse_args()
+
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    records = scan(args.paths or default_paths(), args.event, args.trade_no, args.user_id, since)
+    for count, record in enumerate(records, 1):
+        sys.stdout.write(encode_event(record) + '\n')
+        if args.limit and count >= args.limit:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import SHARDING_CONFIG
+except ImportError:
+    SHARDING_CONFIG = {}
+
+DEFAULT_SHARDING_CONFIG = {
+    "enabled": False,          # 是否使用 AutoShardedBot
+    "shard_count": None,       # 分片數量（None表示由Discord建議）
+    "shard_ids": None,         # 此程序負責的分片（None表示全部）
+    "members_intent": False,   # 是否啟用成員事件（需在開發者後台開啟 Server Members Intent）
+}
+
+
+def get_sharding_config(config=None):
+    return {**DEFAULT_SHARDING_CONFIG, **SHARDING_CONFIG, **(config or {})}
+
+
+class GuildStats:
+    """伺服器與用戶數量統計（依事件增量更新）
+
+    只在連線就緒時完整計算一次，之後由加入/離開伺服器與成員事件更新，
+    指令讀取時不需掃描所有伺服器。成員事件需啟用 members intent，
+    未啟用時用戶數量為加入伺服器當下的 member_count。
+    """
+
+    def __init__(self):
+        self._members = {}                 # guild_id -> member_count
+        self._shards = {}                  # guild_id -> shard_id
+        self.shard_guilds = defaultdict(int)
+        self.shard_members = defaultdict(int)
+        self.member_count = 0
+
+    @property
+    def guild_count(self):
+        return len(self._members)
+
+    def rebuild(self, guilds):
+        """依目前的伺服器列表重新計算（連線就緒時呼叫）"""
+        self._members.clear()
+        self._shards.clear()
+        self.shard_guilds.clear()
+        self.shard_members.clear()
+        self.member_count = 0
+        for guild in guilds:
+            self.guild_join(guild)
+
+    def guild_join(self, guild):
+        if guild.id in self._members:
+            self.guild_remove(guild)
+        count = guild.member_count or 0
+        shard_id = guild.shard_id or 0
+        self._members[guild.id] = count
+        self._shards[guild.id] = shard_id
+        self.shard_guilds[shard_id] += 1
+        self.shard_members[shard_id] += count
+        self.member_count += count
+
+    def guild_remove(self, guild):
+        count = self._members.pop(guild.id, None)
+        if count is None:
+            return
+        shard_id = self._shards.pop(guild.id)
+        self.shard_guilds[shard_id] -= 1
+        self.shard_members[shard_id] -= count
+        self.member_count -= count
+
+    def member_delta(self, guild, delta):
+        """成員加入(+1)或離開(-1)"""
+        if guild.id not in self._members:
+            return
+        self._members[guild.id] += delta
+        self.shard_members[self._shards[guild.id]] += delta
+        self.member_count += delta
+
+    def shard_summary(self, bot):
+        """各分片的延遲、伺服器與用戶數量 [(shard_id, latency, guilds, members)]"""
+        latencies = dict(getattr(bot, 'latencies', None) or [(0, bot.latency)])
+        shard_ids = sorted(set(latencies) | set(self.shard_guilds))
+        return [
+            (shard_id, latencies.get(shard_id), self.shard_guilds.get(shard_id, 0), self.shard_members.get(shard_id, 0))
+            for shard_id in shard_ids
+        ]
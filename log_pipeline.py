@@ -0,0 +1,89 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_LOG_QUEUE_CONFIG = {
+    "queue_size": 10000,       # 日誌佇列上限
+    "queue_policy": "block",   # 佇列已滿時: block 等待寫入, drop 捨棄該筆日誌（WARNING以上仍等待寫入）
+}
+
+QUEUE_POLICIES = ('drop', 'block')
+
+
+class BoundedQueueHandler(QueueHandler):
+    """有上限的日誌佇列處理器
+
+    呼叫端只負責格式化並放入佇列，檔案與終端輸出由背景執行緒處理。
+    佇列已滿時依 policy 等待佇列有空位（block）或捨棄該筆日誌（drop）。
+    drop 只捨棄 WARNING 以下的日誌，警告與錯誤一律等待寫入。
+    """
+
+    def __init__(self, log_queue, policy='block'):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"不支援的日誌佇列策略: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.policy == 'block' or record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FlushingQueueListener(QueueListener):
+    """停止時寫完佇列中剩餘日誌並flush所有處理器"""
+
+    def enqueue_sentinel(self):
+        # 佇列已滿時仍需等待放入結束標記
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+class LogPipeline:
+    """非同步日誌管線（QueueHandler + QueueListener）"""
+
+    def __init__(self, handlers, config=None, report_drops=True):
+        self.config = {**DEFAULT_LOG_QUEUE_CONFIG, **(config or {})}
+        self.handlers = handlers
+        self.report_drops = report_drops
+        self.queue = queue.Queue(maxsize=self.config['queue_size'])
+        self.handler = BoundedQueueHandler(self.queue, self.config['queue_policy'])
+        self.listener = FlushingQueueListener(self.queue, *handlers, respect_handler_level=True)
+        self._running = False
+
+    def start(self):
+        if not self._running:
+            self.listener.start()
+            self._running = True
+
+    def stop(self):
+        """寫完剩餘日誌後停止背景執行緒（可重複呼叫）"""
+        if not self._running:
+            return
+        self.listener.stop()
+        self._running = False
+        if self.report_drops and self.handler.dropped:
+            # 背景執行緒已停止，直接寫入處理器
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f"日誌佇列已滿，共捨棄 {self.handler.dropped} 筆日誌", None, None
+            )
+            for handler in self.handlers:
+                handler.handle(record)
+                handler.flush()
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'policy': self.handler.policy,
+        }
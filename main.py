@@ -1,27 +1,63 @@
+import sys
+from startup_timer import StartupTimer, ImportProfiler, startup_profile_report
+
+# 啟動耗時從載入模組開始計算
+startup_timer = StartupTimer()
+# --startup-profile 時記錄各模組的載入時間（需在其他 import 之前安裝）
+import_profiler = ImportProfiler.install() if '--startup-profile' in sys.argv else None
+
 import discord
 from discord.ext import commands
 import logging
 import asyncio
-import threading
+import argparse
+import atexit
 import getpass
-from datetime import datetime
+import time
+from importlib.util import find_spec
 from logging.handlers import RotatingFileHandler
 
 # 檢查是否需要WebUI
 try:
     from config import USE_WEB_UI, WEB_UI_CONFIG
-    if USE_WEB_UI:
-        from flask import Flask, render_template_string, request, jsonify
-        from flask_cors import CORS
 except ImportError:
     USE_WEB_UI = False
+    WEB_UI_CONFIG = {}
+
+# WebUI伺服器: flask（背景執行緒）或 aiohttp（與Bot共用事件迴圈）
+WEB_UI_SERVER = WEB_UI_CONFIG.get('server', 'flask') if USE_WEB_UI else None
+if WEB_UI_SERVER == 'flask' and not (find_spec('flask') and find_spec('flask_cors')):
+    # 未安裝Flask時改用終端配置
+    USE_WEB_UI = False
+    WEB_UI_SERVER = None
 
-from config import DISCORD_BOT_TOKEN, ALLOWED_ROLE_IDS, LOG_CONFIG, BOT_VERSION, BOT_OWNER_ID
+from config import ALLOWED_ROLE_IDS, LOG_CONFIG, BOT_VERSION
 from ecpay_handler import ECPayHandler
+from order_broker import create_order_executor
+from trade_no import TradeNoGenerator
+from ecpay_client import ECPayClient
+from trade_status_cache import TradeStatusCache
+from order_store import create_order_store
+from event_log import create_event_log
+from callback_server import CallbackReceiver
+from checkout import create_checkout_service
+from system_sampler import SystemSampler
+from guild_stats import GuildStats, get_sharding_config
+from permission_service import PermissionService
+from rate_limiter import RateLimiter
+from command_sync import CommandSyncer
+from config_snapshot import ConfigManager
+from log_pipeline import LogPipeline
+from metrics import QUEUE_DEPTH, create_metrics_server, observe_command
 
 # 設定日誌系統
 def setup_logging():
-    """設定日誌系統"""
+    """設定日誌系統
+
+    檔案與終端輸出由背景執行緒處理，記錄日誌時只需放入佇列，
+    不會在事件迴圈上進行磁碟I/O或日誌輪轉。
+    """
+    global log_pipeline
     # 清除現有的處理器
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
@@ -51,6 +87,12 @@ def setup_logging():
         console_handler.setFormatter(formatter)
         handlers.append(console_handler)
     
+    # 以佇列交由背景執行緒寫入
+    log_pipeline = LogPipeline(handlers, LOG_CONFIG)
+    log_pipeline.start()
+    atexit.register(log_pipeline.stop)
+    handlers = [log_pipeline.handler]
+    
     # 設定應用程式日誌
     app_logger = logging.getLogger(__name__)
     app_logger.setLevel(getattr(logging, LOG_CONFIG['level']))
@@ -89,21 +131,26 @@ def setup_logging():
     return app_logger
 
 # 初始化日誌
+log_pipeline = None
 logger = setup_logging()
 
-# 全域配置變數
+# 全域配置變數（啟動前由終端或WebUI修改，Bot執行時使用 config_manager 的快照）
 runtime_config = {}
+config_manager = None
+# --startup-budget（未指定時使用 STARTUP_PROFILE_CONFIG["budget"]）
+startup_budget = None
 
-def check_config_validity():
-    """檢查配置是否有效"""
+def check_config_validity(config=None):
+    """檢查配置是否有效（未指定時檢查 runtime_config）"""
+    config = runtime_config if config is None else config
     required_fields = ['DISCORD_BOT_TOKEN', 'MerchantID', 'HashKey', 'HashIV']
     
     for field in required_fields:
         if field == 'DISCORD_BOT_TOKEN':
-            if not runtime_config.get(field) or runtime_config[field] == "YOUR_DISCORD_BOT_TOKEN_HERE":
+            if not config.get(field) or config[field] == "YOUR_DISCORD_BOT_TOKEN_HERE":
                 return False, f"請設定 {field}"
         else:
-            if not runtime_config.get('ECPAY_CONFIG', {}).get(field) or runtime_config['ECPAY_CONFIG'][field].startswith("YOUR_"):
+            if not config.get('ECPAY_CONFIG', {}).get(field) or config['ECPAY_CONFIG'][field].startswith("YOUR_"):
                 return False, f"請設定 ECPay {field}"
     
     return True, "配置有效"
@@ -171,223 +218,277 @@ def terminal_config():
     print(f"🔧 測試環境: {'是' if use_test_env else '否'}")
     print(f"📅 繳費期限: {expire_days} 天")
 
-def create_web_ui():
-    """建立WebUI應用"""
-    app = Flask(__name__)
-    CORS(app)
-    
-    @app.route('/')
-    def index():
-        return render_template_string(WEB_UI_TEMPLATE)
-    
-    @app.route('/api/config', methods=['GET'])
-    def get_config():
-        return jsonify({
-            'discord_token': runtime_config.get('DISCORD_BOT_TOKEN', ''),
-            'role_ids': ','.join(map(str, runtime_config.get('ALLOWED_ROLE_IDS', []))),
-            'merchant_id': runtime_config.get('ECPAY_CONFIG', {}).get('MerchantID', ''),
-            'hash_key': runtime_config.get('ECPAY_CONFIG', {}).get('HashKey', ''),
-            'hash_iv': runtime_config.get('ECPAY_CONFIG', {}).get('HashIV', ''),
-            'use_test_env': runtime_config.get('USE_TEST_ENVIRONMENT', True),
-            'expire_days': runtime_config.get('ECPAY_CONFIG', {}).get('ExpireDate', 7)
-        })
-    
-    @app.route('/api/config', methods=['POST'])
-    def save_config():
-        data = request.json
-        
-        try:
-            runtime_config['DISCORD_BOT_TOKEN'] = data['discord_token']
-            runtime_config['ALLOWED_ROLE_IDS'] = [int(id.strip()) for id in data['role_ids'].split(',') if id.strip()]
-            runtime_config['USE_TEST_ENVIRONMENT'] = data['use_test_env']
-            
-            runtime_config['ECPAY_CONFIG'] = {
-                'MerchantID': data['merchant_id'],
-                'HashKey': data['hash_key'],
-                'HashIV': data['hash_iv'],
-                'PaymentType': 'aio',
-                'ChoosePayment': 'CVS',
-                'EncryptType': 1,
-                'ExpireDate': int(data['expire_days']),
-                'PaymentInfoURL': '',
-                'ClientRedirectURL': '',
-            }
-            
-            return jsonify({'success': True, 'message': '配置已儲存'})
-        except Exception as e:
-            return jsonify({'success': False, 'message': f'配置錯誤: {str(e)}'})
-    
-    return app
-
-# WebUI HTML模板
-WEB_UI_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ECPay Discord Bot 配置</title>
-    <style>
-        body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; background: #f5f5f5; }
-        .container { background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-        h1 { color: #333; text-align: center; margin-bottom: 30px; }
-        .form-group { margin-bottom: 20px; }
-        label { display: block; margin-bottom: 5px; font-weight: bold; color: #555; }
-        input, select { width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 14px; }
-        button { background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }
-        button:hover { background: #0056b3; }
-        .alert { padding: 15px; margin: 20px 0; border-radius: 5px; }
-        .alert-success { background: #d4edda; color: #155724; border: 1px solid #c3e6cb; }
-        .alert-error { background: #f8d7da; color: #721c24; border: 1px solid #f5c6cb; }
-        .section { margin-bottom: 30px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
-        .section h3 { margin-top: 0; color: #495057; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🤖 ECPay Discord Bot 配置</h1>
-        
-        <div id="alert" style="display: none;"></div>
-        
-        <form id="configForm">
-            <div class="section">
-                <h3>📱 Discord 設定</h3>
-                <div class="form-group">
-                    <label for="discord_token">Discord Bot Token:</label>
-                    <input type="password" id="discord_token" name="discord_token" required>
-                </div>
-                <div class="form-group">
-                    <label for="role_ids">允許使用的身分組ID (用逗號分隔):</label>
-                    <input type="text" id="role_ids" name="role_ids" placeholder="123456789012345678,987654321098765432">
-                </div>
-            </div>
-            
-            <div class="section">
-                <h3>💳 ECPay 設定</h3>
-                <div class="form-group">
-                    <label for="merchant_id">MerchantID (商店代號):</label>
-                    <input type="text" id="merchant_id" name="merchant_id" required>
-                </div>
-                <div class="form-group">
-                    <label for="hash_key">HashKey:</label>
-                    <input type="password" id="hash_key" name="hash_key" required>
-                </div>
-                <div class="form-group">
-                    <label for="hash_iv">HashIV:</label>
-                    <input type="password" id="hash_iv" name="hash_iv" required>
-                </div>
-            </div>
-            
-            <div class="section">
-                <h3>🔧 其他設定</h3>
-                <div class="form-group">
-                    <label for="use_test_env">使用測試環境:</label>
-                    <select id="use_test_env" name="use_test_env">
-                        <option value="true">是 (測試環境)</option>
-                        <option value="false">否 (正式環境)</option>
-                    </select>
-                </div>
-                <div class="form-group">
-                    <label for="expire_days">繳費期限 (天):</label>
-                    <input type="number" id="expire_days" name="expire_days" value="7" min="1" max="30">
-                </div>
-            </div>
-            
-            <button type="submit">💾 儲存配置並啟動Bot</button>
-        </form>
-    </div>
-
-    <script>
-        // 載入現有配置
-        fetch('/api/config')
-            .then(response => response.json())
-            .then(data => {
-                document.getElementById('discord_token').value = data.discord_token;
-                document.getElementById('role_ids').value = data.role_ids;
-                document.getElementById('merchant_id').value = data.merchant_id;
-                document.getElementById('hash_key').value = data.hash_key;
-                document.getElementById('hash_iv').value = data.hash_iv;
-                document.getElementById('use_test_env').value = data.use_test_env.toString();
-                document.getElementById('expire_days').value = data.expire_days;
-            });
-
-        // 提交表單
-        document.getElementById('configForm').addEventListener('submit', function(e) {
-            e.preventDefault();
-            
-            const formData = new FormData(this);
-            const data = {
-                discord_token: formData.get('discord_token'),
-                role_ids: formData.get('role_ids'),
-                merchant_id: formData.get('merchant_id'),
-                hash_key: formData.get('hash_key'),
-                hash_iv: formData.get('hash_iv'),
-                use_test_env: formData.get('use_test_env') === 'true',
-                expire_days: formData.get('expire_days')
-            };
-            
-            fetch('/api/config', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(data)
-            })
-            .then(response => response.json())
-            .then(result => {
-                const alert = document.getElementById('alert');
-                if (result.success) {
-                    alert.className = 'alert alert-success';
-                    alert.textContent = '✅ ' + result.message + ' - Bot將在幾秒後啟動...';
-                    alert.style.display = 'block';
-                    setTimeout(() => {
-                        window.close();
-                    }, 3000);
-                } else {
-                    alert.className = 'alert alert-error';
-                    alert.textContent = '❌ ' + result.message;
-                    alert.style.display = 'block';
-                }
-            });
-        });
-    </script>
-</body>
-</html>
-'''
+# 分片設定
+sharding_config = get_sharding_config()
 
 # 設定Discord intents
 intents = discord.Intents.default()
 intents.message_content = True
+intents.members = sharding_config['members_intent']
+
+# 啟用分片時改用 AutoShardedBot（每個分片各自一條Gateway連線）
+BotBase = commands.AutoShardedBot if sharding_config['enabled'] else commands.Bot
+
+class InstrumentedCommandTree(discord.app_commands.CommandTree):
+    """記錄Slash指令處理時間的指令樹（成功由 on_app_command_completion 記錄）"""
 
-class ECPayBot(commands.Bot):
+    async def interaction_check(self, interaction):
+        interaction.extras['metrics_started'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        observe_command(interaction, 'error')
+        await super().on_error(interaction, error)
+
+class ECPayBot(BotBase):
     def __init__(self):
-        super().__init__(command_prefix='!', intents=intents)
+        shard_options = {}
+        if sharding_config['enabled']:
+            shard_options = {
+                'shard_count': sharding_config['shard_count'],
+                'shard_ids': sharding_config['shard_ids'],
+            }
+        super().__init__(command_prefix='!', intents=intents, tree_cls=InstrumentedCommandTree, **shard_options)
+        # 伺服器與用戶數量（依事件增量更新）
+        self.guild_stats = GuildStats()
+        self.permission_service = None
+        self.rate_limiter = None
         self.ecpay_handler = None
+        self.trade_no_generator = None
+        self.order_executor = None
+        self.ecpay_client = None
+        self.trade_status_cache = None
+        self.order_store = None
+        self.event_log = None
+        self.callback_receiver = None
+        self.callback_urls = None
+        self.checkout_service = None
+        self.system_sampler = None
+        self.config_manager = None
+        self.web_ui_handoff = None
+        self.metrics_server = None
+        self.startup_profile_failed = False
         
     async def setup_hook(self):
         """Bot啟動時的設定"""
-        # 使用runtime_config初始化ECPay處理器
-        self.ecpay_handler = ECPayHandler()
-        self.ecpay_handler.config = runtime_config.get('ECPAY_CONFIG', {})
+        startup_timer.mark("登入")
+        with startup_timer.phase("處理器初始化"):
+            await self.init_handlers()
         
         # 載入指令模塊
-        from commands.payment_commands import setup
-        await setup(self, self.ecpay_handler, runtime_config)
+        with startup_timer.phase("指令模塊載入"):
+            from commands.payment_commands import setup
+            await setup(self, self.ecpay_handler, self.config_manager.current)
+        
+        # 只在指令定義改變時同步（開發時可只同步到指定伺服器）
+        with startup_timer.phase("指令同步"):
+            await CommandSyncer(self.tree).sync()
         
-        await self.tree.sync()
-        logger.info("Slash commands已同步")
+        # 設定檔變更時替換配置快照並重建受影響的元件
+        self.config_manager.add_listener(self.apply_config)
+        self.config_manager.start()
+        if self.web_ui_handoff:
+            # WebUI之後儲存的配置交給 config_manager 套用
+            self.web_ui_handoff.attach(self.config_manager, asyncio.get_running_loop())
+
+    async def init_handlers(self):
+        """初始化ECPay處理器與各項服務"""
+        if self.config_manager is None:
+            self.config_manager = ConfigManager()
+        snapshot = self.config_manager.current
+        
+        # 使用配置快照初始化ECPay處理器
+        self.ecpay_handler = ECPayHandler()
+        self.ecpay_handler.apply_config(dict(snapshot.ecpay_config), snapshot.api_url)
+        
+        # 權限檢查（成員或身分組變更時由事件清除快取）
+        self.permission_service = PermissionService.from_config(snapshot)
+        
+        # 使用頻率與同時建立付款單數量限制
+        self.rate_limiter = RateLimiter()
+        
+        # 交易編號產生器（20字元，跨重啟與跨程序不重複）
+        self.trade_no_generator = TradeNoGenerator()
+        logger.info(f"交易編號產生器節點: {self.trade_no_generator.node}")
+        
+        # 建立ECPay API客戶端（共用連線池）
+        self.ecpay_client = ECPayClient(self.ecpay_handler, query_url=snapshot.query_url)
+        
+        # 交易狀態快取（收到已驗證的回調時自動清除）
+        self.trade_status_cache = TradeStatusCache(self.ecpay_client)
+        self.ecpay_handler.callback_listeners.append(self.trade_status_cache.on_callback)
+        
+        # 訂單資料庫（背景批次寫入）
+        self.order_store = create_order_store()
+        if self.order_store:
+            logger.info(f"訂單資料庫已開啟: {self.order_store.path}")
+        
+        # 結構化事件記錄（背景寫入獨立檔案）
+        self.event_log = create_event_log()
+        if self.event_log:
+            logger.info(f"事件記錄已開啟: {self.event_log.path}")
+        
+        # ECPay回調接收伺服器（與Bot共用事件迴圈）
+        receiver = CallbackReceiver(self.ecpay_handler, self.order_store, event_log=self.event_log)
+        if receiver.config['enabled']:
+            self.callback_urls = receiver.callback_urls()
+            self.ecpay_handler.config = self.ecpay_config_for(snapshot)
+            receiver.add_listener(self.notify_callback)
+            await receiver.start()
+            self.callback_receiver = receiver
+        
+        # 付款頁面（以簽章連結取代付款HTML附件，表單保存在記憶體與訂單資料庫）
+        self.checkout_service = create_checkout_service(self.order_store)
+        if self.checkout_service:
+            await self.checkout_service.start()
+        
+        # 建立訂單執行池（避免簽章與HTML組裝阻塞事件迴圈）
+        # 在回調網址設定完成後建立，程序池與工作者才會取得完整的ECPay設定
+        self.order_executor = create_order_executor(
+            self.ecpay_handler,
+            store_config=self.order_store.config if self.order_store else None
+        )
+        logger.info(f"訂單執行池已啟動: {self.order_executor.mode}")
+        
+        # 系統資訊背景取樣器（由指令模塊載入時啟動）
+        self.system_sampler = SystemSampler()
+        
+        # 效能指標端點（佇列長度在讀取時計算）
+        QUEUE_DEPTH.set_function(self.queue_depths)
+        self.metrics_server = create_metrics_server()
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+    def queue_depths(self):
+        """各佇列等待處理的數量（指標端點讀取時呼叫）"""
+        depths = {('order_executor',): self.order_executor.queue_depth}
+        if self.callback_receiver:
+            depths[('callback',)] = self.callback_receiver.queue_depth
+        if self.order_store:
+            depths[('order_store',)] = self.order_store.stats()['queue_depth']
+        if self.event_log:
+            depths[('event_log',)] = self.event_log.pipeline.queue.qsize()
+        if log_pipeline:
+            depths[('log',)] = log_pipeline.queue.qsize()
+        return depths
+
+    def ecpay_config_for(self, snapshot):
+        """快照的ECPay設定（未設定通知網址時自動指向回調伺服器）"""
+        config = dict(snapshot.ecpay_config)
+        if self.callback_urls:
+            if not config.get('ReturnURL'):
+                config['ReturnURL'] = self.callback_urls[0]
+            if not config.get('PaymentInfoURL'):
+                config['PaymentInfoURL'] = self.callback_urls[1]
+        return config
+
+    def apply_config(self, old, new, changed):
+        """配置快照替換時只重建受影響的元件
+
+        簽章器與表單產生器在下一筆訂單時依新設定重建，進行中的訂單以開始時的設定完成。
+        """
+        if changed & {'ecpay_config', 'api_url'}:
+            self.ecpay_handler.apply_config(self.ecpay_config_for(new), new.api_url)
+            self.order_executor.reload()
+        if 'query_url' in changed:
+            self.ecpay_client.query_url = new.query_url
+        if changed & {'ecpay_config', 'query_url'}:
+            # 商店代號或環境變更後，舊的查詢結果不再適用
+            self.trade_status_cache.clear()
+        if changed & {'allowed_role_ids', 'command_roles'}:
+            self.permission_service.update(new.allowed_role_ids, new.command_roles)
+        if 'bot_owner_id' in changed:
+            self.permission_service.owner_id = new.bot_owner_id
+        if 'discord_token' in changed:
+            logger.warning("Discord Bot Token 變更需重新啟動Bot才會生效")
 
     async def on_ready(self):
         """Bot準備就緒時觸發"""
         logger.info(f'{self.user} 已登入並準備就緒!')
         logger.info(f'Bot ID: {self.user.id}')
+        if not startup_timer.reported:
+            startup_timer.mark("Gateway就緒")
+            startup_timer.report()
+            if import_profiler:
+                await self.finish_startup_profile()
+                return
+        if sharding_config['enabled']:
+            logger.info(f'分片數量: {self.shard_count}')
+        
+        # 重新計算伺服器統計（之後由事件更新）
+        self.guild_stats.rebuild(self.guilds)
         
         # 設定Bot狀態
         await self.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.watching,
-                name=f"ECPay超商繳費服務 v{BOT_VERSION}"
+                name=f"ECPay超商繳費服務 v{self.config_manager.current.bot_version}"
             )
         )
 
+    async def finish_startup_profile(self):
+        """--startup-profile：輸出分析結果後結束（超出預算時以狀態碼1結束）"""
+        import_profiler.uninstall()
+        report, within_budget = startup_profile_report(startup_timer, import_profiler, startup_budget)
+        print(report)
+        self.startup_profile_failed = not within_budget
+        await self.close()
+
+    async def on_app_command_completion(self, interaction, command):
+        observe_command(interaction, 'ok')
+
+    async def on_guild_join(self, guild):
+        self.guild_stats.guild_join(guild)
+
+    async def on_guild_remove(self, guild):
+        self.guild_stats.guild_remove(guild)
+
+    async def on_member_join(self, member):
+        self.guild_stats.member_delta(member.guild, 1)
+
+    async def on_member_remove(self, member):
+        self.guild_stats.member_delta(member.guild, -1)
+
+    async def notify_callback(self, kind, data):
+        """付款完成時通知建立訂單的頻道"""
+        if kind != 'payment' or data.get('RtnCode') != '1' or not self.order_store:
+            return
+        
+        order = await self.order_store.fetch_order(data.get('MerchantTradeNo'))
+        if not order or not order['channel_id']:
+            return
+        
+        channel = self.get_channel(order['channel_id'])
+        if channel:
+            await channel.send(
+                f"✅ **付款完成！** <@{order['user_id']}>\n"
+                f"**🆔 訂單編號:** `{order['trade_no']}`\n"
+                f"**💰 交易金額:** NT$ {int(data.get('TradeAmt') or order['total_amount']):,}\n"
+                f"**📅 付款時間:** {data.get('PaymentDate', '')}"
+            )
+
+    async def close(self):
+        """關閉Bot時釋放資源"""
+        if self.config_manager:
+            await self.config_manager.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if self.callback_receiver:
+            await self.callback_receiver.stop()
+        if self.checkout_service:
+            await self.checkout_service.stop()
+        if self.system_sampler:
+            await self.system_sampler.stop()
+        if self.order_executor:
+            self.order_executor.shutdown(wait=False)
+        if self.ecpay_client:
+            await self.ecpay_client.close()
+        if self.order_store:
+            self.order_store.close()
+        if self.event_log:
+            self.event_log.close()
+        await super().close()
+
 bot = ECPayBot()
 
 @bot.event
@@ -395,22 +496,54 @@ async def on_command_error(ctx, error):
     """錯誤處理"""
     logger.error(f"指令錯誤: {error}")
 
+async def run_with_web_ui():
+    """在同一個事件迴圈上執行WebUI（aiohttp）與Bot"""
+    from web_ui import AsyncWebUI
+    web_ui = AsyncWebUI(runtime_config, check_config_validity, WEB_UI_CONFIG)
+    bot.web_ui_handoff = web_ui.handoff
+    await web_ui.start()
+    try:
+        if not web_ui.ready.is_set():
+            print("⏳ 等待WebUI配置完成...")
+            await web_ui.ready.wait()
+        print("✅ 配置完成，啟動Bot...")
+        apply_runtime_config()
+        
+        # 與 bot.run 相同的日誌設定
+        discord.utils.setup_logging()
+        async with bot:
+            await bot.start(runtime_config['DISCORD_BOT_TOKEN'])
+    finally:
+        await web_ui.stop()
+
+def apply_runtime_config():
+    """將終端或WebUI輸入的配置交給 config_manager（之後重新載入設定檔時仍會保留）"""
+    base = config_manager.current.to_dict()
+    config_manager.set_overrides({
+        key: value for key, value in runtime_config.items() if value != base.get(key)
+    })
+    bot.config_manager = config_manager
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=f"ECPay Discord Bot v{BOT_VERSION}")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="輸出模組載入時間與各階段耗時，Bot就緒後結束")
+    parser.add_argument('--startup-budget', type=float,
+                        help="啟動時間預算(秒)，--startup-profile 超出預算時以狀態碼1結束")
+    return parser.parse_args()
+
 def main():
     """主函數"""
-    global runtime_config
+    global runtime_config, config_manager, startup_budget
     
-    # 載入基本配置
-    from config import (
-        DISCORD_BOT_TOKEN, ALLOWED_ROLE_IDS, ECPAY_CONFIG, 
-        USE_TEST_ENVIRONMENT, USE_WEB_UI, WEB_UI_CONFIG, BOT_VERSION, BOT_OWNER_ID
-    )
-    runtime_config = {
-        'DISCORD_BOT_TOKEN': DISCORD_BOT_TOKEN,
-        'ALLOWED_ROLE_IDS': ALLOWED_ROLE_IDS,
-        'ECPAY_CONFIG': ECPAY_CONFIG,
-        'USE_TEST_ENVIRONMENT': USE_TEST_ENVIRONMENT,
-        'BOT_OWNER_ID': BOT_OWNER_ID
-    }
+    startup_timer.mark("模組載入")
+    args = parse_args()
+    startup_budget = args.startup_budget
+    
+    # 載入基本配置（config.py、TOML設定檔與環境變數合併為配置快照）
+    with startup_timer.phase("設定載入"):
+        config_manager = ConfigManager()
+        runtime_config = config_manager.current.to_dict()
     
     print(f"🤖 ECPay Discord Bot v{BOT_VERSION}")
     print("=" * 50)
@@ -424,28 +557,15 @@ def main():
         print("🖥️ 啟動WebUI配置模式...")
         print(f"📍 請開啟瀏覽器訪問: http://{WEB_UI_CONFIG['host']}:{WEB_UI_CONFIG['port']}")
         
-        app = create_web_ui()
-        
-        # 在背景執行WebUI
-        def run_web_ui():
-            app.run(
-                host=WEB_UI_CONFIG['host'],
-                port=WEB_UI_CONFIG['port'],
-                debug=WEB_UI_CONFIG['debug'],
-                use_reloader=False
-            )
-        
-        web_thread = threading.Thread(target=run_web_ui, daemon=True)
-        web_thread.start()
-        
-        # 等待配置完成
-        print("⏳ 等待WebUI配置完成...")
-        while True:
-            is_valid, message = check_config_validity()
-            if is_valid:
-                print("✅ 配置完成，啟動Bot...")
-                break
-            asyncio.sleep(2)
+        if WEB_UI_SERVER == 'flask':
+            # 在背景執行WebUI，儲存有效配置時設定事件，不需輪詢
+            from web_ui import start_web_ui, wait_for_config
+            handoff = start_web_ui(runtime_config, check_config_validity, WEB_UI_CONFIG)
+            bot.web_ui_handoff = handoff
+            if not handoff.ready.is_set():
+                print("⏳ 等待WebUI配置完成...")
+                wait_for_config(handoff)
+            print("✅ 配置完成，啟動Bot...")
     
     else:
         # 終端配置模式
@@ -456,11 +576,23 @@ def main():
     # 啟動Bot
     try:
         logger.info("正在啟動Discord Bot...")
-        bot.run(runtime_config['DISCORD_BOT_TOKEN'])
+        if WEB_UI_SERVER == 'aiohttp':
+            asyncio.run(run_with_web_ui())
+        else:
+            apply_runtime_config()
+            bot.run(runtime_config['DISCORD_BOT_TOKEN'])
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         logger.error(f"Bot啟動失敗: {e}")
         print(f"❌ 錯誤: {e}")
         print("請檢查您的Discord Bot Token是否正確")
+    finally:
+        # 寫完佇列中剩餘的日誌
+        log_pipeline.stop()
+    
+    if bot.startup_profile_failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,408 @@
+"""程序內的效能指標（Prometheus 文字格式）
+
+記錄端只將數值放入 deque（append 為原子操作，不需要鎖），抓取時或累積到
+FOLD_THRESHOLD 筆時才以鎖批次合併到計數，因此事件迴圈與執行緒池（簽章）都能以很低的成本記錄。
+
+程序池與工作者程序（ORDER_EXECUTOR_CONFIG["mode"] = "process"、ORDER_BROKER_CONFIG）
+中的記錄只存在於該程序，不會出現在 /metrics，請改看 ecpay_order_stage_seconds。
+
+METRICS_CONFIG["enabled"] 時啟動 /metrics 端點與事件迴圈延遲監測。
+"""
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import METRICS_CONFIG
+except ImportError:
+    METRICS_CONFIG = {}
+
+DEFAULT_METRICS_CONFIG = {
+    "enabled": False,                  # 是否啟動 /metrics 端點
+    "host": "127.0.0.1",               # 監聽位址（指標不含敏感資料，但建議只開放給監控主機）
+    "port": 9464,                      # 監聽端口
+    "path": "/metrics",                # 端點路徑
+    "lag_interval": 0.5,               # 事件迴圈延遲取樣間隔(秒)
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 延遲預設分組(秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 簽章與事件迴圈延遲這類短時間的分組(秒)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+# 資料量分組(位元組)
+BYTE_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+# 未合併的記錄超過此數量時由記錄端合併（通常在抓取時合併），不需背景任務也能限制記憶體用量
+FOLD_THRESHOLD = 4096
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{escape_label(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Series(ABC):
+    """單一標籤組合的數值（記錄端只 append，讀取或累積過多時才合併）"""
+
+    __slots__ = ('_pending', '_lock')
+
+    def __init__(self):
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def fold(self):
+        """合併尚未計入的記錄（記錄端可能同時 append，只取出當下已有的筆數）"""
+        with self._lock:
+            pending = self._pending
+            popleft = pending.popleft
+            values = [popleft() for _ in range(len(pending))]
+            if values:
+                self._apply(values)
+
+    @abstractmethod
+    def _apply(self, values):
+        """將一批記錄計入數值（持有鎖時呼叫）"""
+
+
+class CounterSeries(_Series):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        super().__init__()
+        self.value = 0
+
+    def inc(self, amount=1):
+        pending = self._pending
+        pending.append(amount)
+        if len(pending) >= FOLD_THRESHOLD:
+            self.fold()
+
+    def _apply(self, values):
+        self.value += sum(values)
+
+
+class HistogramSeries(_Series):
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        super().__init__()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 最後一格為 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        pending = self._pending
+        pending.append(value)
+        if len(pending) >= FOLD_THRESHOLD:
+            self.fold()
+
+    def time(self):
+        """以 with 區塊記錄耗時"""
+        return _Timer(self)
+
+    def _apply(self, values):
+        counts = self.counts
+        buckets = self.buckets
+        for value in values:
+            counts[bisect_left(buckets, value)] += 1
+        self.sum += sum(values)
+        self.count += len(values)
+
+
+class GaugeSeries:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class _Timer:
+    __slots__ = ('series', 'started')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.series.observe(time.perf_counter() - self.started)
+
+
+class Metric(ABC):
+    """指標（依標籤值區分多組數值）"""
+
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+
+    def labels(self, *values):
+        """取得標籤值對應的數值（標籤值依 labelnames 的順序傳入）"""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要標籤: {', '.join(self.labelnames)}")
+            # setdefault 為原子操作，多個執行緒同時建立時只會保留一個
+            series = self._series.setdefault(values, self._create())
+        return series
+
+    @abstractmethod
+    def _create(self):
+        """建立一組標籤值的數值"""
+
+    @abstractmethod
+    def samples(self):
+        """產生 (名稱後綴, 標籤值, 額外標籤, 數值)"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, values, extra)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _create(self):
+        return CounterSeries()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, series in list(self._series.items()):
+            series.fold()
+            yield '', values, None, series.value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create(self):
+        return HistogramSeries(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        for values, series in list(self._series.items()):
+            series.fold()
+            # 在鎖內複製，分組、總和與次數來自同一時間點
+            with series._lock:
+                counts, total, count = list(series.counts), series.sum, series.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield '_bucket', values, ('le', format_value(float(bound))), cumulative
+            yield '_sum', values, None, total
+            yield '_count', values, None, count
+
+
+class Gauge(Metric):
+    """目前數值（可改以 set_function 在讀取時計算，例如佇列長度）"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.function = None
+
+    def _create(self):
+        return GaugeSeries()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        """讀取時呼叫 function()，回傳數值或 {標籤值tuple: 數值}"""
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception as e:
+                logger.warning(f"讀取指標 {self.name} 失敗: {e}")
+                result = {}
+            if not isinstance(result, dict):
+                result = {(): result}
+            for values, value in result.items():
+                yield '', values, None, value
+            return
+        for values, series in list(self._series.items()):
+            yield '', values, None, series.value
+
+
+class MetricsRegistry:
+    """指標集合"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指標名稱重複: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """輸出 Prometheus 文字格式"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# 預設的指標集合與Bot使用的指標
+REGISTRY = MetricsRegistry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    'discord_command_duration_seconds', "Slash指令處理時間", ('command', 'status'))
+FOLLOWUP_SECONDS = REGISTRY.histogram(
+    'discord_followup_upload_seconds', "付款單訊息上傳到Discord的時間（mode: attachment 附件, link 付款頁面連結）",
+    ('command', 'mode'))
+FOLLOWUP_BYTES = REGISTRY.histogram(
+    'discord_followup_upload_bytes', "付款單訊息上傳的資料量（JSON與附件內容，不含multipart分隔）",
+    ('command', 'mode'), buckets=BYTE_BUCKETS)
+ORDERS_CREATED = REGISTRY.counter(
+    'ecpay_orders_created_total', "建立的付款單數量", ('payment_method', 'store_type'))
+SIGNING_SECONDS = REGISTRY.histogram(
+    'ecpay_signing_duration_seconds', "CheckMacValue簽章時間", buckets=FAST_BUCKETS)
+ORDER_STAGE_SECONDS = REGISTRY.histogram(
+    'ecpay_order_stage_seconds', "訂單執行池各階段耗時", ('stage',))
+CALLBACKS = REGISTRY.counter(
+    'ecpay_callbacks_total', "ECPay回調處理結果", ('kind', 'outcome'))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'queue_depth', "各佇列等待處理的數量", ('queue',))
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    'event_loop_lag_seconds', "事件迴圈延遲（排程的喚醒時間與實際喚醒時間的差）", buckets=FAST_BUCKETS)
+
+
+def observe_command(interaction, status):
+    """記錄Slash指令處理時間（開始時間由指令樹的 interaction_check 記錄）"""
+    started = interaction.extras.get('metrics_started')
+    command = interaction.command
+    if started is None or command is None:
+        return
+    COMMAND_SECONDS.labels(command.qualified_name, status).observe(time.perf_counter() - started)
+
+
+class LoopLagMonitor:
+    """定期排程喚醒，以實際喚醒時間的延遲估計事件迴圈阻塞程度"""
+
+    def __init__(self, histogram=LOOP_LAG_SECONDS, interval=0.5):
+        self.histogram = histogram
+        self.interval = interval
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.histogram.observe(max(0.0, loop.time() - scheduled))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class MetricsServer:
+    """/metrics 端點（aiohttp，與Bot共用事件迴圈）"""
+
+    def __init__(self, registry=REGISTRY, config=None):
+        self.registry = registry
+        self.config = {**DEFAULT_METRICS_CONFIG, **METRICS_CONFIG, **(config or {})}
+        self.lag_monitor = LoopLagMonitor(interval=self.config['lag_interval'])
+        self._runner = None
+
+    async def handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(body=self.registry.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self):
+        # aiohttp.web 只在啟用指標端點時載入
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get(self.config['path'], self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config['host'], self.config['port'])
+        await site.start()
+        self.lag_monitor.start()
+        logger.info(f"指標端點已啟動: http://{self.config['host']}:{self.config['port']}{self.config['path']}")
+
+    async def stop(self):
+        await self.lag_monitor.stop()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def create_metrics_server(config=None):
+    """依設定建立指標端點，未啟用時回傳None"""
+    merged = {**DEFAULT_METRICS_CONFIG, **METRICS_CONFIG, **(config or {})}
+    if not merged['enabled']:
+        return None
+    return MetricsServer(config=merged)
@@ -0,0 +1,437 @@
+"""SQLite訂單工作佇列（多程序工作者模式）
+
+Gateway程序（Discord Bot）只負責接收互動並將建立訂單工作放入佇列，
+由多個工作者程序（order_worker.py）領取工作、簽章、產生表單並寫入訂單資料庫，
+完成後將結果寫回佇列，由Gateway取回並發送followup。
+
+佇列為本機SQLite檔案（WAL模式），不需額外服務即可離線執行。
+商店金鑰（HashKey/HashIV）不寫入佇列檔案：Bot啟動的工作者由標準輸入取得，
+另行啟動的工作者與Bot相同，從 config.py、TOML設定檔或環境變數讀取。
+
+Gateway等待逾時（job_timeout）時會從佇列取消該工作：尚未領取的直接刪除，
+處理中的標記為 cancelled，工作者寫回結果時略過且不寫入訂單資料庫。
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from order_executor import OrderExecutor, OrderQueueFullError, StageTimer
+from trade_no import DEFAULT_TRADE_NO_CONFIG, TRADE_NO_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import ORDER_BROKER_CONFIG
+except ImportError:
+    ORDER_BROKER_CONFIG = {}
+
+DEFAULT_BROKER_CONFIG = {
+    "enabled": False,              # 是否使用多程序工作者模式
+    "path": "order_broker.db",     # 工作佇列資料庫檔案
+    "workers": 2,                  # 由Bot自動啟動的工作者數量（0表示工作者另行啟動）
+    "batch_size": 32,              # 工作者每次領取的工作數量
+    "poll_interval": 0.005,        # 等待結果或剛處理完工作時的輪詢間隔(秒)
+    "max_poll_interval": 0.25,     # 閒置時逐步拉長的輪詢間隔上限(秒)
+    "job_timeout": 30,             # 等待單筆工作完成的時間上限(秒)
+    "lease_timeout": 15,           # 工作被領取後未完成的重新排入時間(秒)
+    "max_pending": 1000,           # 等待中的工作上限（超過則拒絕）
+    "metrics_window": 500,         # 延遲統計保留的樣本數
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    trade_no TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    result TEXT,
+    html BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, enqueued_at);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+INSERT_JOB_SQL = "INSERT OR REPLACE INTO jobs (trade_no, payload, state, enqueued_at) VALUES (?, ?, 'queued', ?)"
+
+SELECT_FINISHED_SQL = """
+SELECT trade_no, state, enqueued_at, claimed_at, finished_at, result, html, error
+FROM jobs WHERE state IN ('done', 'failed')
+"""
+
+DELETE_JOB_SQL = "DELETE FROM jobs WHERE trade_no = ?"
+
+REQUEUE_EXPIRED_SQL = "UPDATE jobs SET state = 'queued', worker = NULL WHERE state = 'running' AND claimed_at < ?"
+
+# Gateway等待逾時的工作：尚未領取的直接刪除，處理中的標記為取消，工作者不會寫入訂單
+DELETE_QUEUED_JOB_SQL = "DELETE FROM jobs WHERE trade_no = ? AND state = 'queued'"
+
+CANCEL_RUNNING_JOB_SQL = "UPDATE jobs SET state = 'cancelled' WHERE trade_no = ? AND state = 'running'"
+
+# 工作者中途結束而留下的已取消工作
+DELETE_EXPIRED_CANCELLED_SQL = "DELETE FROM jobs WHERE state = 'cancelled' AND claimed_at < ?"
+
+DELETE_CANCELLED_JOB_SQL = "DELETE FROM jobs WHERE trade_no = ? AND state = 'cancelled'"
+
+HAS_QUEUED_SQL = "SELECT 1 FROM jobs WHERE state = 'queued' LIMIT 1"
+
+SELECT_QUEUED_SQL = "SELECT trade_no, payload FROM jobs WHERE state = 'queued' ORDER BY enqueued_at LIMIT ?"
+
+CLAIM_JOB_SQL = "UPDATE jobs SET state = 'running', worker = ?, claimed_at = ? WHERE trade_no = ? AND state = 'queued'"
+
+FINISH_JOB_SQL = """
+UPDATE jobs SET state = ?, finished_at = ?, result = ?, html = ?, error = ? WHERE trade_no = ? AND state = 'running'
+"""
+
+# 不寫入工作佇列檔案的ECPay設定欄位
+SECRET_FIELDS = ('HashKey', 'HashIV')
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'order_worker.py')
+
+
+class OrderBrokerError(Exception):
+    """工作者建立訂單失敗或逾時"""
+
+
+def connect(path):
+    """開啟工作佇列資料庫（WAL模式）"""
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    # 刪除或覆寫的資料以零填滿，舊版寫入的設定不會殘留在檔案中
+    connection.execute("PRAGMA secure_delete=ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"無法序列化: {type(value).__name__}")
+
+
+def _decode_object(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def dumps(value):
+    """序列化工作內容與結果（支援datetime）"""
+    return json.dumps(value, ensure_ascii=False, default=_encode_value)
+
+
+def loads(text):
+    return json.loads(text, object_hook=_decode_object)
+
+
+def split_secrets(ecpay_config):
+    """分離ECPay設定中的商店金鑰，回傳 (不含金鑰的設定, 金鑰)"""
+    public = {key: value for key, value in ecpay_config.items() if key not in SECRET_FIELDS}
+    secrets = {key: ecpay_config[key] for key in SECRET_FIELDS if key in ecpay_config}
+    return public, secrets
+
+
+def write_settings(connection, settings):
+    """寫入工作者共用的設定（不含金鑰的ECPay設定、API網址、訂單資料庫設定）"""
+    with_transaction(connection, lambda: connection.executemany(
+        "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+        [(key, dumps(value)) for key, value in settings.items()]
+    ))
+
+
+def read_settings(connection):
+    return {key: loads(value) for key, value in connection.execute("SELECT key, value FROM settings")}
+
+
+def with_transaction(connection, func):
+    """以 BEGIN IMMEDIATE 交易執行，避免多程序同時領取同一筆工作"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        result = func()
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+    return result
+
+
+class BrokerOrderExecutor:
+    """透過SQLite工作佇列交由工作者程序建立訂單
+
+    與 OrderExecutor 介面相同，可直接替換。所有資料庫操作由單一背景執行緒
+    批次處理：新工作以一次交易寫入，完成的結果一次取回並喚醒對應的協程。
+    工作者會直接將訂單寫入訂單資料庫（persists_orders）。
+    """
+
+    mode = 'broker'
+    persists_orders = True
+
+    def __init__(self, ecpay_handler, config=None, store_config=None):
+        self.ecpay_handler = ecpay_handler
+        self.config = {**DEFAULT_BROKER_CONFIG, **ORDER_BROKER_CONFIG, **(config or {})}
+        self.store_config = store_config
+        self.path = self.config['path']
+        self._connection = connect(self.path)
+
+        self._outgoing = queue.Queue()
+        self._cancelling = queue.Queue()      # 等待逾時、需從佇列取消的交易編號
+        self._waiting = {}              # trade_no -> (loop, future)
+        self._processes = []
+        self._secrets = {}
+        self._thread = None
+        self._running = False
+        self.rejected = 0
+        self.failed = 0
+        self.cancelled = 0
+        window = self.config['metrics_window']
+        self.stages = {
+            'queue_wait': StageTimer(window, 'queue_wait'),
+            'build': StageTimer(window, 'build'),
+            'total': StageTimer(window, 'total'),
+        }
+
+    def shared_settings(self):
+        """工作者共用的設定（不含商店金鑰，version 改變時工作者會重新讀取）"""
+        ecpay_config, _ = split_secrets(self.ecpay_handler.config)
+        return {
+            'ecpay_config': ecpay_config,
+            'api_url': self.ecpay_handler.api_url,
+            'store_config': self.store_config,
+            'version': time.time(),
+        }
+
+    def worker_node_id(self, index):
+        """工作者的交易編號節點編號：Gateway的節點編號之後依序分配，每個工作者不同"""
+        return {**DEFAULT_TRADE_NO_CONFIG, **TRADE_NO_CONFIG}['node_id'] + index + 1
+
+    def _spawn_worker(self, index):
+        """啟動工作者程序，商店金鑰經由標準輸入傳遞（只存在於程序執行期間的管線）"""
+        process = subprocess.Popen([
+            sys.executable, WORKER_SCRIPT,
+            '--broker', self.path,
+            '--name', f"worker-{index}",
+            '--node-id', str(self.worker_node_id(index)),
+            '--batch-size', str(self.config['batch_size']),
+            '--poll-interval', str(self.config['poll_interval']),
+            '--max-poll-interval', str(self.config['max_poll_interval']),
+            '--secrets-stdin',
+        ], stdin=subprocess.PIPE)
+        process.stdin.write(json.dumps(self._secrets).encode('utf-8') + b'\n')
+        process.stdin.close()
+        return process
+
+    def _spawn_workers(self):
+        self._processes = [self._spawn_worker(index) for index in range(self.config['workers'])]
+
+    def _stop_workers(self, wait=True):
+        for process in self._processes:
+            process.terminate()
+        if wait:
+            for process in self._processes:
+                process.wait()
+        self._processes = []
+
+    def start(self):
+        """寫入共用設定、啟動背景執行緒與工作者程序"""
+        _, self._secrets = split_secrets(self.ecpay_handler.config)
+        write_settings(self._connection, self.shared_settings())
+        self._running = True
+        self._thread = threading.Thread(target=self._dispatch_loop, name='order-broker', daemon=True)
+        self._thread.start()
+        self._spawn_workers()
+        logger.info(f"訂單工作佇列已啟動: {self.path}，工作者: {self.config['workers']}")
+
+    def reload(self):
+        """ECPay設定變更時更新工作者共用的設定
+
+        以獨立連線寫入，不干擾背景執行緒的交易。工作者在下一批工作前讀取新設定，
+        已領取的工作以原本的設定完成。商店金鑰變更時重新啟動Bot啟動的工作者，
+        收到結束訊號的工作者會先處理完目前這批工作。
+        """
+        connection = connect(self.path)
+        try:
+            write_settings(connection, self.shared_settings())
+        finally:
+            connection.close()
+        _, secrets = split_secrets(self.ecpay_handler.config)
+        if secrets != self._secrets:
+            self._secrets = secrets
+            self._stop_workers(wait=False)
+            self._spawn_workers()
+            logger.info("商店金鑰已變更，訂單工作者已重新啟動")
+        logger.info("訂單工作佇列已寫入新配置")
+
+    @property
+    def queue_depth(self):
+        """等待完成的訂單數量"""
+        return len(self._waiting)
+
+    def is_saturated(self):
+        return len(self._waiting) >= self.config['max_pending']
+
+    async def generate_payment_url(self, owner=None, **kwargs):
+        """將建立訂單工作放入佇列並等待工作者完成
+
+        owner 為 {'user_id', 'guild_id', 'channel_id'}，由工作者寫入訂單資料庫。
+        """
+        if self.is_saturated():
+            self.rejected += 1
+            raise OrderQueueFullError("訂單佇列已滿")
+
+        trade_no = kwargs['trade_no']
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting[trade_no] = (loop, future)
+        self._outgoing.put((trade_no, dumps({'kwargs': kwargs, 'owner': owner or {}}), time.time()))
+        try:
+            return await asyncio.wait_for(future, self.config['job_timeout'])
+        except asyncio.TimeoutError:
+            self.failed += 1
+            # 已回覆使用者失敗，工作者不可再建立這筆訂單
+            self._cancelling.put(trade_no)
+            raise OrderBrokerError(f"等待工作者逾時: {trade_no}")
+        finally:
+            self._waiting.pop(trade_no, None)
+
+    def _dispatch_loop(self):
+        poll_interval = self.config['poll_interval']
+        last_requeue = time.monotonic()
+        while self._running:
+            jobs = []
+            # 沒有等待中的工作時不需頻繁查詢結果，新工作放入時立即喚醒
+            timeout = poll_interval if self._waiting else self.config['max_poll_interval']
+            try:
+                jobs.append(self._outgoing.get(timeout=timeout))
+                while True:
+                    jobs.append(self._outgoing.get_nowait())
+            except queue.Empty:
+                pass
+
+            if jobs:
+                try:
+                    with_transaction(self._connection, lambda: self._connection.executemany(INSERT_JOB_SQL, jobs))
+                except sqlite3.Error as e:
+                    logger.error(f"訂單工作寫入佇列失敗: {e}")
+                    self._fail(jobs, OrderBrokerError(f"訂單工作寫入佇列失敗: {e}"))
+
+            try:
+                self._cancel()
+                self._collect()
+                if time.monotonic() - last_requeue >= 1:
+                    # 工作者中途結束時，逾時的工作重新排入佇列
+                    expired = time.time() - self.config['lease_timeout']
+                    self._connection.execute(REQUEUE_EXPIRED_SQL, (expired,))
+                    self._connection.execute(DELETE_EXPIRED_CANCELLED_SQL, (expired,))
+                    last_requeue = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"訂單工作佇列操作失敗: {e}")
+                time.sleep(poll_interval)
+
+    def _fail(self, jobs, error):
+        """寫入佇列失敗的工作立即以錯誤結束，不等到逾時"""
+        for trade_no, _, _ in jobs:
+            waiter = self._waiting.get(trade_no)
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future, None, error)
+
+    def _cancel(self):
+        """取消等待逾時的工作（在寫入新工作之後執行，不會漏掉同一輪放入的工作）"""
+        trade_nos = []
+        try:
+            while True:
+                trade_nos.append((self._cancelling.get_nowait(),))
+        except queue.Empty:
+            pass
+        if not trade_nos:
+            return
+
+        def cancel_batch():
+            self._connection.executemany(DELETE_QUEUED_JOB_SQL, trade_nos)
+            self._connection.executemany(CANCEL_RUNNING_JOB_SQL, trade_nos)
+        try:
+            with_transaction(self._connection, cancel_batch)
+        except sqlite3.Error:
+            # 下一輪再試，避免工作者建立已回覆失敗的訂單
+            for trade_no in trade_nos:
+                self._cancelling.put(trade_no[0])
+            raise
+        self.cancelled += len(trade_nos)
+        logger.warning(f"已取消 {len(trade_nos)} 筆等待逾時的訂單工作")
+
+    def _collect(self):
+        """取回已完成的工作並喚醒等待中的協程"""
+        rows = self._connection.execute(SELECT_FINISHED_SQL).fetchall()
+        if not rows:
+            return
+        with_transaction(self._connection, lambda: self._connection.executemany(
+            DELETE_JOB_SQL, [(row[0],) for row in rows]
+        ))
+        for trade_no, state, enqueued_at, claimed_at, finished_at, result, html, error in rows:
+            self.stages['queue_wait'].observe(claimed_at - enqueued_at)
+            self.stages['build'].observe(finished_at - claimed_at)
+            self.stages['total'].observe(finished_at - enqueued_at)
+            waiter = self._waiting.get(trade_no)
+            if waiter is None:
+                continue
+            loop, future = waiter
+            if state == 'done':
+                params, order_info = loads(result)
+                loop.call_soon_threadsafe(_resolve, future, (html, params, order_info), None)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, None, OrderBrokerError(error))
+
+    def metrics(self):
+        """取得工作佇列統計"""
+        return {
+            'mode': self.mode,
+            'queue_depth': self.queue_depth,
+            'workers': sum(1 for process in self._processes if process.poll() is None),
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'stages': {name: timer.summary() for name, timer in self.stages.items()},
+        }
+
+    def shutdown(self, wait=True):
+        """停止背景執行緒與工作者程序"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self._stop_workers(wait)
+        self._connection.close()
+        logger.info("訂單工作佇列已關閉")
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def create_order_executor(ecpay_handler, config=None, store_config=None):
+    """依設定建立訂單執行池：啟用工作者模式時回傳已啟動的 BrokerOrderExecutor"""
+    merged = {**DEFAULT_BROKER_CONFIG, **ORDER_BROKER_CONFIG, **(config or {})}
+    if not merged['enabled']:
+        return OrderExecutor(ecpay_handler)
+    executor = BrokerOrderExecutor(ecpay_handler, merged, store_config)
+    executor.start()
+    return executor
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from metrics import ORDER_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import ORDER_EXECUTOR_CONFIG
+except ImportError:
+    ORDER_EXECUTOR_CONFIG = {}
+
+DEFAULT_EXECUTOR_CONFIG = {
+    "mode": "thread",          # thread: 執行緒池, process: 程序池
+    "max_workers": 4,          # 工作者數量
+    "max_in_flight": 8,        # 同時執行中的訂單數量
+    "max_pending": 100,        # 等待中的訂單上限（超過則拒絕）
+    "metrics_window": 500,     # 延遲統計保留的樣本數
+}
+
+
+class OrderQueueFullError(Exception):
+    """訂單佇列已滿"""
+
+
+# 程序池工作者使用的處理器（每個子程序各自建立一次）
+_worker_handler = None
+
+
+def _init_process_worker(config, api_url):
+    """程序池工作者初始化"""
+    global _worker_handler
+    from ecpay_handler import ECPayHandler
+    _worker_handler = ECPayHandler()
+    _worker_handler.config = config
+    _worker_handler.api_url = api_url
+
+
+def _build_in_process(kwargs):
+    """在程序池中建立訂單"""
+    return _worker_handler.generate_payment_url(**kwargs)
+
+
+class StageTimer:
+    """記錄單一階段的延遲樣本（指定 stage 時同時記錄到 ecpay_order_stage_seconds）"""
+
+    def __init__(self, window, stage=None):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.metric = ORDER_STAGE_SECONDS.labels(stage) if stage else None
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        if self.metric is not None:
+            self.metric.observe(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {'count': self.count, 'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return {
+            'count': self.count,
+            'avg_ms': sum(ordered) / len(ordered) * 1000,
+            'p95_ms': p95 * 1000,
+            'max_ms': ordered[-1] * 1000,
+        }
+
+
+class OrderExecutor:
+    """在事件迴圈外建立訂單（排序、編碼、簽章、HTML組裝）
+
+    同時執行數量由 max_in_flight 限制，等待中的訂單超過 max_pending 時
+    直接拋出 OrderQueueFullError，讓指令可以立即回覆忙碌訊息。
+    """
+
+    def __init__(self, ecpay_handler, config=None):
+        self.ecpay_handler = ecpay_handler
+        self.config = {**DEFAULT_EXECUTOR_CONFIG, **ORDER_EXECUTOR_CONFIG, **(config or {})}
+        self.mode = self.config['mode']
+
+        self._pool = self._create_pool()
+
+        self._slots = asyncio.Semaphore(self.config['max_in_flight'])
+        self.pending = 0
+        self.in_flight = 0
+        self.rejected = 0
+        window = self.config['metrics_window']
+        self.stages = {
+            'queue_wait': StageTimer(window, 'queue_wait'),
+            'build': StageTimer(window, 'build'),
+            'total': StageTimer(window, 'total'),
+        }
+
+    def _create_pool(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.config['max_workers'],
+                initializer=_init_process_worker,
+                initargs=(dict(self.ecpay_handler.config), self.ecpay_handler.api_url),
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.config['max_workers'],
+            thread_name_prefix='order-builder',
+        )
+
+    def reload(self):
+        """ECPay設定變更時重建程序池
+
+        執行緒池直接使用共用的 ecpay_handler，不需重建。程序池的工作者在啟動時
+        複製設定，因此建立新的程序池接手之後的訂單，舊程序池完成進行中的訂單後關閉。
+        """
+        if self.mode != 'process':
+            return
+        old_pool, self._pool = self._pool, self._create_pool()
+        old_pool.shutdown(wait=False)
+        logger.info("訂單程序池已依新配置重建")
+
+    @property
+    def queue_depth(self):
+        """等待執行的訂單數量"""
+        return self.pending
+
+    def is_saturated(self):
+        """佇列是否已滿"""
+        return self.pending >= self.config['max_pending']
+
+    async def run(self, func, *args):
+        """在執行池中執行任意函式（受佇列限制）"""
+        if self.is_saturated():
+            self.rejected += 1
+            raise OrderQueueFullError("訂單佇列已滿")
+
+        submitted = time.perf_counter()
+        self.pending += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.pending -= 1
+
+        started = time.perf_counter()
+        self.stages['queue_wait'].observe(started - submitted)
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, func, *args)
+        finally:
+            finished = time.perf_counter()
+            self.in_flight -= 1
+            self._slots.release()
+            self.stages['build'].observe(finished - started)
+            self.stages['total'].observe(finished - submitted)
+
+    async def generate_payment_url(self, owner=None, **kwargs):
+        """非同步版本的 ECPayHandler.generate_payment_url
+
+        owner 只在工作者模式（BrokerOrderExecutor）下使用，訂單由指令模塊另行記錄。
+        """
+        if self.mode == 'process':
+            return await self.run(_build_in_process, kwargs)
+        return await self.run(lambda: self.ecpay_handler.generate_payment_url(**kwargs))
+
+    def metrics(self):
+        """取得執行池統計"""
+        return {
+            'mode': self.mode,
+            'queue_depth': self.pending,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+            'stages': {name: timer.summary() for name, timer in self.stages.items()},
+        }
+
+    def shutdown(self, wait=True):
+        """關閉執行池"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info("訂單執行池已關閉")
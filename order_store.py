@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import ORDER_STORE_CONFIG
+except ImportError:
+    ORDER_STORE_CONFIG = {}
+
+DEFAULT_STORE_CONFIG = {
+    "enabled": True,           # 是否記錄訂單
+    "path": "orders.db",       # SQLite資料庫檔案
+    "batch_size": 100,         # 每次提交的最大筆數
+    "flush_interval": 0.5,     # 批次提交間隔(秒)
+    "max_queue": 10000,        # 待寫入佇列上限
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    trade_no TEXT PRIMARY KEY,
+    user_id INTEGER,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    total_amount INTEGER NOT NULL,
+    trade_desc TEXT,
+    item_name TEXT,
+    payment_method TEXT NOT NULL,
+    store_type TEXT,
+    installment_period INTEGER,
+    status TEXT NOT NULL DEFAULT 'created',
+    create_time TEXT NOT NULL,
+    expire_time TEXT,
+    paid_time TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_create_time ON orders (create_time);
+CREATE INDEX IF NOT EXISTS idx_orders_payment_method ON orders (payment_method);
+CREATE TABLE IF NOT EXISTS checkout_forms (
+    trade_no TEXT PRIMARY KEY,
+    html BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkout_forms_expires_at ON checkout_forms (expires_at);
+"""
+
+INSERT_ORDER_SQL = """
+INSERT OR REPLACE INTO orders (
+    trade_no, user_id, guild_id, channel_id, total_amount, trade_desc, item_name,
+    payment_method, store_type, installment_period, status, create_time, expire_time, details
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'created', ?, ?, ?)
+"""
+
+UPDATE_STATUS_SQL = "UPDATE orders SET status = ?, paid_time = COALESCE(?, paid_time) WHERE trade_no = ?"
+
+SELECT_ORDER_SQL = "SELECT * FROM orders WHERE trade_no = ?"
+
+SELECT_USER_ORDERS_SQL = "SELECT * FROM orders WHERE user_id = ? ORDER BY create_time DESC LIMIT ?"
+
+# 付款頁面表單（checkout.py）
+INSERT_CHECKOUT_SQL = "INSERT OR REPLACE INTO checkout_forms (trade_no, html, expires_at) VALUES (?, ?, ?)"
+
+SELECT_CHECKOUT_SQL = "SELECT html FROM checkout_forms WHERE trade_no = ? AND expires_at > ?"
+
+DELETE_EXPIRED_CHECKOUTS_SQL = "DELETE FROM checkout_forms WHERE expires_at <= ?"
+
+# 付款方式特定資訊（超商代碼、條碼、虛擬帳號等）存放於details欄位
+DETAIL_KEYS = ['payment_code', 'ibon_code', 'barcode_1', 'barcode_2', 'barcode_3', 'bank_code', 'virtual_account']
+
+_STOP = object()
+
+
+def connect(path):
+    """開啟SQLite連線（WAL模式）"""
+    connection = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class OrderStore:
+    """SQLite訂單儲存（寫入延後批次提交）
+
+    寫入只會放入佇列並立即返回，由背景執行緒以批次交易提交，
+    指令流程不需等待fsync。讀取使用獨立連線，WAL模式下不會被寫入阻塞。
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_STORE_CONFIG, **ORDER_STORE_CONFIG, **(config or {})}
+        self.path = self.config['path']
+
+        self._writer = connect(self.path)
+        self._writer.executescript(SCHEMA)
+        self._reader = connect(self.path)
+        self._read_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=self.config['max_queue'])
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._write_loop, name='order-store-writer', daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, sql, params):
+        try:
+            self._queue.put_nowait((sql, params))
+        except queue.Full:
+            self.dropped += 1
+            logger.error(f"訂單寫入佇列已滿，捨棄寫入: {params}")
+
+    def record_order(self, order_info, user_id=None, guild_id=None, channel_id=None):
+        """記錄新訂單（非阻塞）"""
+        details = {key: order_info[key] for key in DETAIL_KEYS if order_info.get(key)}
+        expire_time = order_info.get('expire_time')
+        self._enqueue(INSERT_ORDER_SQL, (
+            order_info['trade_no'],
+            user_id,
+            guild_id,
+            channel_id,
+            order_info['total_amount'],
+            order_info.get('trade_desc'),
+            order_info.get('item_name'),
+            order_info['payment_method'],
+            order_info.get('store_type'),
+            order_info.get('installment_period'),
+            order_info['create_time'].isoformat(sep=' '),
+            expire_time.isoformat(sep=' ') if expire_time else None,
+            json.dumps(details, ensure_ascii=False) if details else None,
+        ))
+
+    def update_status(self, trade_no, status, paid_time=None):
+        """更新訂單狀態（非阻塞）"""
+        self._enqueue(UPDATE_STATUS_SQL, (status, paid_time, trade_no))
+
+    def record_checkout(self, trade_no, form_html, expires_at):
+        """記錄付款頁面表單（非阻塞）"""
+        self._enqueue(INSERT_CHECKOUT_SQL, (trade_no, form_html, expires_at))
+
+    def purge_checkouts(self, now=None):
+        """刪除已過期的付款頁面表單（非阻塞）"""
+        self._enqueue(DELETE_EXPIRED_CHECKOUTS_SQL, (time.time() if now is None else now,))
+
+    def _write_loop(self):
+        batch_size = self.config['batch_size']
+        flush_interval = self.config['flush_interval']
+        running = True
+
+        while running:
+            try:
+                item = self._queue.get(timeout=flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [item]
+            deadline = time.monotonic() + flush_interval
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                running = False
+                batch = [entry for entry in batch if entry is not _STOP]
+
+            try:
+                self._commit(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.exception(f"訂單寫入執行緒發生錯誤，捨棄 {len(batch)} 筆寫入: {e}")
+            finally:
+                # 無論提交是否成功都要標記完成，避免 flush()/close() 永遠等待
+                for _ in range(len(batch) + (0 if running else 1)):
+                    self._queue.task_done()
+
+    def _commit(self, batch):
+        if not batch:
+            return
+        try:
+            with self._writer:
+                # 連續相同的SQL合併為executemany
+                index = 0
+                while index < len(batch):
+                    sql = batch[index][0]
+                    end = index
+                    while end < len(batch) and batch[end][0] == sql:
+                        end += 1
+                    self._writer.executemany(sql, [params for _, params in batch[index:end]])
+                    index = end
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            logger.error(f"訂單批次寫入失敗（{len(batch)}筆），改為逐筆寫入: {e}")
+            self._commit_each(batch)
+
+    def _commit_each(self, batch):
+        """批次失敗時逐筆提交，只捨棄有問題的寫入"""
+        for sql, params in batch:
+            try:
+                with self._writer:
+                    self._writer.execute(sql, params)
+                self.written += 1
+            except sqlite3.Error as e:
+                self.failed += 1
+                # 付款表單HTML不寫入日誌
+                logged = [value for value in params if not isinstance(value, bytes)]
+                logger.error(f"訂單寫入失敗，捨棄寫入: {sql.split()[0]} {logged}, {e}")
+        self.batches += 1
+
+    def flush(self):
+        """等待佇列中的寫入全部提交"""
+        self._queue.join()
+
+    def get_order(self, trade_no):
+        """查詢單筆訂單"""
+        with self._read_lock:
+            row = self._reader.execute(SELECT_ORDER_SQL, (trade_no,)).fetchone()
+        return dict(row) if row else None
+
+    def get_checkout(self, trade_no, now=None):
+        """查詢未過期的付款頁面表單"""
+        with self._read_lock:
+            row = self._reader.execute(SELECT_CHECKOUT_SQL, (trade_no, time.time() if now is None else now)).fetchone()
+        return bytes(row['html']) if row else None
+
+    async def fetch_checkout(self, trade_no):
+        """非同步查詢付款頁面表單（於執行緒中讀取）"""
+        return await asyncio.to_thread(self.get_checkout, trade_no)
+
+    def get_user_orders(self, user_id, limit=20):
+        """查詢使用者最近的訂單"""
+        with self._read_lock:
+            rows = self._reader.execute(SELECT_USER_ORDERS_SQL, (user_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    async def fetch_order(self, trade_no):
+        """非同步查詢單筆訂單（於執行緒中讀取）"""
+        return await asyncio.to_thread(self.get_order, trade_no)
+
+    def stats(self):
+        """取得寫入統計"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def close(self):
+        """提交剩餘寫入並關閉資料庫"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.close()
+        self._reader.close()
+        logger.info(f"訂單資料庫已關閉: {self.path}")
+
+
+def create_order_store(config=None):
+    """依設定建立訂單資料庫，未啟用時回傳None"""
+    merged = {**DEFAULT_STORE_CONFIG, **ORDER_STORE_CONFIG, **(config or {})}
+    if not merged['enabled']:
+        return None
+    return OrderStore(merged)
@@ -0,0 +1,212 @@
+"""訂單工作者程序
+
+從SQLite工作佇列領取建立訂單工作，完成簽章、表單產生與訂單寫入後將結果寫回佇列。
+通常由Bot依 ORDER_BROKER_CONFIG["workers"] 自動啟動，也可在其他終端另行啟動：
+
+    python order_worker.py --broker order_broker.db --name worker-extra --node-id 100
+
+另行啟動的工作者需指定與Bot及其他工作者不同的 --node-id（Bot啟動的工作者使用 Gateway 節點編號 +1 起的編號）。
+
+工作佇列不保存商店金鑰（HashKey/HashIV）。Bot啟動的工作者以 --secrets-stdin 由標準輸入讀取，
+另行啟動的工作者與Bot相同，從 config.py、TOML設定檔或環境變數載入。
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import time
+
+from order_broker import (
+    CLAIM_JOB_SQL, DEFAULT_BROKER_CONFIG, DELETE_CANCELLED_JOB_SQL, FINISH_JOB_SQL, HAS_QUEUED_SQL, SECRET_FIELDS, SELECT_QUEUED_SQL,
+    connect, dumps, loads, read_settings, split_secrets, with_transaction,
+)
+from trade_no import TradeNoGenerator
+
+logger = logging.getLogger(__name__)
+
+# 檢查共用設定是否更新的間隔(秒)
+SETTINGS_CHECK_INTERVAL = 1.0
+SELECT_SETTINGS_VERSION_SQL = "SELECT value FROM settings WHERE key = 'version'"
+
+
+class OrderWorker:
+    """單一工作者程序的工作迴圈"""
+
+    def __init__(self, broker_path, name=None, batch_size=None, poll_interval=None, secrets=None,
+                 max_poll_interval=None, node_id=None):
+        self.name = name or f"worker-{os.getpid()}"
+        self.secrets = secrets if secrets is not None else load_secrets()
+        self.batch_size = batch_size or DEFAULT_BROKER_CONFIG['batch_size']
+        self.poll_interval = poll_interval or DEFAULT_BROKER_CONFIG['poll_interval']
+        self.max_poll_interval = max(self.poll_interval, max_poll_interval or DEFAULT_BROKER_CONFIG['max_poll_interval'])
+        self.connection = connect(broker_path)
+        self.running = True
+        self.processed = 0
+
+        settings = read_settings(self.connection)
+        from ecpay_handler import ECPayHandler
+        self.ecpay_handler = ECPayHandler()
+        self.apply_settings(settings)
+        self._next_settings_check = time.monotonic() + SETTINGS_CHECK_INTERVAL
+
+        # 工作未指定交易編號時以本工作者的節點編號產生（Bot啟動的工作者各自分配不同的節點編號）
+        self.trade_no_generator = TradeNoGenerator(None if node_id is None else {'node_id': node_id})
+
+        self.order_store = None
+        store_config = settings.get('store_config')
+        if store_config and store_config.get('enabled'):
+            from order_store import OrderStore
+            self.order_store = OrderStore(store_config)
+
+    def apply_settings(self, settings):
+        """套用Gateway寫入的ECPay設定，並補上本程序持有的商店金鑰"""
+        self.settings_version = settings.get('version')
+        ecpay_config = settings.get('ecpay_config')
+        if ecpay_config is None:
+            ecpay_config, _ = split_secrets(self.ecpay_handler.config)
+        self.ecpay_handler.apply_config(
+            {**ecpay_config, **self.secrets},
+            settings.get('api_url') or self.ecpay_handler.api_url
+        )
+
+    def refresh_settings(self):
+        """定期檢查設定版本，Gateway重新載入配置時套用新設定"""
+        now = time.monotonic()
+        if now < self._next_settings_check:
+            return
+        self._next_settings_check = now + SETTINGS_CHECK_INTERVAL
+        row = self.connection.execute(SELECT_SETTINGS_VERSION_SQL).fetchone()
+        if row and loads(row[0]) != self.settings_version:
+            self.apply_settings(read_settings(self.connection))
+            logger.info(f"工作者已套用新配置: {self.name}")
+
+    def claim(self):
+        """領取一批工作
+
+        先以唯讀查詢確認有排隊中的工作，閒置時不取得寫入鎖，避免與Gateway及其他工作者競爭。
+        """
+        if self.connection.execute(HAS_QUEUED_SQL).fetchone() is None:
+            return []
+
+        def claim_batch():
+            rows = self.connection.execute(SELECT_QUEUED_SQL, (self.batch_size,)).fetchall()
+            now = time.time()
+            self.connection.executemany(CLAIM_JOB_SQL, [(self.name, now, trade_no) for trade_no, _ in rows])
+            return rows
+        return with_transaction(self.connection, claim_batch)
+
+    def build(self, payload):
+        """產生付款表單，回傳 (表單HTML, 序列化結果, 訂單資訊, 擁有者)"""
+        job = loads(payload)
+        kwargs = job['kwargs']
+        if not kwargs.get('trade_no'):
+            kwargs['trade_no'] = self.trade_no_generator.next()
+        form_html, params, order_info = self.ecpay_handler.generate_payment_url(**kwargs)
+        return form_html, dumps([params, order_info]), order_info, job['owner']
+
+    def finish(self, results):
+        """寫回結果，回傳仍有效（未被Gateway取消）的交易編號"""
+        def finish_batch():
+            finished = set()
+            for result in results:
+                trade_no = result[-1]
+                if self.connection.execute(FINISH_JOB_SQL, result).rowcount:
+                    finished.add(trade_no)
+                else:
+                    self.connection.execute(DELETE_CANCELLED_JOB_SQL, (trade_no,))
+            return finished
+        return with_transaction(self.connection, finish_batch)
+
+    def run_once(self):
+        """處理一批工作，回傳處理筆數
+
+        結果寫回佇列後才寫入訂單資料庫，Gateway等待逾時而取消的工作不會留下訂單。
+        """
+        self.refresh_settings()
+        rows = self.claim()
+        if not rows:
+            return 0
+
+        results = []
+        orders = {}
+        for trade_no, payload in rows:
+            try:
+                html, result, order_info, owner = self.build(payload)
+                results.append(('done', time.time(), result, html, None, trade_no))
+                orders[trade_no] = (order_info, owner)
+            except Exception as e:
+                logger.error(f"建立訂單失敗: {trade_no}, {e}")
+                results.append(('failed', time.time(), None, None, str(e) or type(e).__name__, trade_no))
+
+        finished = self.finish(results)
+        if len(finished) < len(results):
+            logger.warning(f"略過 {len(results) - len(finished)} 筆已取消的訂單工作")
+        if self.order_store:
+            for trade_no, (order_info, owner) in orders.items():
+                if trade_no in finished:
+                    self.order_store.record_order(order_info, **owner)
+        self.processed += len(finished)
+        return len(results)
+
+    def run(self):
+        logger.info(f"訂單工作者已啟動: {self.name}")
+        interval = self.poll_interval
+        while self.running:
+            if self.run_once():
+                interval = self.poll_interval
+            else:
+                # 閒置時輪詢間隔逐步加倍，直到 max_poll_interval
+                time.sleep(interval)
+                interval = min(interval * 2, self.max_poll_interval)
+        self.close()
+
+    def stop(self, *args):
+        self.running = False
+
+    def close(self):
+        self.trade_no_generator.close()
+        if self.order_store:
+            self.order_store.close()
+        self.connection.close()
+        logger.info(f"訂單工作者已停止: {self.name}，共處理 {self.processed} 筆")
+
+
+def load_secrets():
+    """與Bot相同從 config.py、TOML設定檔與環境變數載入商店金鑰"""
+    from config_snapshot import ConfigManager
+    _, secrets = split_secrets(ConfigManager({'enabled': False}).current.ecpay_config)
+    return secrets
+
+
+def read_stdin_secrets():
+    """讀取Bot經由標準輸入傳來的商店金鑰（一行JSON）"""
+    secrets = json.loads(sys.stdin.readline() or '{}')
+    return {key: secrets[key] for key in SECRET_FIELDS if key in secrets}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="訂單工作者程序")
+    parser.add_argument('--broker', default=DEFAULT_BROKER_CONFIG['path'], help="工作佇列資料庫檔案")
+    parser.add_argument('--name', help="工作者名稱")
+    parser.add_argument('--batch-size', type=int, help="每次領取的工作數量")
+    parser.add_argument('--poll-interval', type=float, help="沒有工作時的輪詢間隔(秒)")
+    parser.add_argument('--max-poll-interval', type=float, help="閒置時輪詢間隔的上限(秒)")
+    parser.add_argument('--node-id', type=int, help="交易編號節點編號（每個工作者需不同）")
+    parser.add_argument('--secrets-stdin', action='store_true', help="由標準輸入讀取商店金鑰（Bot啟動工作者時使用）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    secrets = read_stdin_secrets() if args.secrets_stdin else None
+    worker = OrderWorker(
+        args.broker, args.name, args.batch_size, args.poll_interval, secrets, args.max_poll_interval, args.node_id
+    )
+    # 收到結束訊號時處理完目前這批工作再離開
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import tempfile
+import logging
+from contextlib import contextmanager
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import PAYMENT_DELIVERY_CONFIG
+except ImportError:
+    PAYMENT_DELIVERY_CONFIG = {}
+
+# 預設直接從記憶體上傳，暫存檔僅作為備用方案
+USE_TEMP_FILE = PAYMENT_DELIVERY_CONFIG.get('use_temp_file', False)
+
+
+def payment_filename(trade_no):
+    """取得付款HTML檔名"""
+    return f"ecpay_payment_{trade_no}.html"
+
+
+def _to_bytes(form_html):
+    return form_html if isinstance(form_html, bytes) else form_html.encode('utf-8')
+
+
+@contextmanager
+def memory_payment_file(form_html, trade_no):
+    """從記憶體緩衝區建立付款HTML附件"""
+    buffer = io.BytesIO(_to_bytes(form_html))
+    try:
+        yield discord.File(buffer, filename=payment_filename(trade_no))
+    finally:
+        buffer.close()
+
+
+@contextmanager
+def temp_payment_file(form_html, trade_no):
+    """透過暫存檔建立付款HTML附件（發送失敗時也會清理檔案）"""
+    with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as f:
+        f.write(_to_bytes(form_html))
+        temp_file_path = f.name
+
+    try:
+        with open(temp_file_path, 'rb') as f:
+            yield discord.File(f, filename=payment_filename(trade_no))
+    finally:
+        try:
+            os.unlink(temp_file_path)
+        except OSError as e:
+            logger.warning(f"清理暫存檔案失敗: {temp_file_path}, {e}")
+
+
+def payment_file(form_html, trade_no, use_temp_file=None):
+    """依設定選擇付款HTML附件的建立方式"""
+    if use_temp_file is None:
+        use_temp_file = USE_TEMP_FILE
+    if use_temp_file:
+        return temp_payment_file(form_html, trade_no)
+    return memory_payment_file(form_html, trade_no)
+
+
+def checkout_view(url, label="前往付款"):
+    """付款頁面連結按鈕
+
+    連結按鈕不需要互動處理，建立後立即停止，發送時不會加入 discord.py 的 View 追蹤。
+    """
+    view = discord.ui.View(timeout=None)
+    view.add_item(discord.ui.Button(style=discord.ButtonStyle.link, label=label, url=url, emoji="💳"))
+    view.stop()
+    return view
+
+
+def followup_payload_bytes(content=None, embed=None, view=None, attachment_size=0):
+    """估算發送訊息上傳的資料量（JSON內容加上附件大小，不含multipart分隔與HTTP標頭）"""
+    payload = {}
+    if content:
+        payload['content'] = content
+    if embed is not None:
+        payload['embeds'] = [embed.to_dict()]
+    if view is not None:
+        payload['components'] = view.to_components()
+    return len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')) + attachment_size
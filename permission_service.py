@@ -0,0 +1,54 @@
+try:
+    from config import PERMISSION_CONFIG
+except ImportError:
+    PERMISSION_CONFIG = {}
+
+DEFAULT_PERMISSION_CONFIG = {
+    "command_roles": {},       # 個別指令的允許身分組 {"指令名稱": [身分組ID, ...]}，未列出的指令使用 ALLOWED_ROLE_IDS
+}
+
+
+class PermissionService:
+    """身分組與擁有者權限檢查（預先建立的frozenset）
+
+    允許的身分組在建立時轉為frozenset，每次檢查以互動附帶的成員目前身分組
+    計算交集，身分組被移除後立即失去權限；個別指令的允許清單只需一次集合比對。
+    """
+
+    def __init__(self, allowed_roles, owner_id=0, config=None):
+        self.config = {**DEFAULT_PERMISSION_CONFIG, **PERMISSION_CONFIG, **(config or {})}
+        self.owner_id = owner_id
+        self.update(allowed_roles, self.config['command_roles'])
+
+    @classmethod
+    def from_config(cls, runtime_config, config=None):
+        return cls(runtime_config.get('ALLOWED_ROLE_IDS', []), runtime_config.get('BOT_OWNER_ID', 0), config)
+
+    def update(self, allowed_roles, command_roles=None):
+        """更新允許的身分組"""
+        self.allowed_roles = frozenset(allowed_roles)
+        self.command_roles = {
+            command: frozenset(roles) for command, roles in (command_roles or {}).items()
+        }
+        # 只需記錄使用者擁有的「有設定的」身分組
+        self.relevant_roles = self.allowed_roles.union(*self.command_roles.values())
+
+    def roles_for(self, command=None):
+        """取得指令的允許身分組"""
+        return self.command_roles.get(command, self.allowed_roles)
+
+    def matched_roles(self, user):
+        """使用者目前擁有的有設定的身分組"""
+        roles = getattr(user, 'roles', None) or ()
+        return self.relevant_roles.intersection(role.id for role in roles)
+
+    def check(self, interaction, command=None):
+        """檢查使用者是否有權限使用指令"""
+        allowed = self.roles_for(command)
+        if not allowed:
+            return False
+        return not allowed.isdisjoint(self.matched_roles(interaction.user))
+
+    def is_owner(self, interaction):
+        """檢查使用者是否為bot擁有者"""
+        return interaction.user.id == self.owner_id
@@ -0,0 +1,149 @@
+import time
+
+try:
+    from config import RATE_LIMIT_CONFIG
+except ImportError:
+    RATE_LIMIT_CONFIG = {}
+
+DEFAULT_RATE_LIMIT_CONFIG = {
+    "enabled": True,
+    # 每個指令的限制: {"user": (次數, 秒數), "guild": (次數, 秒數)}
+    "commands": {
+        "建立繳費單": {"user": (5, 60), "guild": (60, 60)},
+        "建立付款單": {"user": (5, 60), "guild": (60, 60)},
+        "查詢付款狀態": {"user": (20, 60)},
+        "批次查詢付款狀態": {"user": (3, 60), "guild": (20, 60)},
+    },
+    # 特定身分組的使用者限制（取最寬鬆者）: {身分組ID: {"指令名稱": (次數, 秒數)}}
+    "role_limits": {},
+    "max_concurrent_orders": 20,   # 同時建立中的付款單上限（全域）
+    "sweep_interval": 60,          # 清除閒置計數的間隔(秒)
+}
+
+
+class TokenBucket:
+    """權杖桶（容量 capacity，每 period 秒補滿）"""
+
+    __slots__ = ('rule', 'capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, rule, now):
+        capacity, period = rule
+        self.rule = rule
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self):
+        """取得還需等待的秒數（有權杖時為0）"""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def idle_full(self, now):
+        """閒置到已補滿，可以移除（重新建立時狀態相同）"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class ConcurrencyCap:
+    """全域同時執行數量上限（超過時立即拒絕，不排隊）"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+
+    def try_acquire(self):
+        if self.limit and self.active >= self.limit:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+
+
+class RateLimiter:
+    """依指令、使用者、身分組與伺服器的權杖桶速率限制
+
+    每個使用中的鍵只保留一個權杖桶；閒置到補滿的權杖桶等同不存在，
+    於定期清除時移除，因此記憶體只與近期活躍的使用者數量相關。
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_RATE_LIMIT_CONFIG, **RATE_LIMIT_CONFIG, **(config or {})}
+        self.enabled = self.config['enabled']
+        self.rules = self.config['commands']
+        self.role_limits = self.config['role_limits']
+        self.order_slots = ConcurrencyCap(self.config['max_concurrent_orders'])
+        self._buckets = {}
+        self._next_sweep = time.monotonic() + self.config['sweep_interval']
+        self.rejected = 0
+
+    def user_rule(self, command, user, default):
+        """取得使用者的限制（身分組設定取最寬鬆者）"""
+        if not self.role_limits:
+            return default
+        best = default
+        for role in getattr(user, 'roles', None) or ():
+            rule = self.role_limits.get(role.id, {}).get(command)
+            if rule and (best is None or rule[0] / rule[1] > best[0] / best[1]):
+                best = rule
+        return best
+
+    def _bucket(self, key, rule, now):
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rule != rule:
+            # 首次使用或限制設定改變時建立新的權杖桶
+            bucket = self._buckets[key] = TokenBucket(rule, now)
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def check(self, command, interaction):
+        """檢查並消耗一次額度，允許時回傳0，否則回傳需等待的秒數"""
+        if not self.enabled:
+            return 0.0
+        rules = self.rules.get(command)
+        if not rules:
+            return 0.0
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        buckets = []
+        user_rule = self.user_rule(command, interaction.user, rules.get('user'))
+        if user_rule:
+            buckets.append(self._bucket((command, 'user', interaction.user.id), user_rule, now))
+        if rules.get('guild') and interaction.guild_id:
+            buckets.append(self._bucket((command, 'guild', interaction.guild_id), rules['guild'], now))
+
+        # 所有範圍都有額度時才消耗，避免被拒絕的請求扣除其他範圍的額度
+        retry_after = max((bucket.retry_after() for bucket in buckets), default=0.0)
+        if retry_after:
+            self.rejected += 1
+            return retry_after
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return 0.0
+
+    def sweep(self, now=None):
+        """移除閒置到已補滿的權杖桶"""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, bucket in self._buckets.items() if bucket.idle_full(now)]
+        for key in idle:
+            del self._buckets[key]
+        self._next_sweep = now + self.config['sweep_interval']
+        return len(idle)
+
+    def stats(self):
+        return {
+            'buckets': len(self._buckets),
+            'rejected': self.rejected,
+            'active_orders': self.order_slots.active,
+            'rejected_orders': self.order_slots.rejected,
+        }
@@ -0,0 +1,166 @@
+import builtins
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STARTUP_PROFILE_CONFIG = {
+    "budget": 10.0,                        # 程序啟動到 on_ready 的時間預算(秒)
+    "history_file": "startup_profile.jsonl",  # 每次分析結果附加到此檔案，方便追蹤變化（None表示不記錄）
+    "top_imports": 15,                     # 顯示載入最久的模組數量
+}
+
+
+def get_startup_profile_config(config=None):
+    """啟動分析設定（在分析結束時才讀取 config，避免影響模組載入時間）"""
+    try:
+        from config import STARTUP_PROFILE_CONFIG
+    except ImportError:
+        STARTUP_PROFILE_CONFIG = {}
+    return {**DEFAULT_STARTUP_PROFILE_CONFIG, **STARTUP_PROFILE_CONFIG, **(config or {})}
+
+
+class StartupTimer:
+    """記錄啟動各階段耗時（設定載入、處理器初始化、指令模塊載入、指令同步、Gateway就緒）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.phases = []                   # [(階段名稱, 秒數)]
+        self._mark = self.started
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        """以 with 區塊計時一個階段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+        self._mark = time.perf_counter()
+
+    def mark(self, name):
+        """記錄從上一個階段結束到現在的耗時（用於跨越事件的階段，例如等待Gateway就緒）"""
+        self.record(name, time.perf_counter() - self._mark)
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        parts = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        return f"啟動耗時 {self.total:.2f}s（{parts}）"
+
+    def report(self):
+        """輸出啟動耗時（只輸出一次，重新連線觸發的 on_ready 不重複輸出）"""
+        if self.reported:
+            return
+        self.reported = True
+        logger.info(self.summary())
+
+    def interpreter_startup(self):
+        """程序建立到開始計時之間的時間（直譯器啟動），無法取得時回傳None"""
+        try:
+            import psutil
+            return max(0.0, self.started_at - psutil.Process().create_time())
+        except Exception:
+            return None
+
+
+class ImportProfiler:
+    """記錄模組載入時間（--startup-profile 使用）
+
+    包裝 builtins.__import__，只記錄實際載入新模組的 import，
+    深度0為安裝後主程式直接執行的 import，巢狀的 import 深度遞增。
+    需在其他 import 之前安裝。
+    """
+
+    def __init__(self):
+        self.records = []                  # [(深度, 模組名稱, 秒數)]
+        self._depth = 0
+        self._original = builtins.__import__
+
+    @classmethod
+    def install(cls):
+        profiler = cls()
+        builtins.__import__ = profiler._import
+        return profiler
+
+    def uninstall(self):
+        if builtins.__import__ == self._import:
+            builtins.__import__ = self._original
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        loaded = len(sys.modules)
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if len(sys.modules) != loaded:
+                label = '.' * level + name if name else '.' * level + ','.join(fromlist or ())
+                self.records.append((self._depth, label, time.perf_counter() - start))
+
+    def top_level(self, limit=None):
+        """深度0的 import，依耗時排序"""
+        records = sorted(
+            ((name, seconds) for depth, name, seconds in self.records if depth == 0),
+            key=lambda item: item[1], reverse=True
+        )
+        return records[:limit] if limit else records
+
+
+def startup_profile_report(timer, profiler=None, budget=None, config=None):
+    """產生 --startup-profile 的分析結果，回傳 (報告文字, 是否在預算內)
+
+    結果也會附加到 history_file（每行一筆JSON），方便比較不同版本。
+    """
+    config = get_startup_profile_config(config)
+    budget = budget if budget is not None else config['budget']
+    interpreter = timer.interpreter_startup()
+    total = timer.total + (interpreter or 0.0)
+    within_budget = total <= budget
+
+    lines = ["=" * 50, "🚀 啟動分析（程序啟動 → on_ready）", "=" * 50]
+    if interpreter is not None:
+        lines.append(f"{'直譯器啟動':<12}{interpreter * 1000:>10.1f} ms")
+    for name, seconds in timer.phases:
+        lines.append(f"{name:<12}{seconds * 1000:>10.1f} ms")
+
+    imports = profiler.top_level(config['top_imports']) if profiler else []
+    if imports:
+        lines.append("-" * 50)
+        lines.append(f"載入最久的模組（前 {len(imports)} 名，含其依賴）")
+        for name, seconds in imports:
+            lines.append(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+    lines.append("-" * 50)
+    lines.append(f"總計 {total:.3f}s / 預算 {budget:.3f}s {'✅ 符合預算' if within_budget else '❌ 超出預算'}")
+
+    history_file = config['history_file']
+    if history_file:
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'total': round(total, 4),
+            'budget': budget,
+            'within_budget': within_budget,
+            'interpreter': round(interpreter, 4) if interpreter is not None else None,
+            'phases': {name: round(seconds, 4) for name, seconds in timer.phases},
+            'imports': {name: round(seconds, 4) for name, seconds in imports},
+        }
+        try:
+            with open(history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.warning(f"無法寫入啟動分析記錄: {e}")
+
+    return '\n'.join(lines), within_budget
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import SYSTEM_SAMPLER_CONFIG
+except ImportError:
+    SYSTEM_SAMPLER_CONFIG = {}
+
+DEFAULT_SAMPLER_CONFIG = {
+    "interval": 10,            # 取樣間隔(秒)
+    "window": 900,             # 保留的時間範圍(秒)，需涵蓋最長的趨勢區間
+}
+
+
+class SystemSampler:
+    """背景系統資訊取樣器
+
+    以固定間隔在執行緒中收集CPU、記憶體、磁碟、網路、溫度等資訊，
+    存入環狀緩衝區，指令可直接讀取最新快照與短期趨勢，不會阻塞事件迴圈。
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_SAMPLER_CONFIG, **SYSTEM_SAMPLER_CONFIG, **(config or {})}
+        self.interval = self.config['interval']
+        self.samples = deque(maxlen=max(2, int(self.config['window'] / self.interval) + 1))
+        # psutil 在第一次取樣時才載入（於執行緒中），不影響啟動時間
+        self._psutil = None
+        self._process = None
+        self._task = None
+
+    def _load_psutil(self):
+        import psutil
+        self._psutil = psutil
+        self._process = psutil.Process()
+        # 第一次呼叫 cpu_percent 只會建立基準值
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        return psutil
+
+    def collect(self):
+        """收集一次系統資訊（阻塞呼叫，請在執行緒中執行）"""
+        psutil = self._psutil or self._load_psutil()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        net_io = psutil.net_io_counters()
+        process_memory = self._process.memory_info()
+
+        sample = {
+            'time': time.time(),
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': memory.percent,
+            'memory_used': memory.used,
+            'memory_total': memory.total,
+            'disk_percent': disk.percent,
+            'disk_used': disk.used,
+            'disk_total': disk.total,
+            'bytes_sent': net_io.bytes_sent,
+            'bytes_recv': net_io.bytes_recv,
+            'packets_sent': net_io.packets_sent,
+            'process_rss': process_memory.rss,
+            'process_vms': process_memory.vms,
+            'process_cpu_percent': self._process.cpu_percent(interval=None),
+            'temperatures': [],
+            'load_avg': None,
+        }
+
+        # 溫度資訊（如果可用）
+        try:
+            temps = psutil.sensors_temperatures()
+            for name, entries in (temps or {}).items():
+                for entry in entries:
+                    if entry.current:
+                        sample['temperatures'].append((entry.label or name, entry.current))
+        except (AttributeError, OSError):
+            pass  # 溫度資訊不可用時忽略
+
+        # 系統負載（Linux/Unix）
+        try:
+            sample['load_avg'] = os.getloadavg()
+        except (AttributeError, OSError):
+            pass  # Windows系統沒有loadavg
+
+        return sample
+
+    async def sample_once(self):
+        """取樣一次並加入緩衝區"""
+        sample = await asyncio.to_thread(self.collect)
+        self.samples.append(sample)
+        return sample
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample_once()
+            except Exception as e:
+                logger.error(f"系統資訊取樣失敗: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """啟動背景取樣（重複呼叫不會重複啟動）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止背景取樣"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def latest(self):
+        """取得最新快照（尚無資料時立即取樣一次）"""
+        if not self.samples:
+            return await self.sample_once()
+        return self.samples[-1]
+
+    def window(self, seconds):
+        """取得最近 seconds 秒內的樣本"""
+        cutoff = time.time() - seconds
+        return [sample for sample in self.samples if sample['time'] >= cutoff]
+
+    def trend(self, key, seconds):
+        """取得指定欄位在最近 seconds 秒內的 (最小, 平均, 最大)，無資料時回傳None"""
+        values = [sample[key] for sample in self.window(seconds)]
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def network_rate(self, seconds=None):
+        """計算網路傳輸速率 (每秒發送位元組, 每秒接收位元組)
+
+        未指定 seconds 時使用最近兩個樣本，否則使用區間內第一個與最後一個樣本。
+        """
+        samples = list(self.samples) if seconds is None else self.window(seconds)
+        if len(samples) < 2:
+            return None
+        first, last = (samples[-2], samples[-1]) if seconds is None else (samples[0], samples[-1])
+        elapsed = last['time'] - first['time']
+        if elapsed <= 0:
+            return None
+        return (
+            max(0, last['bytes_sent'] - first['bytes_sent']) / elapsed,
+            max(0, last['bytes_recv'] - first['bytes_recv']) / elapsed,
+        )
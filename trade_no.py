@@ -0,0 +1,177 @@
+import itertools
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import TRADE_NO_CONFIG
+except ImportError:
+    TRADE_NO_CONFIG = {}
+
+DEFAULT_TRADE_NO_CONFIG = {
+    "prefix": "DC",                        # 交易編號前綴
+    "node_id": 0,                          # 節點編號（0-1295），共用同一商店代號的每個程序需不同
+    "state_file": "trade_no_{node_id}.state",  # 記錄上次時間基準的檔案（None表示不記錄）
+}
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+BASE = len(ALPHABET)
+
+# MerchantTradeNo 上限為20字元
+MAX_LENGTH = 20
+EPOCH_MS = 1704067200000               # 2024-01-01 00:00:00 UTC
+TIME_WIDTH = 8                         # 36^8 毫秒 ≈ 89年
+NODE_WIDTH = 2                         # 36^2 = 1296 個節點
+COUNTER_WIDTH = 8                      # 36^8 ≈ 2.8兆筆
+COUNTER_LIMIT = BASE ** COUNTER_WIDTH
+
+# 兩位數查表，編碼時每次處理兩位
+PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+
+# 本程序中各節點編號使用中的產生器數量（偵測重複的節點編號）
+_active_nodes = {}
+_active_lock = threading.Lock()
+
+
+def encode(value, width):
+    """以固定寬度的大寫base36編碼（width需為偶數）"""
+    digits = []
+    for _ in range(width // 2):
+        value, pair = divmod(value, BASE * BASE)
+        digits.append(PAIRS[pair])
+    if value:
+        raise OverflowError(f"數值超過 {width} 位base36")
+    return ''.join(reversed(digits))
+
+
+def decode(text):
+    return int(text, BASE)
+
+
+class TradeNoGenerator:
+    """交易編號產生器
+
+    格式: 前綴 + 時間基準(8) + 節點編號(2) + 計數器(8)，全部為大寫base36，共20字元。
+
+    時間基準為程序啟動時的毫秒時間，之後只遞增計數器，不需每筆讀取時鐘；
+    計數器用盡時時間基準加一並歸零。時間基準會記錄在 state_file，
+    重新啟動時必定大於上次使用的值（即使系統時間倒退），
+    不同程序以節點編號區分，因此跨重啟與跨程序都不會重複。
+
+    建立時登記節點編號（同一程序內的集合，以及 state_file 旁的檔案鎖），
+    發現其他產生器正在使用相同的節點編號時記錄警告；不再使用時呼叫 close() 釋放。
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_TRADE_NO_CONFIG, **TRADE_NO_CONFIG, **(config or {})}
+        self.prefix = self.config['prefix']
+        node_id = self.config['node_id']
+        if not 0 <= node_id < BASE ** NODE_WIDTH:
+            raise ValueError(f"節點編號需介於 0 與 {BASE ** NODE_WIDTH - 1} 之間: {node_id}")
+        if len(self.prefix) + TIME_WIDTH + NODE_WIDTH + COUNTER_WIDTH > MAX_LENGTH:
+            raise ValueError(f"交易編號前綴過長: {self.prefix}")
+        self.node = encode(node_id, NODE_WIDTH)
+        state_file = self.config['state_file']
+        self.state_file = state_file.format(node_id=node_id) if state_file else None
+        self.node_id = node_id
+
+        self._node_file = None
+        self._claimed = False
+        self._claim_node()
+        self._lock = threading.Lock()
+        self._rebase(int(time.time() * 1000) - EPOCH_MS)
+
+    def _claim_node(self):
+        """登記節點編號，已有其他產生器使用時記錄警告"""
+        hint = "交易編號可能重複，請為每個程序設定不同的 TRADE_NO_CONFIG[\"node_id\"]"
+        with _active_lock:
+            duplicate = _active_nodes.get(self.node_id, 0) > 0
+            _active_nodes[self.node_id] = _active_nodes.get(self.node_id, 0) + 1
+        self._claimed = True
+        if duplicate:
+            logger.warning(f"本程序中已有交易編號產生器使用節點編號 {self.node_id}，{hint}")
+            return
+        if fcntl is None or not self.state_file:
+            return
+        try:
+            self._node_file = open(f"{self.state_file}.lock", 'a')
+            fcntl.flock(self._node_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.warning(f"節點編號 {self.node_id} 已被其他程序使用（{self.state_file}.lock），{hint}")
+        except OSError as e:
+            logger.debug(f"無法建立節點編號檔案鎖: {e}")
+
+    def close(self):
+        """釋放節點編號"""
+        if not self._claimed:
+            return
+        self._claimed = False
+        with _active_lock:
+            _active_nodes[self.node_id] -= 1
+        if self._node_file is not None:
+            self._node_file.close()
+            self._node_file = None
+
+    def _load_base(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _save_base(self, base):
+        temp_path = f"{self.state_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(base))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.state_file)
+
+    def _rebase(self, base):
+        """設定新的時間基準並重設計數器"""
+        if self.state_file:
+            last_base = self._load_base()
+            if last_base is not None and base <= last_base:
+                logger.warning(f"系統時間早於上次的交易編號時間基準，改用 {last_base + 1}")
+                base = last_base + 1
+            self._save_base(base)
+        self.base = base
+        # 前綴與計數器一起替換，避免新舊時間基準混用
+        self._state = (self.prefix + encode(base, TIME_WIDTH) + self.node, itertools.count())
+
+    def next(self):
+        """產生下一個交易編號"""
+        state = self._state
+        head, counter = state
+        value = next(counter)
+        if value >= COUNTER_LIMIT:
+            with self._lock:
+                if self._state is state:
+                    self._rebase(self.base + 1)
+            return self.next()
+        return head + encode(value, COUNTER_WIDTH)
+
+    __call__ = next
+
+
+def parse_trade_no(trade_no, prefix=DEFAULT_TRADE_NO_CONFIG['prefix']):
+    """解析交易編號，回傳 (建立時間基準(毫秒), 節點編號, 計數器)；格式不符時回傳None"""
+    body = trade_no[len(prefix):]
+    if not trade_no.startswith(prefix) or len(body) != TIME_WIDTH + NODE_WIDTH + COUNTER_WIDTH:
+        return None
+    try:
+        return (
+            decode(body[:TIME_WIDTH]) + EPOCH_MS,
+            decode(body[TIME_WIDTH:TIME_WIDTH + NODE_WIDTH]),
+            decode(body[TIME_WIDTH + NODE_WIDTH:]),
+        )
+    except ValueError:
+        return None
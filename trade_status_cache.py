@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from ecpay_client import query_many
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import TRADE_STATUS_CACHE_CONFIG
+except ImportError:
+    TRADE_STATUS_CACHE_CONFIG = {}
+
+DEFAULT_CACHE_CONFIG = {
+    "max_entries": 10000,      # 快取筆數上限（超過時淘汰最久未使用）
+    "final_ttl": 3600,         # 已付款/交易失敗等最終狀態的保留時間(秒)
+    "pending_ttl": 15,         # 未付款狀態的保留時間(秒)
+    "not_found_ttl": 60,       # 查無交易的保留時間(秒)
+}
+
+PENDING_STATUS = '0'
+NOT_FOUND_STATUS = '10200047'
+
+
+class TradeStatusCache:
+    """交易狀態LRU+TTL快取
+
+    以 MerchantTradeNo 為鍵，依交易狀態決定保留時間，「查無交易」也會快取。
+    同一交易編號同時查詢時只會送出一次請求，其餘呼叫共用結果。
+    """
+
+    def __init__(self, ecpay_client, config=None):
+        self.ecpay_client = ecpay_client
+        self.config = {**DEFAULT_CACHE_CONFIG, **TRADE_STATUS_CACHE_CONFIG, **(config or {})}
+        self._entries = OrderedDict()   # trade_no -> (expires_at, result)
+        self._in_flight = {}            # trade_no -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def ttl_for(self, result):
+        """依交易狀態決定快取時間"""
+        status = result.get('TradeStatus')
+        if status == PENDING_STATUS:
+            return self.config['pending_ttl']
+        if status == NOT_FOUND_STATUS:
+            return self.config['not_found_ttl']
+        return self.config['final_ttl']
+
+    def get(self, trade_no):
+        """取得未過期的快取結果，沒有則回傳None"""
+        entry = self._entries.get(trade_no)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[trade_no]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(trade_no)
+        return result
+
+    def put(self, trade_no, result):
+        """寫入快取"""
+        self._entries[trade_no] = (time.monotonic() + self.ttl_for(result), result)
+        self._entries.move_to_end(trade_no)
+        while len(self._entries) > self.config['max_entries']:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, trade_no):
+        """移除單筆快取"""
+        if self._entries.pop(trade_no, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """清除所有快取（商店代號或查詢環境變更時）"""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def on_callback(self, callback_data):
+        """收到已驗證的ECPay回調時清除該交易的快取"""
+        trade_no = callback_data.get('MerchantTradeNo')
+        if trade_no:
+            self.invalidate(trade_no)
+
+    async def _fetch(self, trade_no):
+        try:
+            result = await self.ecpay_client.query_trade_info(trade_no)
+            self.put(trade_no, result)
+            return result
+        finally:
+            self._in_flight.pop(trade_no, None)
+
+    async def query_trade_info(self, trade_no):
+        """查詢交易狀態（優先使用快取）"""
+        result = self.get(trade_no)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        task = self._in_flight.get(trade_no)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(trade_no))
+            self._in_flight[trade_no] = task
+        # shield避免單一呼叫被取消時連帶取消其他等待者共用的請求
+        return await asyncio.shield(task)
+
+    async def query_many(self, trade_nos, concurrency=10):
+        """並行查詢多筆交易狀態（優先使用快取）"""
+        async for item in query_many(self.query_trade_info, trade_nos, concurrency):
+            yield item
+
+    def stats(self):
+        """取得快取統計"""
+        return {
+            'size': len(self._entries),
+            'in_flight': len(self._in_flight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,402 @@
+"""WebUI配置介面
+
+提供設定表單與 /api/config，儲存的配置有效時設定 ready 事件，
+等待中的主程式立即繼續啟動Bot，不需輪詢。
+
+兩種伺服器:
+    flask    在背景執行緒執行（需安裝 flask、flask-cors）
+    aiohttp  在Bot的事件迴圈上執行，Bot啟動後不需額外執行緒
+
+Bot啟動後，/api/config 不再回傳Token與商店金鑰，儲存的配置交給 ConfigManager 立即套用。
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bot啟動後不回傳的表單欄位，以 SECRET_MASK 表示已設定；送出 SECRET_MASK 表示不變更
+SECRET_FIELDS = ('discord_token', 'hash_key', 'hash_iv')
+SECRET_MASK = '********'
+
+
+def config_payload(runtime_config):
+    """目前的配置（表單欄位）"""
+    ecpay_config = runtime_config.get('ECPAY_CONFIG', {})
+    return {
+        'discord_token': runtime_config.get('DISCORD_BOT_TOKEN', ''),
+        'role_ids': ','.join(map(str, runtime_config.get('ALLOWED_ROLE_IDS', []))),
+        'merchant_id': ecpay_config.get('MerchantID', ''),
+        'hash_key': ecpay_config.get('HashKey', ''),
+        'hash_iv': ecpay_config.get('HashIV', ''),
+        'use_test_env': runtime_config.get('USE_TEST_ENVIRONMENT', True),
+        'expire_days': ecpay_config.get('ExpireDate', 7)
+    }
+
+
+def apply_config(runtime_config, data):
+    """將表單內容寫入配置（全部欄位解析成功後才寫入）"""
+    updates = {
+        'DISCORD_BOT_TOKEN': data['discord_token'],
+        'ALLOWED_ROLE_IDS': [int(id.strip()) for id in data['role_ids'].split(',') if id.strip()],
+        'USE_TEST_ENVIRONMENT': data['use_test_env'],
+        'ECPAY_CONFIG': {
+            'MerchantID': data['merchant_id'],
+            'HashKey': data['hash_key'],
+            'HashIV': data['hash_iv'],
+            'PaymentType': 'aio',
+            'ChoosePayment': 'CVS',
+            'EncryptType': 1,
+            'ExpireDate': int(data['expire_days']),
+            'PaymentInfoURL': '',
+            'ClientRedirectURL': '',
+        },
+    }
+    runtime_config.update(updates)
+
+
+def mask_secrets(payload):
+    """以 SECRET_MASK 取代已設定的Token與商店金鑰"""
+    return {key: SECRET_MASK if key in SECRET_FIELDS and value else value for key, value in payload.items()}
+
+
+def live_overrides(current, data):
+    """Bot啟動後的表單內容轉為配置覆蓋值，只回傳有變更的欄位
+
+    current 為目前的配置（ConfigSnapshot.to_dict()）；送出 SECRET_MASK 的欄位沿用目前的值，
+    ECPAY_CONFIG 只更新表單上的欄位，其餘設定（ReturnURL等）保留。
+    """
+    payload = config_payload(current)
+    data = {**data, **{key: payload[key] for key in SECRET_FIELDS if data.get(key) == SECRET_MASK}}
+    updates = {
+        'DISCORD_BOT_TOKEN': data['discord_token'],
+        'ALLOWED_ROLE_IDS': [int(id.strip()) for id in data['role_ids'].split(',') if id.strip()],
+        'USE_TEST_ENVIRONMENT': data['use_test_env'],
+        'ECPAY_CONFIG': {
+            **current.get('ECPAY_CONFIG', {}),
+            'MerchantID': data['merchant_id'],
+            'HashKey': data['hash_key'],
+            'HashIV': data['hash_iv'],
+            'ExpireDate': int(data['expire_days']),
+        },
+    }
+    return {key: value for key, value in updates.items() if value != current.get(key)}
+
+
+class ConfigHandoff:
+    """WebUI與主程式之間的配置交接
+
+    validate 為 check_config_validity，回傳 (是否有效, 訊息)。
+    ready 為 threading.Event（flask）或 asyncio.Event（aiohttp）。
+    Bot啟動後以 attach 交給 ConfigManager，之後的儲存在Bot的事件迴圈上套用。
+    """
+
+    def __init__(self, runtime_config, validate, ready):
+        self.runtime_config = runtime_config
+        self.validate = validate
+        self.ready = ready
+        self.config_manager = None
+        self.loop = None
+        if validate()[0]:
+            self.ready.set()
+
+    def attach(self, config_manager, loop):
+        """Bot啟動後改為讀寫 ConfigManager 的配置"""
+        self.config_manager = config_manager
+        self.loop = loop
+
+    def get(self):
+        if self.config_manager is not None:
+            return {**mask_secrets(config_payload(self.config_manager.current.to_dict())), 'bot_running': True}
+        return config_payload(self.runtime_config)
+
+    def save(self, data):
+        """儲存配置，有效時通知主程式，回傳 (成功與否, 訊息)
+
+        Bot啟動後（flask 的執行緒）交給Bot的事件迴圈套用。
+        """
+        if self.config_manager is not None:
+            return asyncio.run_coroutine_threadsafe(self.save_live(data), self.loop).result()
+        if self.ready.is_set():
+            # 配置已交給主程式，Bot啟動完成前不接受變更
+            return False, 'Bot正在啟動，請稍後再試'
+        try:
+            apply_config(self.runtime_config, data)
+        except Exception as e:
+            return False, f'配置錯誤: {str(e)}'
+
+        is_valid, message = self.validate()
+        if not is_valid:
+            return False, message
+        self.ready.set()
+        return True, '配置已儲存'
+
+    async def save_live(self, data):
+        """Bot啟動後的儲存：驗證後以 ConfigManager 覆蓋配置，由監聽者重建受影響的元件"""
+        current = self.config_manager.current.to_dict()
+        try:
+            overrides = live_overrides(current, data)
+        except Exception as e:
+            return False, f'配置錯誤: {str(e)}'
+
+        is_valid, message = self.validate({**current, **overrides})
+        if not is_valid:
+            return False, message
+        if not overrides:
+            return True, '配置未變更'
+        await self.config_manager.set_overrides_async({**self.config_manager.overrides, **overrides})
+        logger.info(f"WebUI已套用配置變更: {', '.join(sorted(overrides))}")
+        if 'DISCORD_BOT_TOKEN' in overrides:
+            return True, '配置已套用，Discord Bot Token 需重新啟動Bot才會生效'
+        return True, '配置已套用'
+
+
+def create_web_ui(runtime_config, validate):
+    """建立Flask WebUI應用，回傳 (app, handoff)"""
+    from flask import Flask, render_template_string, request, jsonify
+    from flask_cors import CORS
+
+    handoff = ConfigHandoff(runtime_config, validate, threading.Event())
+    app = Flask(__name__)
+    CORS(app)
+    
+    @app.route('/')
+    def index():
+        return render_template_string(WEB_UI_TEMPLATE)
+    
+    @app.route('/api/config', methods=['GET'])
+    def get_config():
+        return jsonify(handoff.get())
+    
+    @app.route('/api/config', methods=['POST'])
+    def save_config():
+        success, message = handoff.save(request.json)
+        return jsonify({'success': success, 'message': message})
+    
+    return app, handoff
+
+
+def start_web_ui(runtime_config, validate, config):
+    """在背景執行緒啟動Flask WebUI，回傳 ConfigHandoff"""
+    app, handoff = create_web_ui(runtime_config, validate)
+
+    def run_web_ui():
+        app.run(
+            host=config['host'],
+            port=config['port'],
+            debug=config['debug'],
+            use_reloader=False
+        )
+
+    threading.Thread(target=run_web_ui, name='web-ui', daemon=True).start()
+    return handoff
+
+
+def wait_for_config(handoff):
+    """阻塞等待WebUI送出有效配置
+
+    以1秒為單位等待事件，讓 Ctrl+C 在所有平台上都能中斷，
+    等待期間不會消耗CPU。
+    """
+    while not handoff.ready.wait(timeout=1):
+        pass
+
+
+class AsyncWebUI:
+    """在事件迴圈上執行的WebUI（aiohttp）
+
+    與 CallbackReceiver 相同以 AppRunner 啟動，可與Bot共用事件迴圈，
+    Bot啟動後繼續提供配置頁面而不需額外執行緒。
+    """
+
+    def __init__(self, runtime_config, validate, config):
+        self.config = config
+        self.handoff = ConfigHandoff(runtime_config, validate, asyncio.Event())
+        self._runner = None
+
+    @property
+    def ready(self):
+        return self.handoff.ready
+
+    def create_app(self):
+        from aiohttp import web
+
+        async def index(request):
+            return web.Response(text=WEB_UI_TEMPLATE, content_type='text/html')
+
+        async def get_config(request):
+            return web.json_response(self.handoff.get())
+
+        async def save_config(request):
+            data = await request.json()
+            if self.handoff.config_manager is not None:
+                success, message = await self.handoff.save_live(data)
+            else:
+                success, message = self.handoff.save(data)
+            return web.json_response({'success': success, 'message': message})
+
+        app = web.Application()
+        app.router.add_get('/', index)
+        app.router.add_get('/api/config', get_config)
+        app.router.add_post('/api/config', save_config)
+        return app
+
+    async def start(self):
+        from aiohttp import web
+
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config['host'], self.config['port'])
+        await site.start()
+        logger.info(f"WebUI已啟動: http://{self.config['host']}:{self.config['port']}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# WebUI HTML模板
+WEB_UI_TEMPLATE = '''
+<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>ECPay Discord Bot 配置</title>
+    <style>
+        body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; background: #f5f5f5; }
+        .container { background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; text-align: center; margin-bottom: 30px; }
+        .form-group { margin-bottom: 20px; }
+        label { display: block; margin-bottom: 5px; font-weight: bold; color: #555; }
+        input, select { width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 14px; }
+        button { background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }
+        button:hover { background: #0056b3; }
+        .alert { padding: 15px; margin: 20px 0; border-radius: 5px; }
+        .alert-success { background: #d4edda; color: #155724; border: 1px solid #c3e6cb; }
+        .alert-error { background: #f8d7da; color: #721c24; border: 1px solid #f5c6cb; }
+        .section { margin-bottom: 30px; padding: 20px; background: #f8f9fa; border-radius: 5px; }
+        .section h3 { margin-top: 0; color: #495057; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🤖 ECPay Discord Bot 配置</h1>
+        
+        <div id="alert" style="display: none;"></div>
+        
+        <form id="configForm">
+            <div class="section">
+                <h3>📱 Discord 設定</h3>
+                <div class="form-group">
+                    <label for="discord_token">Discord Bot Token:</label>
+                    <input type="password" id="discord_token" name="discord_token" required>
+                </div>
+                <div class="form-group">
+                    <label for="role_ids">允許使用的身分組ID (用逗號分隔):</label>
+                    <input type="text" id="role_ids" name="role_ids" placeholder="123456789012345678,987654321098765432">
+                </div>
+            </div>
+            
+            <div class="section">
+                <h3>💳 ECPay 設定</h3>
+                <div class="form-group">
+                    <label for="merchant_id">MerchantID (商店代號):</label>
+                    <input type="text" id="merchant_id" name="merchant_id" required>
+                </div>
+                <div class="form-group">
+                    <label for="hash_key">HashKey:</label>
+                    <input type="password" id="hash_key" name="hash_key" required>
+                </div>
+                <div class="form-group">
+                    <label for="hash_iv">HashIV:</label>
+                    <input type="password" id="hash_iv" name="hash_iv" required>
+                </div>
+            </div>
+            
+            <div class="section">
+                <h3>🔧 其他設定</h3>
+                <div class="form-group">
+                    <label for="use_test_env">使用測試環境:</label>
+                    <select id="use_test_env" name="use_test_env">
+                        <option value="true">是 (測試環境)</option>
+                        <option value="false">否 (正式環境)</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="expire_days">繳費期限 (天):</label>
+                    <input type="number" id="expire_days" name="expire_days" value="7" min="1" max="30">
+                </div>
+            </div>
+            
+            <button type="submit">💾 儲存配置並啟動Bot</button>
+        </form>
+    </div>
+
+    <script>
+        // Bot已啟動時儲存的配置立即套用，Token與金鑰不會回傳（顯示為遮蔽值，未修改則不變更）
+        let botRunning = false;
+
+        // 載入現有配置
+        fetch('/api/config')
+            .then(response => response.json())
+            .then(data => {
+                botRunning = data.bot_running === true;
+                if (botRunning) {
+                    document.querySelector('#configForm button').textContent = '💾 儲存並套用配置';
+                }
+                document.getElementById('discord_token').value = data.discord_token;
+                document.getElementById('role_ids').value = data.role_ids;
+                document.getElementById('merchant_id').value = data.merchant_id;
+                document.getElementById('hash_key').value = data.hash_key;
+                document.getElementById('hash_iv').value = data.hash_iv;
+                document.getElementById('use_test_env').value = data.use_test_env.toString();
+                document.getElementById('expire_days').value = data.expire_days;
+            });
+
+        // 提交表單
+        document.getElementById('configForm').addEventListener('submit', function(e) {
+            e.preventDefault();
+            
+            const formData = new FormData(this);
+            const data = {
+                discord_token: formData.get('discord_token'),
+                role_ids: formData.get('role_ids'),
+                merchant_id: formData.get('merchant_id'),
+                hash_key: formData.get('hash_key'),
+                hash_iv: formData.get('hash_iv'),
+                use_test_env: formData.get('use_test_env') === 'true',
+                expire_days: formData.get('expire_days')
+            };
+            
+            fetch('/api/config', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(data)
+            })
+            .then(response => response.json())
+            .then(result => {
+                const alert = document.getElementById('alert');
+                if (result.success && botRunning) {
+                    alert.className = 'alert alert-success';
+                    alert.textContent = '✅ ' + result.message;
+                    alert.style.display = 'block';
+                } else if (result.success) {
+                    alert.className = 'alert alert-success';
+                    alert.textContent = '✅ ' + result.message + ' - Bot將在幾秒後啟動...';
+                    alert.style.display = 'block';
+                    setTimeout(() => {
+                        window.close();
+                    }, 3000);
+                } else {
+                    alert.className = 'alert alert-error';
+                    alert.textContent = '❌ ' + result.message;
+                    alert.style.display = 'block';
+                }
+            });
+        });
+    </script>
+</body>
+</html>
+'''